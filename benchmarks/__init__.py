@@ -0,0 +1,15 @@
+import os
+
+
+def setup_django(database=None):
+    """
+    Configure Django for a benchmark script. database points the default
+    connection at another SQLite file, such as one filled by
+    benchmarks.generate, instead of the development database.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_mate.settings')
+    import django
+    django.setup()
+    if database:
+        from django.db import connections
+        connections['default'].settings_dict['NAME'] = database
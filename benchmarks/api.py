@@ -0,0 +1,407 @@
+"""
+Latency percentiles, query counts and peak memory of every endpoint under
+/watch/ and /accounts/, written as JSON for benchmarks.compare:
+
+    python -m benchmarks.api --database /tmp/bench.sqlite3 \\
+        --iterations 50 --output head.json
+
+Run it against a catalog filled by benchmarks.generate, with the
+recommendation index built by manage.py build_recommendations.
+Throttling is switched off and requests that write are rolled back, so
+runs repeat.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import ExitStack
+from datetime import timedelta
+from unittest import mock
+
+from benchmarks import setup_django
+
+PREFIXES = ('watch/', 'accounts/')
+
+Case = namedtuple(
+    'Case', 'name method path data auth rollback', defaults=(None, True, False)
+)
+
+
+def routes():
+    """
+    Routes of the benchmarked URL configurations, without the format
+    suffix variants the DRF router adds.
+    """
+    from django.urls import get_resolver
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern).lstrip('^')
+            if hasattr(pattern, 'url_patterns'):
+                yield from walk(pattern.url_patterns, route)
+            elif '(?P<format>' not in route:
+                yield route
+
+    return {
+        route for route in walk(get_resolver().url_patterns, '')
+        if route.startswith(PREFIXES)
+    }
+
+
+def prepare():
+    """
+    Pick the objects the endpoints are called with and the credentials of
+    the staff user "benchmark".
+    """
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+
+    from user_app.api.serializers import TokenPairSerializer
+    from watchlist import models
+
+    review = models.Review.objects.select_related('watch_list').first()
+    if review is None:
+        sys.exit("The catalog is empty, fill it with benchmarks.generate")
+    user, _ = User.objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True}
+    )
+    user.set_password('benchmark')
+    user.save()
+    token, _ = Token.objects.get_or_create(user=user)
+    refresh = TokenPairSerializer.get_token(user)
+    job = models.PurgeJob.objects.order_by('pk').last()
+    if job is None:
+        job = models.PurgeJob.objects.create(
+            target=models.PurgeJob.MOVIE, target_id=0,
+            status=models.PurgeJob.DONE
+        )
+    return {
+        'movie': review.watch_list,
+        'review': review,
+        'purge_job': job,
+        'user': user,
+        'token': token.key,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def cases(fixture):
+    from django.urls import reverse
+
+    movie, review = fixture['movie'], fixture['review']
+    platform_id = movie.platform_id
+    movie_data = {
+        'title': 'benchmark movie',
+        'storyline': 'benchmark storyline',
+        'platform': f'platform-{platform_id}',
+        'active': True,
+    }
+    review_data = {'ratings': 4, 'decription': 'benchmark review'}
+    since = (movie.updated_at - timedelta(seconds=1)).isoformat()
+    batch_ids = range(movie.pk, movie.pk + 50)
+    return [
+        Case('api-root', 'GET', reverse('api-root')),
+        Case('list', 'GET', reverse('list')),
+        Case('list', 'POST', reverse('list'), movie_data, rollback=True),
+        Case('movie_detail', 'GET', reverse('movie_detail', args=(movie.pk,))),
+        Case(
+            'movie_detail', 'PUT', reverse('movie_detail', args=(movie.pk,)),
+            movie_data, rollback=True
+        ),
+        Case(
+            'movie_detail', 'DELETE',
+            reverse('movie_detail', args=(movie.pk,)), rollback=True
+        ),
+        Case(
+            'movie-batch', 'GET', reverse('movie-batch'),
+            {'ids': ','.join(str(pk) for pk in batch_ids)}
+        ),
+        Case(
+            'movie-recommendations', 'GET',
+            reverse('movie-recommendations', args=(movie.pk,))
+        ),
+        Case('platform', 'GET', reverse('platform')),
+        Case(
+            'platform-detail', 'GET', reverse('platform', args=(platform_id,))
+        ),
+        Case(
+            'platform-batch', 'GET', reverse('platform-batch'),
+            {'ids': str(platform_id)}
+        ),
+        Case(
+            'platform-stats', 'GET',
+            reverse('platform-stats', args=(platform_id,))
+        ),
+        Case(
+            'review-create', 'POST',
+            reverse('review-create', args=(movie.pk,)), review_data,
+            rollback=True
+        ),
+        Case('review-list', 'GET', reverse('review-list', args=(movie.pk,))),
+        Case(
+            'review-list', 'GET', reverse('review-list', args=(movie.pk,)),
+            {'pagination': 'cursor'}
+        ),
+        Case(
+            'review-detail', 'GET', reverse('review-detail', args=(review.pk,))
+        ),
+        Case(
+            'review-detail', 'PUT',
+            reverse('review-detail', args=(review.pk,)), review_data,
+            rollback=True
+        ),
+        Case(
+            'review-detail', 'DELETE',
+            reverse('review-detail', args=(review.pk,)), rollback=True
+        ),
+        Case('review-queue', 'GET', reverse('review-queue')),
+        Case(
+            'purge-job', 'GET',
+            reverse('purge-job', args=(fixture['purge_job'].pk,))
+        ),
+        Case('changes', 'GET', reverse('changes'), {'since': 0}),
+        Case('stream-platform-list', 'GET', reverse('stream-platform-list')),
+        Case(
+            'stream-platform-detail', 'GET',
+            reverse('stream-platform-detail', args=(platform_id,))
+        ),
+        Case(
+            'filter-movie', 'GET', reverse('filter-movie'),
+            {'platform__name': f'platform-{platform_id}'}
+        ),
+        Case(
+            'filter-movie', 'GET', reverse('filter-movie'),
+            {'platform__name': f'platform-{platform_id}',
+             'facets': 'platform,active,rating'}
+        ),
+        Case(
+            'search-movie', 'GET', reverse('search-movie'),
+            {'search': movie.title.split()[0]}
+        ),
+        Case(
+            'search-movie', 'GET', reverse('search-movie'),
+            {'search': movie.title.split()[0],
+             'facets': 'platform,active,rating'}
+        ),
+        Case(
+            'autocomplete', 'GET', reverse('autocomplete'),
+            {'q': movie.title.split()[0][:3]}
+        ),
+        Case('export', 'GET', reverse('export'), {'updated_since': since}),
+        Case('cache-stats', 'GET', reverse('cache-stats')),
+        Case('autocomplete-stats', 'GET', reverse('autocomplete-stats')),
+        Case('profile-stats', 'GET', reverse('profile-stats')),
+        Case(
+            'login', 'POST', reverse('login'),
+            {'username': 'benchmark', 'password': 'benchmark'}, auth=False
+        ),
+        Case(
+            'token-obtain', 'POST', reverse('token-obtain'),
+            {'username': 'benchmark', 'password': 'benchmark'}, auth=False
+        ),
+        Case(
+            'token-refresh', 'POST', reverse('token-refresh'),
+            {'refresh': fixture['refresh']}, auth=False
+        ),
+        Case(
+            'register', 'POST', reverse('register'),
+            {
+                'username': 'benchmark-register',
+                'email': 'benchmark-register@example.com',
+                'password': 'benchmark', 'password_2': 'benchmark'
+            },
+            auth=False, rollback=True
+        ),
+        Case('logout', 'POST', reverse('logout'), rollback=True),
+    ]
+
+
+def _percentile(ordered, percent):
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(index)]
+
+
+def _request(client, case):
+    from django.db import transaction
+
+    with ExitStack() as stack:
+        if case.rollback:
+            stack.enter_context(transaction.atomic())
+        if case.method == 'GET':
+            response = client.get(case.path, case.data)
+        else:
+            response = client.generic(
+                case.method, case.path,
+                json.dumps(case.data or {}), 'application/json'
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if case.rollback:
+            transaction.set_rollback(True)
+    return response
+
+
+def run_case(client, case, iterations, warmup=2, cold=False):
+    from django.db import connections
+
+    from watchlist.api import cache
+
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries[-1] += 1
+        return execute(sql, params, many, context)
+
+    def timed():
+        if cold:
+            cache.get_cache().clear()
+        queries.append(0)
+        started = time.perf_counter()
+        response = _request(client, case)
+        return response, (time.perf_counter() - started) * 1000
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(count))
+        for _ in range(warmup):
+            timed()
+        del queries[:]
+        latencies = []
+        for _ in range(iterations):
+            response, elapsed = timed()
+            latencies.append(elapsed)
+
+        # tracemalloc slows everything down, memory gets its own request.
+        tracemalloc.start()
+        try:
+            timed()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        queries.pop()
+
+    latencies.sort()
+    return {
+        'name': case.name,
+        'method': case.method,
+        'path': case.path,
+        'status': response.status_code,
+        'latency_ms': {
+            'min': latencies[0],
+            'p50': _percentile(latencies, 50),
+            'p90': _percentile(latencies, 90),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'max': latencies[-1],
+            'mean': sum(latencies) / len(latencies),
+        },
+        'queries': {'min': min(queries), 'max': max(queries)},
+        'peak_memory_kib': peak / 1024,
+    }
+
+
+def _revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations=20, warmup=2, cold=False, only=None, log=print):
+    """
+    Benchmark every case whose name contains one of the only strings, all
+    of them by default, and return the report as a dict.
+    """
+    import django
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from rest_framework.views import APIView
+
+    from watchlist import models
+
+    fixture = prepare()
+    report = {
+        'started_at': timezone.now().isoformat(),
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': {
+            'vendor': connection.vendor,
+            'name': str(connection.settings_dict['NAME']),
+            'rows': {
+                model.__name__: model.objects.count()
+                for model in (
+                    User, models.StreamingPlatform, models.WatchList,
+                    models.Review
+                )
+            },
+        },
+        'iterations': iterations,
+        'cold_cache': cold,
+        'results': [],
+    }
+
+    anonymous, client = APIClient(), APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + fixture['token'])
+    with mock.patch.object(APIView, 'check_throttles'):
+        for case in cases(fixture):
+            if only and not any(name in case.name for name in only):
+                continue
+            result = run_case(
+                client if case.auth else anonymous, case, iterations,
+                warmup=warmup, cold=cold
+            )
+            report['results'].append(result)
+            latency = result['latency_ms']
+            log(
+                f"{case.method:<6} {case.name:<24} {result['status']} "
+                f"p50 {latency['p50']:9.2f}ms p95 {latency['p95']:9.2f}ms "
+                f"{result['queries']['max']:>4} queries "
+                f"{result['peak_memory_kib']:>10,.0f} KiB"
+            )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--database', help="SQLite file to benchmark.")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument(
+        '--cold', action='store_true',
+        help="Clear the response cache before every request."
+    )
+    parser.add_argument(
+        '--only', action='append',
+        help="Only run the endpoints whose name contains this, repeatable."
+    )
+    parser.add_argument('--output', help="Write the JSON report here.")
+    options = parser.parse_args()
+
+    setup_django(options.database)
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    report = run(
+        iterations=options.iterations, warmup=options.warmup,
+        cold=options.cold, only=options.only
+    )
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
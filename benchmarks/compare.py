@@ -0,0 +1,55 @@
+"""
+Compare two reports written by benchmarks.api, endpoint by endpoint:
+
+    python -m benchmarks.compare base.json head.json
+"""
+import argparse
+import json
+
+
+def _key(result):
+    return result['method'], result['name'], result['path']
+
+
+def compare(base, head, percentile='p50'):
+    """
+    Yield (method, name, base latency, head latency, base queries, head
+    queries) for the endpoints both reports measured.
+    """
+    base_results = {_key(result): result for result in base['results']}
+    for result in head['results']:
+        previous = base_results.get(_key(result))
+        if previous is None:
+            continue
+        yield (
+            result['method'], result['name'],
+            previous['latency_ms'][percentile],
+            result['latency_ms'][percentile],
+            previous['queries']['max'], result['queries']['max']
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument(
+        '--percentile', default='p50',
+        choices=['min', 'p50', 'p90', 'p95', 'p99', 'max', 'mean']
+    )
+    options = parser.parse_args()
+
+    with open(options.base) as base, open(options.head) as head:
+        rows = compare(json.load(base), json.load(head), options.percentile)
+        for method, name, before, after, queries_before, queries_after \
+                in rows:
+            change = (after - before) / before * 100 if before else 0
+            print(
+                f"{method:<6} {name:<24} {before:9.2f}ms -> {after:9.2f}ms "
+                f"{change:+7.1f}%  queries {queries_before} -> "
+                f"{queries_after}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Readers and writers hitting one SQLite file from separate processes at
+the same time, reporting throughput, latency percentiles and "database
+is locked" failures of each side:
+
+    python -m benchmarks.concurrency --database /tmp/bench.sqlite3 \\
+        --readers 8 --writers 4 --duration 30
+
+Readers fetch random movies, their reviews and the watchlist, writers
+post reviews as users of their own. --stock runs the same load on the
+stock backend with its rollback journal and deferred transactions, for
+comparison with the configured one. Writes are committed, run it against
+a scratch copy of a catalog filled by benchmarks.generate.
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from unittest import mock
+
+from benchmarks import setup_django
+
+STOCK = {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}}
+
+
+def _setup(database, stock):
+    setup_django(database)
+    from django.db import connections
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    if stock:
+        connections['default'].close()
+        connections.databases['default'].update(STOCK)
+        del connections['default']
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(index)]
+
+
+def _reader(client, rng, movies):
+    from django.urls import reverse
+
+    movie = rng.choice(movies)
+    return client.get(rng.choice((
+        reverse('movie_detail', args=(movie,)),
+        reverse('review-list', args=(movie,)),
+        reverse('list') + f'?page={rng.randrange(1, 50)}',
+    )))
+
+
+def _worker(kind, number, database, stock, duration, start, results):
+    _setup(database, stock)
+    from django.contrib.auth.models import User
+    from django.urls import reverse
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+    from rest_framework.views import APIView
+
+    from watchlist import models
+
+    rng = random.Random(number)
+    client = APIClient()
+    movies = list(models.WatchList.objects.values_list('pk', flat=True))
+    if kind == 'write':
+        user, _ = User.objects.get_or_create(
+            username=f'concurrency-{number}'
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        reviewed = set(models.Review.objects.filter(
+            reviewer=user
+        ).values_list('watch_list_id', flat=True))
+        movies = [movie for movie in movies if movie not in reviewed]
+        rng.shuffle(movies)
+
+    latencies, errors, samples = [], 0, []
+    start.wait()
+    deadline = time.monotonic() + duration
+    with mock.patch.object(APIView, 'check_throttles'):
+        while time.monotonic() < deadline:
+            if kind == 'write' and not movies:
+                break
+            started = time.perf_counter()
+            try:
+                if kind == 'read':
+                    response = _reader(client, rng, movies)
+                else:
+                    response = client.post(
+                        reverse('review-create', args=(movies.pop(),)),
+                        {'ratings': rng.randint(1, 5),
+                         'decription': 'concurrency benchmark'},
+                        format='json'
+                    )
+                failed = response.status_code >= 500
+            except Exception as error:
+                failed = True
+                if len(samples) < 3:
+                    samples.append(str(error))
+            elapsed = (time.perf_counter() - started) * 1000
+            if failed:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+    results.put((kind, latencies, errors, samples))
+
+
+def _summary(latencies, errors, samples, duration):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_samples': samples,
+        'per_second': len(latencies) / duration,
+        'latency_ms': {
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+        },
+    }
+
+
+def run(database, readers=4, writers=2, duration=10, stock=False):
+    """
+    Run readers and writers processes against database for duration
+    seconds and return the report of both sides as a dict.
+    """
+    if stock:
+        import sqlite3
+
+        # The journal mode is stored in the file, undo an earlier WAL run.
+        connection = sqlite3.connect(database)
+        connection.execute("PRAGMA journal_mode = delete")
+        connection.close()
+
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(kind, number, database, stock, duration, start, results)
+        )
+        for number, kind in enumerate(['read'] * readers + ['write'] * writers)
+    ]
+    for process in processes:
+        process.start()
+    # Processes set Django up before the clock starts.
+    time.sleep(2)
+    start.set()
+
+    kinds = ('read', 'write')
+    latencies = {kind: [] for kind in kinds}
+    errors = dict.fromkeys(kinds, 0)
+    samples = {kind: [] for kind in kinds}
+    for _ in processes:
+        kind, worker_latencies, worker_errors, worker_samples = results.get()
+        latencies[kind].extend(worker_latencies)
+        errors[kind] += worker_errors
+        samples[kind] = (samples[kind] + worker_samples)[:3]
+    for process in processes:
+        process.join()
+
+    return {
+        'database': str(database),
+        'backend': 'stock' if stock else 'configured',
+        'readers': readers,
+        'writers': writers,
+        'duration': duration,
+        **{
+            kind: _summary(
+                latencies[kind], errors[kind], samples[kind], duration
+            )
+            for kind in kinds
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--database', required=True)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument(
+        '--stock', action='store_true',
+        help="Use the stock SQLite backend and settings."
+    )
+    parser.add_argument('--output', help="Write the JSON report here.")
+    options = parser.parse_args()
+
+    report = run(
+        options.database, readers=options.readers, writers=options.writers,
+        duration=options.duration, stock=options.stock
+    )
+    for kind in ('read', 'write'):
+        side = report[kind]
+        latency = side['latency_ms']
+        print(
+            f"{kind:<5} {side['per_second']:9,.1f}/s "
+            f"p50 {latency['p50'] or 0:9.2f}ms "
+            f"p99 {latency['p99'] or 0:9.2f}ms "
+            f"{side['errors']:>6} errors"
+        )
+        for sample in side['error_samples']:
+            print(f"      {sample}")
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Fill a database with a synthetic catalog for the benchmarks, written
+with batched multi-row inserts rather than the ORM:
+
+    python -m benchmarks.generate --database /tmp/bench.sqlite3 \\
+        --platforms 1000 --movies 1000000 --reviews 20000000 --users 100000
+
+The database is migrated first, rows are appended after the existing
+ones and the same seed always produces the same catalog. Every generated
+user, and the staff user "benchmark", has the password "benchmark".
+"""
+import argparse
+import random
+import time
+from itertools import islice
+
+from benchmarks import setup_django
+
+PASSWORD = 'benchmark'
+
+WORDS = (
+    'silent river night city last empire dark star secret garden lost '
+    'kingdom broken crown wild heart summer storm iron shadow golden '
+    'road hidden truth ocean fire winter dream blue moon red planet '
+    'stranger house final hour little war frozen sky'
+).split()
+
+
+def _insert(connection, model, fields, rows, batch_size):
+    from django.db import transaction
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(
+        connection.ops.quote_name(model._meta.get_field(name).column)
+        for name in fields
+    )
+    sql = (
+        f"INSERT INTO {table} ({columns}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))})"
+    )
+    count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        count += len(batch)
+
+
+def _next_id(connection, model):
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(id) FROM {table}")
+        return (cursor.fetchone()[0] or 0) + 1
+
+
+def _phrase(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+
+def generate(platforms, movies, reviews, users, batch_size=10000, seed=0,
+             using='default', log=print):
+    """
+    Append platforms, movies, users and reviews to the database and
+    return the number of rows written per model. Reviews are spread
+    evenly over the new movies, at most one per user and movie, and the
+    movies are written with their rating aggregates and histograms
+    already filled in.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from django.utils import timezone
+
+    from watchlist import changes, models, platform_stats, search
+    from watchlist.api import cache
+
+    if movies and not platforms:
+        raise ValueError("Movies need at least one platform")
+    per_movie, extra = divmod(reviews, movies) if movies else (0, 0)
+    if reviews and per_movie + bool(extra) > users:
+        raise ValueError(
+            f"{reviews} reviews over {movies} movies need at least "
+            f"{per_movie + bool(extra)} users"
+        )
+
+    connection = connections[using]
+    rng = random.Random(seed)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    password = make_password(PASSWORD)
+    written = {}
+    started = time.monotonic()
+
+    def report(name, count):
+        written[name] = count
+        elapsed = time.monotonic() - started
+        log(f"{count:>12,} {name:<10} {elapsed:8.1f}s")
+
+    if not User.objects.using(using).filter(username='benchmark').exists():
+        User.objects.db_manager(using).create_user(
+            username='benchmark', password=PASSWORD, is_staff=True
+        )
+
+    first_user = _next_id(connection, User)
+    report('users', _insert(
+        connection, User,
+        ['id', 'password', 'is_superuser', 'username', 'first_name',
+         'last_name', 'email', 'is_staff', 'is_active', 'date_joined'],
+        (
+            (pk, password, False, f'user-{pk}', '', '',
+             f'user-{pk}@example.com', False, True, now)
+            for pk in range(first_user, first_user + users)
+        ),
+        batch_size
+    ))
+
+    # The change log would get an event per generated row. Feed readers
+    # and the autocomplete index start from a full read of the catalog.
+    log_changes = changes.is_supported(connection) and \
+        changes.log_exists(connection)
+    if log_changes:
+        changes.drop_triggers(connection)
+
+    first_platform = _next_id(connection, models.StreamingPlatform)
+    report('platforms', _insert(
+        connection, models.StreamingPlatform,
+        ['id', 'name', 'about', 'website', 'version', 'updated_at',
+         'hidden'],
+        (
+            (pk, f'platform-{pk}', _phrase(rng, 6),
+             f'https://platform-{pk}.example.com', 1, now, False)
+            for pk in range(first_platform, first_platform + platforms)
+        ),
+        batch_size
+    ))
+
+    # Search triggers would index movie by movie, the index is rebuilt
+    # in batches once everything is in.
+    reindex = search.is_supported(connection) and \
+        search.index_exists(connection)
+    if reindex:
+        search.drop_triggers(connection)
+
+    first_movie = _next_id(connection, models.WatchList)
+    next_review = _next_id(connection, models.Review)
+    movie_count = review_count = 0
+    while movie_count < movies:
+        movie_rows, review_rows = [], []
+        last = min(movies, movie_count + batch_size)
+        for index in range(movie_count, last):
+            movie_id = first_movie + index
+            count = per_movie + (index < extra)
+            ratings = [rng.randint(1, 5) for _ in range(count)]
+            movie_rows.append((
+                movie_id, f'{_phrase(rng, 3).title()} {movie_id}',
+                _phrase(rng, 20),
+                first_platform + rng.randrange(platforms),
+                sum(ratings) / count if count else 0, sum(ratings), count,
+                *(ratings.count(rating) for rating in range(1, 6)),
+                True, now, 1, now, False
+            ))
+            reviewer = rng.randrange(users) if ratings else 0
+            for offset, rating in enumerate(ratings):
+                review_rows.append((
+                    next_review, first_user + (reviewer + offset) % users,
+                    rating, _phrase(rng, 12), movie_id, True, now, now
+                ))
+                next_review += 1
+        movie_count += _insert(
+            connection, models.WatchList,
+            ['id', 'title', 'storyline', 'platform', 'average_rating',
+             'rating_sum', 'number_of_ratings', 'rating_1', 'rating_2',
+             'rating_3', 'rating_4', 'rating_5', 'active', 'created_at',
+             'version', 'updated_at', 'hidden'],
+            iter(movie_rows), batch_size
+        )
+        review_count += _insert(
+            connection, models.Review,
+            ['id', 'reviewer', 'ratings', 'decription', 'watch_list',
+             'active', 'created_at', 'updated_at'],
+            iter(review_rows), batch_size
+        )
+        report('movies', movie_count)
+    report('reviews', review_count)
+
+    if reindex:
+        for _ in search.rebuild(batch_size=batch_size, using=using):
+            pass
+        search.install_triggers(connection)
+        report('indexed', movie_count)
+
+    if log_changes:
+        changes.install_triggers(connection)
+
+    report('stats', platform_stats.rebuild())
+
+    cache.invalidate('catalog')
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--database', help="SQLite file to fill, created when missing."
+    )
+    parser.add_argument('--platforms', type=int, default=100)
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    setup_django(options.database)
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    generate(
+        options.platforms, options.movies, options.reviews, options.users,
+        batch_size=options.batch_size, seed=options.seed
+    )
+
+
+if __name__ == '__main__':
+    main()
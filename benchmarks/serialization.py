@@ -0,0 +1,100 @@
+"""
+Serialization throughput of one large watchlist page: the full
+ModelSerializer, a sparse fieldset going through the serializer, and the
+values() projection used when only plain columns are selected.
+
+    python -m benchmarks.serialization --rows 10000 --output page.json
+
+Without --database the page comes from a temporary catalog generated
+for the run.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+FIELDS = ('id', 'title', 'platform', 'average_rating')
+
+
+def _best(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(rows=10000, repeat=5):
+    """
+    Return rows per second of every strategy, best of repeat runs, each
+    including the query for the page.
+    """
+    from watchlist import models
+    from watchlist.api import fieldsets, queryplan
+    from watchlist.api.serializers import WatchListSerializer
+
+    movies = models.WatchList.objects.order_by('pk')
+    columns = fieldsets.projection(WatchListSerializer, FIELDS)
+    strategies = {
+        'full serializer': lambda: WatchListSerializer(
+            queryplan.optimize(movies, WatchListSerializer)[:rows],
+            many=True
+        ).data,
+        'sparse serializer': lambda: WatchListSerializer(
+            queryplan.optimize(movies, WatchListSerializer, FIELDS)[:rows],
+            many=True, fields=FIELDS
+        ).data,
+        'values projection': lambda: [
+            {name: row[lookup] for name, lookup in columns}
+            for row in movies.values(*{lookup for _, lookup in columns})[
+                :rows
+            ]
+        ],
+    }
+    page = min(rows, movies.count())
+    return {
+        name: page / _best(strategy, repeat)
+        for name, strategy in strategies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--database', help="SQLite file to read from.")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the JSON report here.")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = options.database or os.path.join(directory, 'db.sqlite3')
+        setup_django(database)
+        if not options.database:
+            from django.core.management import call_command
+
+            from benchmarks.generate import generate
+
+            call_command('migrate', verbosity=0)
+            generate(
+                platforms=10, movies=options.rows, reviews=0, users=0,
+                log=lambda line: None
+            )
+        report = run(rows=options.rows, repeat=options.repeat)
+
+    baseline = report['full serializer']
+    for name, rate in report.items():
+        print(f"{name:<18} {rate:>12,.0f} rows/s  {rate / baseline:5.1f}x")
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump({'rows': options.rows, 'rows_per_second': report},
+                      output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
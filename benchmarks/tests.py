@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import resolve
+from rest_framework.test import APITestCase
+
+from benchmarks import (
+    api, compare, concurrency, generate, serialization
+)
+from watchlist.models import Review, WatchList
+
+
+@pytest.mark.benchmark
+class TestBenchmarks(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.written = generate.generate(
+            platforms=3, movies=20, reviews=60, users=5, batch_size=7,
+            log=lambda line: None
+        )
+
+    def test_generated_catalog(self):
+        self.assertEqual(self.written['movies'], 20)
+        self.assertEqual(Review.objects.count(), 60)
+        movie = WatchList.objects.first()
+        ratings = list(
+            Review.objects.filter(watch_list=movie)
+            .values_list('ratings', flat=True)
+        )
+        self.assertEqual(movie.number_of_ratings, len(ratings))
+        self.assertEqual(movie.rating_sum, sum(ratings))
+
+    def test_every_route_is_benchmarked(self):
+        benchmarked = {
+            resolve(case.path).route
+            for case in api.cases(api.prepare())
+        }
+        self.assertEqual(benchmarked, api.routes())
+
+    def test_report_round_trip(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        index = os.path.join(directory.name, 'recommendations.idx')
+        call_command('build_recommendations', output=index, stdout=StringIO())
+        with override_settings(RECOMMENDATIONS_INDEX=index):
+            report = api.run(iterations=3, warmup=1, log=lambda line: None)
+        for result in report['results']:
+            self.assertLess(result['status'], 400, result['path'])
+            self.assertGreater(result['latency_ms']['p50'], 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            with open(path, 'w') as output:
+                json.dump(report, output)
+            with open(path) as saved:
+                rows = list(compare.compare(report, json.load(saved)))
+        self.assertEqual(len(rows), len(report['results']))
+
+    def test_serialization_strategies(self):
+        report = serialization.run(rows=20, repeat=1)
+        self.assertEqual(set(report), {
+            'full serializer', 'sparse serializer', 'values projection'
+        })
+
+
+@pytest.mark.benchmark
+class TestConcurrency(SimpleTestCase):
+
+    def test_readers_and_writers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        database = os.path.join(directory.name, 'db.sqlite3')
+        subprocess.run(
+            [
+                sys.executable, '-m', 'benchmarks.generate',
+                '--database', database, '--platforms', '2',
+                '--movies', '50', '--reviews', '100', '--users', '5'
+            ],
+            check=True, capture_output=True
+        )
+        for stock in (True, False):
+            report = concurrency.run(
+                database, readers=2, writers=2, duration=1, stock=stock
+            )
+            for kind in ('read', 'write'):
+                self.assertGreater(report[kind]['requests'], 0)
+                self.assertEqual(report[kind]['errors'], 0)
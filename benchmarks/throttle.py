@@ -0,0 +1,70 @@
+"""
+Throttle decisions per second: DRF's request-history algorithm on the
+default cache against the shared token-bucket file.
+
+    python -m benchmarks.throttle --decisions 200000 --users 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+
+def run(throttle_class, requests, decisions):
+    view = object()
+    started = time.perf_counter()
+    allowed = 0
+    for index in range(decisions):
+        allowed += throttle_class().allow_request(
+            requests[index % len(requests)], view
+        )
+    elapsed = time.perf_counter() - started
+    return decisions / elapsed, allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--decisions', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--rate', default='100/min')
+    options = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import override_settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from watchlist.api.throttling import ReviewListThrottle
+
+    class BenchmarkThrottle(ReviewListThrottle):
+        rate = options.rate
+
+    factory = APIRequestFactory()
+    requests = []
+    for user_id in range(1, options.users + 1):
+        request = Request(factory.get('/'))
+        request.user = User(pk=user_id)
+        requests.append(request)
+
+    cache.clear()
+    with override_settings(THROTTLE_BUCKET_FILE=None):
+        rate, allowed = run(BenchmarkThrottle, requests, options.decisions)
+    print(f"history list (cache): {rate:>12,.0f} decisions/s, "
+          f"{allowed} allowed")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'throttle.buckets')
+        with override_settings(THROTTLE_BUCKET_FILE=path):
+            rate, allowed = run(
+                BenchmarkThrottle, requests, options.decisions
+            )
+    print(f"token bucket (mmap):  {rate:>12,.0f} decisions/s, "
+          f"{allowed} allowed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import hashlib
+import itertools
+import os
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_request = ContextVar('replica_request', default=None)
+_turn = itertools.count()
+_lags = {}
+
+
+class _ReadState:
+
+    def __init__(self, replica):
+        self.replica = replica
+        # Chosen on the first read, so all reads of a request see one copy.
+        self.alias = None
+        self.wrote = False
+        self.replica_reads = 0
+
+
+def replica_lag(alias):
+    """
+    Seconds since the replica was last synced, None when it is unusable.
+    An SQLite replica is a copy refreshed by sync_replicas, so its age is
+    the age of the file. The answer is kept REPLICA_HEALTH_INTERVAL
+    seconds.
+    """
+    now = time.time()
+    checked_at, lag = _lags.get(alias, (None, None))
+    if checked_at is not None and now - checked_at < \
+            settings.REPLICA_HEALTH_INTERVAL:
+        return lag
+
+    database = connections.databases.get(alias)
+    if database is None:
+        lag = None
+    elif connections[alias].vendor == 'sqlite':
+        try:
+            lag = max(0, now - os.stat(database['NAME']).st_mtime)
+        except OSError:
+            lag = None
+    else:
+        lag = 0
+    _lags[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    """
+    A replica no further behind than REPLICA_MAX_LAG, by round-robin or
+    the freshest one with REPLICA_SELECTION = 'health'. None when no
+    replica qualifies and reads have to fall back to the primary.
+    """
+    lags = {alias: replica_lag(alias) for alias in settings.READ_REPLICAS}
+    healthy = [
+        alias for alias, lag in lags.items()
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG
+    ]
+    if not healthy:
+        return None
+    if settings.REPLICA_SELECTION == 'health':
+        return min(healthy, key=lags.get)
+    return healthy[next(_turn) % len(healthy)]
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of a safe request to a read replica and everything
+    else to the primary. Reads made inside a transaction, or after the
+    request wrote, stay on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request.get()
+        if state is None or not state.replica:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        if state.alias is None:
+            state.alias = choose_replica()
+            if state.alias is None:
+                state.replica = False
+                return 'default'
+        state.replica_reads += 1
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state.replica = False
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas are copies of the primary, schema included.
+        return db not in settings.READ_REPLICAS
+
+
+def replica_reads():
+    """
+    Number of reads the current request sent to a replica so far, for
+    callers that must not keep what a lagging replica answered.
+    """
+    state = _request.get()
+    return state.replica_reads if state is not None else 0
+
+
+def _pin_key(client):
+    digest = hashlib.sha1(client.encode()).hexdigest()
+    return f'replica:pin:{digest}'
+
+
+def pin(credentials):
+    """
+    Send the reads of requests authenticated with credentials, the value
+    of their Authorization header, to the primary for
+    REPLICA_STICKY_SECONDS. Called when credentials are issued, so the
+    first requests using them do not look them up on a lagging replica.
+    """
+    if settings.READ_REPLICAS:
+        caches[settings.REPLICA_PIN_CACHE].set(
+            _pin_key(credentials), True, settings.REPLICA_STICKY_SECONDS
+        )
+
+
+class ReplicaMiddleware:
+    """
+    Lets the router use the replicas for safe requests. A client that
+    wrote, told apart by its Authorization header or address, reads from
+    the primary for REPLICA_STICKY_SECONDS so it sees its own writes.
+    """
+
+    def __init__(self, get_response):
+        # A per-process pin would only hold on the worker that took the
+        # write.
+        if settings.READ_REPLICAS and isinstance(
+            caches[settings.REPLICA_PIN_CACHE], LocMemCache
+        ):
+            raise ImproperlyConfigured(
+                "REPLICA_PIN_CACHE has to be a cache shared by all "
+                "workers, not LocMemCache"
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.READ_REPLICAS:
+            return self.get_response(request)
+
+        cache = caches[settings.REPLICA_PIN_CACHE]
+        safe = request.method in SAFE_METHODS
+        pin_key = _pin_key(
+            request.META.get('HTTP_AUTHORIZATION')
+            or request.META.get('REMOTE_ADDR', '')
+        )
+        state = _ReadState(safe and not cache.get(pin_key))
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+
+        if not safe or state.wrote:
+            cache.set(pin_key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,12 +39,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'watchlist',
+    'user_app',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'watchlist.api.profiling.ProfilingMiddleware',
+    'movie_mate.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,13 +81,92 @@ WSGI_APPLICATION = 'movie_mate.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# movie_mate.sqlite3 is the stock SQLite backend plus per-connection
+# pragmas and the mode atomic blocks begin in. WAL lets readers run
+# alongside the single writer, synchronous = normal only syncs at
+# checkpoints, and IMMEDIATE transactions queue for the write lock for up
+# to busy_timeout milliseconds instead of failing with "database is
+# locked".
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'movie_mate.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+                # Negative sizes are in KiB.
+                'cache_size': -64 * 1024,
+            },
+        },
     }
 }
 
+# Aliases of DATABASES that serve the reads of safe requests. An SQLite
+# replica is a copy of the primary refreshed by manage.py sync_replicas,
+# for example:
+#
+#   DATABASES['replica1'] = {
+#       'ENGINE': 'django.db.backends.sqlite3',
+#       'NAME': BASE_DIR / 'replica1.sqlite3',
+#   }
+#   READ_REPLICAS = ['replica1']
+READ_REPLICAS = []
+# 'round-robin' or 'health', which prefers the least lagging replica.
+REPLICA_SELECTION = 'round-robin'
+# Replicas further behind than this many seconds are skipped.
+REPLICA_MAX_LAG = 60
+REPLICA_HEALTH_INTERVAL = 1
+# How long a client that wrote keeps reading from the primary. The pins
+# live in REPLICA_PIN_CACHE, which with replicas configured has to be
+# shared by all workers, e.g. FileBasedCache or Memcached; LocMemCache is
+# refused. Catalog responses read from a replica are never cached.
+REPLICA_STICKY_SECONDS = 5
+REPLICA_PIN_CACHE = 'default'
+
+DATABASE_ROUTERS = ['movie_mate.replicas.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered catalog responses. Point this at a shared backend such as
+    # FileBasedCache to share entries between worker processes.
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'revocations': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'revocations',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+CATALOG_CACHE_ALIAS = 'catalog'
+
+CATALOG_CACHE_TIMEOUT = 300
+
+# Seconds the ?facets= counts of filter-movie and search-movie are kept
+# per filter, unless a write to the catalog drops them first.
+FACET_CACHE_TIMEOUT = 30
+
+# Most ids one multi-get request (watch/batch/?ids=1,2,3) may ask for.
+BATCH_MAX_IDS = 100
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -131,6 +214,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
+        'user_app.api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -144,3 +228,82 @@ REST_FRAMEWORK = {
         'review-detail': '5/day'
     }
 }
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'UPDATE_LAST_LOGIN': False,
+}
+
+# Cache holding the ids of revoked JWTs until they expire. It has to be
+# shared by all workers so a logout is seen everywhere; LocMemCache is
+# refused at startup.
+JWT_REVOCATION_CACHE = 'revocations'
+
+# Size of PlatformStats.top_rated, and the number of phantom ratings at the
+# platform mean that every movie is ranked with. Reviews only update the
+# platform totals, manage.py rank_top_rated --loop re-ranks the reviewed
+# platforms every TOP_RATED_INTERVAL seconds.
+TOP_RATED_SIZE = 10
+TOP_RATED_PRIOR = 10
+TOP_RATED_INTERVAL = 10
+
+# Item-to-item recommendation index written by build_recommendations.
+RECOMMENDATIONS_INDEX = BASE_DIR / 'recommendations.idx'
+RECOMMENDATIONS_K = 20
+
+# Accept new reviews with 202 into the PendingReview queue instead of
+# writing them in the request. manage.py drain_reviews --loop turns the
+# queue into reviews REVIEW_QUEUE_BATCH_SIZE at a time.
+REVIEW_QUEUE = False
+REVIEW_QUEUE_BATCH_SIZE = 500
+REVIEW_QUEUE_INTERVAL = 1
+
+# Deleting a movie or platform hides it and answers 202, manage.py
+# run_purges --loop then deletes the rows PURGE_CHUNK_SIZE at a time.
+PURGE_CHUNK_SIZE = 1000
+PURGE_INTERVAL = 1
+# A running job that recorded no progress for this many seconds is taken
+# over by the next run_purges; run_purges --retry also re-runs failed jobs.
+PURGE_STALE_AFTER = 300
+
+# Page size of changes/?since=, which ?limit= may raise up to the maximum.
+# manage.py compact_changes drops superseded events and the deletes older
+# than CHANGE_LOG_TOMBSTONE_DAYS, readers further behind get 410.
+CHANGE_FEED_PAGE_SIZE = 100
+CHANGE_FEED_MAX_PAGE_SIZE = 1000
+CHANGE_LOG_CHUNK_SIZE = 1000
+CHANGE_LOG_TOMBSTONE_DAYS = 30
+
+# autocomplete/ answers from an index held by each process, which reads
+# the changes other processes made from the change log at most every
+# AUTOCOMPLETE_REFRESH_INTERVAL seconds, AUTOCOMPLETE_REFRESH_BATCH_SIZE
+# events per query. Further behind than AUTOCOMPLETE_REBUILD_BACKLOG
+# events, it is rebuilt from the catalog instead. A misspelt word is
+# corrected to words at most 1 - AUTOCOMPLETE_MIN_SIMILARITY edits per
+# letter away.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_REFRESH_INTERVAL = 1
+AUTOCOMPLETE_REFRESH_BATCH_SIZE = 500
+AUTOCOMPLETE_REBUILD_BACKLOG = 20000
+AUTOCOMPLETE_MIN_SIMILARITY = 0.7
+
+# Profile every request, or only staff requests that send PROFILING_HEADER,
+# e.g. 'X-Profile'. With both unset the profiling middleware is left out
+# entirely and DRF is not patched.
+PROFILING_ENABLED = False
+PROFILING_HEADER = None
+# Number of profiled requests per view kept for the statistics.
+PROFILING_WINDOW = 200
+
+# Raise instead of logging when a view goes over its query budget. The
+# test suite turns this on through conftest.py.
+QUERY_BUDGET_RAISE = False
+
+# Path of a memory-mapped file holding token buckets shared by all worker
+# processes on the host. When unset the review throttles keep DRF's
+# per-process request history in the default cache.
+THROTTLE_BUCKET_FILE = None
+
+THROTTLE_BUCKET_SLOTS = 65536
@@ -0,0 +1,53 @@
+"""
+The stock SQLite backend tuned for several worker processes sharing one
+database file. Two extra OPTIONS keys are understood:
+
+    'pragmas': {name: value, ...} run on every new connection, such as
+        journal_mode, synchronous, busy_timeout, mmap_size, cache_size.
+    'transaction_mode': 'DEFERRED', 'IMMEDIATE' or 'EXCLUSIVE', how
+        atomic blocks begin.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = dict(options.get('pragmas', {}))
+        self.transaction_mode = options.get(
+            'transaction_mode', 'DEFERRED'
+        ).upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of "
+                f"{', '.join(TRANSACTION_MODES)}"
+            )
+        for name in self.pragmas:
+            if not name.isidentifier():
+                raise ImproperlyConfigured(f"Invalid SQLite pragma {name!r}")
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # busy_timeout first, switching to WAL waits for other writers.
+        names = sorted(self.pragmas, key=lambda name: name != 'busy_timeout')
+        for name in names:
+            connection.execute(f"PRAGMA {name} = {self.pragmas[name]}")
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # A deferred transaction that reads and then writes has to upgrade
+        # its lock, and fails with "database is locked" straight away when
+        # another connection is writing, busy_timeout notwithstanding.
+        # Taking the write lock up front makes it wait its turn instead.
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework_simplejwt.authentication import (
+    JWTTokenUserAuthentication
+)
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _revocation_key(token):
+    return f'jwt:revoked:{token[api_settings.JTI_CLAIM]}'
+
+
+def revoke(token):
+    """
+    Remember the jti of a token until it would have expired anyway, which
+    keeps the revocation list bounded by the number of live tokens.
+    """
+    remaining = int(token['exp'] - time.time())
+    if remaining > 0:
+        caches[settings.JWT_REVOCATION_CACHE].set(
+            _revocation_key(token), True, remaining
+        )
+
+
+def is_revoked(token):
+    return caches[settings.JWT_REVOCATION_CACHE].get(
+        _revocation_key(token), False
+    )
+
+
+class StatelessJWTAuthentication(JWTTokenUserAuthentication):
+    """
+    Builds a TokenUser from the claims of the access token, so
+    authenticating a request never reads the user from the database.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_revoked(token):
+            raise InvalidToken("Token has been revoked")
+        return token
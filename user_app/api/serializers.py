@@ -1,6 +1,13 @@
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user_app.api.authentication import is_revoked
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -21,13 +28,34 @@ class RegistrationSerializer(serializers.ModelSerializer):
         if self.validated_data['password_2'] != password:
             raise serializers.ValidationError("Password didn't match")
 
-        user = User.objects.filter(email=email)
-        if user.exists():
+        account = User(email=email, username=self.validated_data['username'])
+        account.set_password(password)
+        try:
+            with transaction.atomic():
+                account.save()
+        except IntegrityError as error:
+            if 'user_app_email_ci_uniq' not in str(error):
+                raise
             raise serializers.ValidationError(
                 "User with the given email already exists"
             )
-
-        account = User(email=email, username=self.validated_data['username'])
-        account.set_password(password)
-        account.save()
         return account
+
+
+class TokenPairSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+
+    def validate(self, attrs):
+        if is_revoked(RefreshToken(attrs['refresh'])):
+            raise InvalidToken("Token has been revoked")
+        return super().validate(attrs)
@@ -1,11 +1,20 @@
 from django.urls import path
 
-from rest_framework.authtoken.views import obtain_auth_token
+from rest_framework_simplejwt.views import TokenRefreshView
 
+from user_app.api import serializers
 from user_app.api import views
 
 urlpatterns = [
-    path('login/', obtain_auth_token, name='login'),
+    path('login/', views.LoginView.as_view(), name='login'),
+    path('token/', views.TokenObtainView.as_view(), name='token-obtain'),
+    path(
+        'token/refresh/',
+        TokenRefreshView.as_view(
+            serializer_class=serializers.TokenRefreshSerializer
+        ),
+        name='token-refresh'
+    ),
     path('register/', views.registration_view, name='register'),
     path('logout/', views.logout_view, name='logout')
 ]
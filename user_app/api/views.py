@@ -1,8 +1,18 @@
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from user_app.api.serializers import RegistrationSerializer
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+from movie_mate import replicas
+from user_app.api.authentication import revoke
+from user_app.api.serializers import (
+    RegistrationSerializer, TokenPairSerializer
+)
 from user_app.models import create_auth_token # noqa
 
 
@@ -18,6 +28,7 @@ def registration_view(request):
 
         user = serializer.save()
         token = Token.objects.get(user=user).key
+        replicas.pin(f'Token {token}')
         data = {
             "message": f"{user.username} Succesfully registerd !",
             "token": token
@@ -29,6 +40,37 @@ def registration_view(request):
 @api_view(['POST', ])
 def logout_view(request):
     if request.method == 'POST':
-        request.user.auth_token.delete()
+        if request.auth is None:
+            raise NotAuthenticated()
+        if isinstance(request.auth, Token):
+            request.user.auth_token.delete()
+        else:
+            revoke(request.auth)
+            if 'refresh' in request.data:
+                try:
+                    revoke(RefreshToken(request.data['refresh']))
+                except TokenError as error:
+                    return Response(
+                        data={"error": str(error)},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
         data = f"{request.user.username} logoout Successful !"
         return Response(data=data, status=status.HTTP_200_OK)
+
+
+class LoginView(ObtainAuthToken):
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        replicas.pin(f"Token {response.data['token']}")
+        return response
+
+
+class TokenObtainView(TokenObtainPairView):
+    serializer_class = TokenPairSerializer
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        header_type = api_settings.AUTH_HEADER_TYPES[0]
+        replicas.pin(f"{header_type} {response.data['access']}")
+        return response
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
 
 
 class UserAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_app'
+
+    def ready(self):
+        # A per-process revocation list would only reject a logged out
+        # token on the worker that handled the logout.
+        if isinstance(caches[settings.JWT_REVOCATION_CACHE], LocMemCache):
+            raise ImproperlyConfigured(
+                "JWT_REVOCATION_CACHE has to be a cache shared by all "
+                "workers, not LocMemCache"
+            )
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Case-insensitive uniqueness of non-empty emails, enforced by the
+        # database so that registration needs no existence query.
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX user_app_email_ci_uniq "
+            "ON auth_user (LOWER(email)) WHERE email <> ''",
+            "DROP INDEX user_app_email_ci_uniq",
+        ),
+    ]
@@ -1,3 +1,8 @@
+from unittest import mock
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -5,6 +10,8 @@ from rest_framework.authtoken.models import Token
 
 from django.contrib.auth.models import User
 
+from movie_mate import replicas
+
 
 class TestRegistrationTestCases(APITestCase):
 
@@ -70,6 +77,27 @@ class TestRegistrationTestCases(APITestCase):
             response.json()[0], 'User with the given email already exists'
         )
 
+    def test_email_uniqueness_ignores_case(self):
+        User.objects.create_user(
+            username='django-user',
+            password='testpassword',
+            email="django@test.com"
+        )
+        data = {
+            "username": "other-user",
+            "email": "Django@Test.com",
+            "password": "testpassword",
+            "password_2": "testpassword"
+        }
+        response = self.client.post(
+            path=reverse('register'), data=data, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()[0], 'User with the given email already exists'
+        )
+        self.assertFalse(User.objects.filter(username='other-user').exists())
+
 
 class TestLogin(APITestCase):
 
@@ -85,6 +113,24 @@ class TestLogin(APITestCase):
         response = self.client.post(path=url, data=data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_login_pins_issued_token(self):
+        with mock.patch.object(replicas, 'pin') as pin:
+            response = self.client.post(
+                path=reverse('login'),
+                data={"username": "django", "password": "testpass"},
+                format='json'
+            )
+        pin.assert_called_once_with('Token ' + response.json()['token'])
+
+    def test_jwt_pins_issued_access_token(self):
+        with mock.patch.object(replicas, 'pin') as pin:
+            response = self.client.post(
+                path=reverse('token-obtain'),
+                data={"username": "django", "password": "testpass"},
+                format='json'
+            )
+        pin.assert_called_once_with('Bearer ' + response.json()['access'])
+
     def test_unsuccessfull_login(self):
         url = reverse('login')
         data = {
@@ -110,3 +156,72 @@ class TestLogOut(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
         response = self.client.post(path=url)
         self.assertEqual(response.status_code, 200)
+
+
+class TestJWT(APITestCase):
+
+    def setUp(self):
+        User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        response = self.client.post(
+            path=reverse('token-obtain'),
+            data={"username": "django", "password": "testpass"},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.access = response.json()['access']
+        self.refresh = response.json()['refresh']
+
+    def test_logout_with_jwt_reads_no_database(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access)
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                path=reverse('logout'), data={"refresh": self.refresh}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), 'django logoout Successful !')
+
+    def test_logout_revokes_tokens(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access)
+        self.client.post(
+            path=reverse('logout'), data={"refresh": self.refresh}
+        )
+
+        response = self.client.post(path=reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials()
+        response = self.client.post(
+            path=reverse('token-refresh'), data={"refresh": self.refresh}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_without_credentials(self):
+        response = self.client.post(path=reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_local_revocation_cache_refused(self):
+        config = apps.get_app_config('user_app')
+        with override_settings(JWT_REVOCATION_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                config.ready()
+
+    def test_refresh(self):
+        response = self.client.post(
+            path=reverse('token-refresh'), data={"refresh": self.refresh}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.json())
+
+    def test_staff_claim_grants_write_access(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access)
+        response = self.client.post(
+            path=reverse('platform'),
+            data={
+                "name": "Hulu",
+                "about": "watch for good movies",
+                "website": "http://www.hulu.com"
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
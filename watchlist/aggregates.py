@@ -0,0 +1,127 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from watchlist import models
+from watchlist import platform_stats
+
+# The WatchList counter of the reviews giving each rating.
+HISTOGRAM = {rating: f'rating_{rating}' for rating in range(1, 6)}
+
+
+def _apply_delta(watch_list_id, rating_delta, count_delta, histogram):
+    # Every right-hand side is evaluated against the row as it was before
+    # the UPDATE, so concurrent reviews never overwrite each other.
+    rating_sum = F('rating_sum') + rating_delta
+    number_of_ratings = F('number_of_ratings') + count_delta
+    counters = {
+        HISTOGRAM[rating]: F(HISTOGRAM[rating]) + delta
+        for rating, delta in histogram.items() if delta
+    }
+    updated = models.WatchList.objects.filter(pk=watch_list_id).update(
+        rating_sum=rating_sum,
+        number_of_ratings=number_of_ratings,
+        average_rating=Case(
+            When(number_of_ratings=-count_delta, then=Value(0.0)),
+            default=Cast(rating_sum, FloatField()) / number_of_ratings,
+            output_field=FloatField()
+        ),
+        **counters,
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+    if updated:
+        platform_stats.rating_changed(watch_list_id, rating_delta, count_delta)
+    return updated
+
+
+def add_rating(watch_list_id, rating):
+    return _apply_delta(watch_list_id, rating, 1, {rating: 1})
+
+
+def add_ratings(watch_list_id, ratings):
+    return _apply_delta(
+        watch_list_id, sum(ratings), len(ratings), Counter(ratings)
+    )
+
+
+def change_rating(watch_list_id, old_rating, new_rating):
+    if old_rating == new_rating:
+        return 0
+    return _apply_delta(
+        watch_list_id, new_rating - old_rating, 0,
+        {old_rating: -1, new_rating: 1}
+    )
+
+
+def remove_rating(watch_list_id, rating):
+    return _apply_delta(watch_list_id, -rating, -1, {rating: -1})
+
+
+def histogram_counts():
+    """
+    Aggregates counting the reviews of each rating, for a query grouped
+    by movie.
+    """
+    return {
+        field: Count('id', filter=Q(ratings=rating))
+        for rating, field in HISTOGRAM.items()
+    }
+
+
+def rebuild(chunk_size=1000):
+    """
+    Recompute the rating aggregates and histograms of every movie from
+    its reviews, walking the movies in primary key order with one grouped
+    query per chunk. Yields the number of movies written after each
+    chunk.
+    """
+    last_id = 0
+    while True:
+        ids = list(
+            models.WatchList.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+
+        totals = {
+            row.pop('watch_list_id'): row
+            for row in models.Review.objects.filter(
+                watch_list__gte=ids[0], watch_list__lte=ids[-1]
+            ).values('watch_list_id').annotate(
+                rating_sum=Sum('ratings'), count=Count('id'),
+                **histogram_counts()
+            ).order_by()
+        }
+        now = timezone.now()
+        movies = []
+        for pk in ids:
+            row = totals.get(pk) or dict.fromkeys(
+                ['rating_sum', 'count', *HISTOGRAM.values()], 0
+            )
+            rating_sum, count = row.pop('rating_sum'), row.pop('count')
+            movies.append(models.WatchList(
+                pk=pk,
+                rating_sum=rating_sum,
+                number_of_ratings=count,
+                average_rating=rating_sum / count if count else 0,
+                **row,
+                version=F('version') + 1,
+                updated_at=now
+            ))
+
+        with transaction.atomic():
+            models.WatchList.objects.bulk_update(
+                movies,
+                [
+                    'rating_sum', 'number_of_ratings', 'average_rating',
+                    *HISTOGRAM.values(), 'version', 'updated_at'
+                ]
+            )
+        last_id = ids[-1]
+        yield len(ids)
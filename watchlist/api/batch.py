@@ -0,0 +1,46 @@
+from django.conf import settings
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from watchlist.api import fieldsets
+
+
+def ids(request):
+    """
+    The distinct ids of ?ids=1,2,3 in the order given, at most
+    settings.BATCH_MAX_IDS of them.
+    """
+    value = request.query_params.get('ids', '')
+    try:
+        requested = [int(pk) for pk in value.split(',') if pk.strip()]
+    except ValueError:
+        raise ValidationError({'ids': ["ids must be integers"]})
+    requested = list(dict.fromkeys(requested))
+    if not requested:
+        raise ValidationError({'ids': ["At least one id is required"]})
+    if len(requested) > settings.BATCH_MAX_IDS:
+        raise ValidationError({
+            'ids': [f"At most {settings.BATCH_MAX_IDS} ids per request"]
+        })
+    return requested
+
+
+def respond(request, queryset, serializer_class):
+    """
+    Fetch the requested objects with one IN query, honouring ?fields= and
+    ?exclude=, and list the ids that were not found under "missing".
+    """
+    requested = ids(request)
+    fieldset = fieldsets.Fieldset(request, serializer_class)
+    rows = fieldset.optimize(queryset.filter(pk__in=requested))
+    if fieldset.columns is not None:
+        found = {row['id']: row for row in fieldset.project(rows)}
+    else:
+        found = {row.pk: row for row in rows}
+    return Response({
+        'results': fieldset.data(
+            [found[pk] for pk in requested if pk in found]
+        ),
+        'missing': [pk for pk in requested if pk not in found],
+    })
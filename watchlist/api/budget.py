@@ -0,0 +1,49 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMixin:
+    """
+    Counts the SQL queries of each request, authentication included, and
+    reports the ones that go over query_budgets[<http method>]. Reporting
+    raises QueryBudgetExceeded when settings.QUERY_BUDGET_RAISE is set,
+    as it is under the test suite, and logs a warning otherwise.
+    """
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.query_budgets.get(request.method.lower())
+        if budget is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = super().dispatch(request, *args, **kwargs)
+
+        if len(queries) > budget:
+            message = (
+                f"{type(self).__name__}.{request.method.lower()} ran "
+                f"{len(queries)} queries, over its budget of {budget}"
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(
+                    message + ':\n' + '\n'.join(queries)
+                )
+            logger.warning(message, extra={'queries': queries})
+        return response
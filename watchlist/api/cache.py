@@ -0,0 +1,138 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from movie_mate import replicas
+
+# Per-process counters, read through CacheStatsView.
+stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _tag_key(tag):
+    return f'catalog:tag:{tag}'
+
+
+def _tag_versions(cache, tags):
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def _response_key(cache, request, tags):
+    parts = [
+        request.get_full_path(), request.accepted_media_type,
+        *_tag_versions(cache, tags)
+    ]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return f'catalog:response:{digest}'
+
+
+def invalidate(*tags):
+    """
+    Give every tag a fresh version, orphaning the cached responses built
+    under the old one. Runs again on commit so that a response cached
+    from data read before the transaction committed is orphaned as well.
+    """
+    def bump():
+        version = time.time_ns()
+        get_cache().set_many(
+            {_tag_key(tag): version for tag in tags}, timeout=None
+        )
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def cached(name, parts, tags, timeout, compute):
+    """
+    compute() kept timeout seconds under name and parts, then computed
+    again. Invalidating one of tags, or 'catalog', drops it like a cached
+    response, and a value read from a replica is not kept either.
+    """
+    cache = get_cache()
+    versions = _tag_versions(cache, ['catalog', *tags])
+    digest = hashlib.sha1('|'.join([*parts, *versions]).encode()).hexdigest()
+    key = f'catalog:{name}:{digest}'
+    value = cache.get(key)
+    if value is None:
+        replica_reads = replicas.replica_reads()
+        value = compute()
+        if replicas.replica_reads() == replica_reads:
+            cache.set(key, value, timeout)
+    return value
+
+
+def cache_response(*tags):
+    """
+    Cache the rendered body of a successful GET under its path, query
+    string and negotiated media type. Tags may use URL keyword arguments,
+    e.g. 'watchlist:{pk}', and are invalidated through invalidate(). Every
+    entry also carries the 'catalog' tag so bulk jobs can drop them all.
+
+    Responses built from replica reads are not stored: a replica may not
+    have the write that bumped the tag versions yet, and a cache hit
+    skips the primary pin of a client that just wrote.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.accepted_renderer.format == 'api':
+                return method(view, request, *args, **kwargs)
+
+            cache = get_cache()
+            key = _response_key(
+                cache, request,
+                ['catalog', *(tag.format(**kwargs) for tag in tags)]
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                stats['hits'] += 1
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            stats['misses'] += 1
+            replica_reads = replicas.replica_reads()
+
+            def store(rendered):
+                if replicas.replica_reads() == replica_reads:
+                    cache.set(
+                        key,
+                        (rendered.content, rendered['Content-Type']),
+                        settings.CATALOG_CACHE_TIMEOUT
+                    )
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200 and hasattr(
+                response, 'add_post_render_callback'
+            ):
+                response.add_post_render_callback(store)
+            return response
+        return wrapper
+    return decorator
+
+
+def movie_tags(movie_id, platform_id=None):
+    tags = ['watchlist', f'watchlist:{movie_id}', 'platform']
+    if platform_id is not None:
+        tags.append(f'platform:{platform_id}')
+    return tags
+
+
+def platform_tags(platform_id, movie_ids=()):
+    return [
+        'platform', f'platform:{platform_id}', 'watchlist',
+        *(f'watchlist:{movie_id}' for movie_id in movie_ids)
+    ]
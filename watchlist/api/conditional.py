@@ -0,0 +1,128 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.exceptions import ValidationError
+
+from watchlist import models
+from watchlist.api import batch
+from watchlist.api import fieldsets
+from watchlist.api import serializers
+
+
+def movie_validators(request, pk):
+    return models.WatchList.objects.filter(pk=pk).values_list(
+        'version', 'updated_at'
+    ).first()
+
+
+def _platforms(ids):
+    # Saving or deleting a movie bumps its platform's version, while rating
+    # changes only bump the movie, so the platform validator also folds in
+    # the versions of its movies.
+    return models.StreamingPlatform.objects.filter(pk__in=ids).annotate(
+        movie_versions=Sum('watchlist__version'),
+        movies_updated_at=Max('watchlist__updated_at')
+    ).values_list(
+        'pk', 'version', 'movie_versions', 'updated_at', 'movies_updated_at'
+    )
+
+
+def _platform_version(row):
+    _, version, movie_versions, updated_at, movies_updated_at = row
+    return (
+        f'{version}.{movie_versions or 0}',
+        max(updated_at, movies_updated_at or updated_at)
+    )
+
+
+def platform_validators(request, pk):
+    row = _platforms([pk]).first()
+    if row is None:
+        return None
+    return _platform_version(row)
+
+
+def _batch_validators(request, serializer_class, versions):
+    """
+    versions(ids) maps the id of every object found to (version,
+    last_modified). An id appearing or disappearing changes the digest as
+    much as a new version does, and so do the order of ?ids= and the
+    ?fields= / ?exclude= selection, which shape the body too.
+    """
+    try:
+        ids = batch.ids(request)
+        fields = fieldsets.Fieldset(request, serializer_class).fields
+    except ValidationError:
+        return None
+    found = versions(ids)
+    if not found:
+        return None
+    digest = hashlib.sha1(repr((
+        ids, fields,
+        sorted((pk, version) for pk, (version, _) in found.items())
+    )).encode()).hexdigest()[:16]
+    return digest, max(modified for _, modified in found.values())
+
+
+def _movie_versions(ids):
+    return {
+        pk: (version, updated_at)
+        for pk, version, updated_at in models.WatchList.objects.filter(
+            pk__in=ids
+        ).values_list('pk', 'version', 'updated_at')
+    }
+
+
+def movie_batch_validators(request):
+    return _batch_validators(
+        request, serializers.WatchListSerializer, _movie_versions
+    )
+
+
+def _platform_versions(ids):
+    return {row[0]: _platform_version(row) for row in _platforms(ids)}
+
+
+def platform_batch_validators(request):
+    return _batch_validators(
+        request, serializers.StreamingPlatformSerializer, _platform_versions
+    )
+
+
+def condition(validators):
+    """
+    Answer GETs whose If-None-Match or If-Modified-Since still hold with a
+    304 before the wrapped handler runs, and tag full responses with an
+    ETag and Last-Modified. validators receives the request and the URL
+    keyword arguments and returns (version, last_modified), or None to
+    skip the checks.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            validated = validators(request, **kwargs)
+            if validated is None:
+                return method(view, request, *args, **kwargs)
+
+            version, last_modified = validated
+            media_type = hashlib.sha1(
+                request.accepted_media_type.encode()
+            ).hexdigest()[:8]
+            etag = quote_etag(f'{version}-{media_type}')
+            last_modified = int(last_modified.timestamp())
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
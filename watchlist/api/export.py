@@ -0,0 +1,53 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from watchlist import models
+from watchlist.api import queryplan
+from watchlist.api import serializers
+
+
+def chunked(queryset, chunk_size):
+    """
+    Walk a queryset in primary key order with one bounded query per chunk,
+    so only chunk_size rows are ever held in memory.
+    """
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[
+            :chunk_size
+        ])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def _line(record_type, data):
+    return json.dumps({"type": record_type, **data}, cls=JSONEncoder) + '\n'
+
+
+def stream_catalog(updated_since=None, include_reviews=False,
+                   chunk_size=500):
+    movies = queryplan.optimize(
+        models.WatchList.objects.all(), serializers.WatchListSerializer
+    )
+    reviews = queryplan.optimize(
+        models.Review.objects.all(), serializers.ReviewSerializer
+    )
+    if updated_since is not None:
+        movies = movies.filter(updated_at__gte=updated_since)
+        reviews = reviews.filter(updated_at__gte=updated_since)
+
+    for chunk in chunked(movies, chunk_size):
+        data = serializers.WatchListSerializer(chunk, many=True).data
+        for movie in data:
+            yield _line('movie', movie)
+
+    if not include_reviews:
+        return
+
+    for chunk in chunked(reviews, chunk_size):
+        data = serializers.ReviewSerializer(chunk, many=True).data
+        for review, item in zip(chunk, data):
+            yield _line('review', {**item, "watch_list": review.watch_list_id})
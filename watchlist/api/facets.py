@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from rest_framework.exceptions import ValidationError
+
+from watchlist import models
+from watchlist.api import cache
+
+# Query parameters that page or shape the results without changing which
+# movies match.
+PRESENTATION_PARAMS = {
+    'facets', 'fields', 'exclude', 'format', 'limit', 'start', 'page'
+}
+
+RATING_BUCKET = Case(
+    When(number_of_ratings=0, then=Value(0)),
+    When(average_rating__lt=2, then=Value(1)),
+    When(average_rating__lt=3, then=Value(2)),
+    When(average_rating__lt=4, then=Value(3)),
+    When(average_rating__lt=5, then=Value(4)),
+    default=Value(5),
+    output_field=IntegerField()
+)
+
+# facet -> (column grouped by, label of a value)
+FACETS = {
+    'platform': ('platform__name', str),
+    'active': ('active', lambda active: 'true' if active else 'false'),
+    'rating': ('rating_bucket', lambda bucket: str(bucket or 'unrated')),
+}
+
+
+def requested(request):
+    """
+    The facets named by ?facets=, e.g. ?facets=platform,rating, or None.
+    """
+    value = request.query_params.get('facets')
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValidationError({
+            'facets': [f"Unknown facet {name!r}" for name in unknown]
+        })
+    return sorted(set(names))
+
+
+def count(queryset, names):
+    """
+    {facet: {value: number of movies}} over queryset, every facet out of
+    one query grouped by all of them.
+    """
+    # The filtered movies as a subquery, free of the ordering, extra
+    # selects and joins of the list query.
+    movies = models.WatchList.objects.filter(
+        pk__in=queryset.order_by().values('pk')
+    )
+    if 'rating' in names:
+        movies = movies.annotate(rating_bucket=RATING_BUCKET)
+    columns = [FACETS[name][0] for name in names]
+    counts = {name: {} for name in names}
+    for row in movies.values(*columns).annotate(
+        count=Count('pk')
+    ).order_by():
+        for name in names:
+            column, label = FACETS[name]
+            value = label(row[column])
+            counts[name][value] = counts[name].get(value, 0) + row['count']
+    return counts
+
+
+class FacetsMixin:
+    """
+    Adds the ?facets= counts of the filtered movies to a list response,
+    cached FACET_CACHE_TIMEOUT seconds per filter and facets.
+    """
+
+    def facet_counts(self, names):
+        filters = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            if key not in PRESENTATION_PARAMS for value in values
+        )
+        return cache.cached(
+            'facets',
+            [type(self).__name__, ','.join(names), repr(filters)],
+            ['watchlist', 'platform'], settings.FACET_CACHE_TIMEOUT,
+            lambda: count(
+                self.filter_queryset(self.get_queryset()), names
+            )
+        )
+
+    def list(self, request, *args, **kwargs):
+        names = requested(request)
+        response = super().list(request, *args, **kwargs)
+        if names is None:
+            return response
+        if isinstance(response.data, list):
+            response.data = {'results': response.data}
+        response.data['facets'] = self.facet_counts(names)
+        return response
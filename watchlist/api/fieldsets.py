@@ -0,0 +1,164 @@
+from functools import cached_property, lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from watchlist.api import queryplan
+
+# Fields whose representation of a column value is the value itself.
+PLAIN_FIELDS = (
+    serializers.BooleanField, serializers.CharField,
+    serializers.FloatField, serializers.IntegerField
+)
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Lets a serializer be built with fields= and exclude= to drop the
+    fields that were not asked for.
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in set(self.fields) - set(fields or self.fields):
+            self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+
+def _names(request, parameter):
+    value = request.query_params.get(parameter)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _column(model, field):
+    """
+    The values() lookup reading field straight from a column, following
+    forward foreign keys, or None.
+    """
+    if type(field) not in PLAIN_FIELDS or field.source == '*':
+        return None
+    path = field.source.split('.')
+    for name in path[:-1]:
+        try:
+            relation = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not (relation.many_to_one or relation.one_to_one):
+            return None
+        model = relation.related_model
+    try:
+        column = model._meta.get_field(path[-1])
+    except FieldDoesNotExist:
+        return None
+    if column.is_relation or not column.concrete:
+        return None
+    return '__'.join(path)
+
+
+@lru_cache(maxsize=None)
+def _field_names(serializer_class):
+    return tuple(serializer_class().fields)
+
+
+@lru_cache(maxsize=None)
+def projection(serializer_class, fields):
+    """
+    [(output name, values() lookup), ...] for fields of serializer_class
+    when all of them are plain columns, otherwise None.
+    """
+    serializer = serializer_class(fields=fields)
+    model = serializer.Meta.model
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        lookup = _column(model, field)
+        if lookup is None:
+            return None
+        columns.append((name, lookup))
+    return columns
+
+
+class Fieldset:
+    """
+    The ?fields= and ?exclude= selection of a list request. When every
+    selected field is a plain column the rows are fetched with values()
+    and returned as they are, skipping model instances and serializer
+    fields altogether.
+    """
+
+    def __init__(self, request, serializer_class):
+        self.serializer_class = serializer_class
+        fields, exclude = _names(request, 'fields'), _names(request, 'exclude')
+        known = _field_names(serializer_class)
+        unknown = [
+            name for name in (fields or []) + (exclude or [])
+            if name not in known
+        ]
+        if unknown:
+            raise ValidationError({
+                'fields': [f"Unknown field {name!r}" for name in unknown]
+            })
+        if fields is None and exclude is None:
+            self.fields = None
+        else:
+            self.fields = tuple(
+                name for name in (fields or known)
+                if name not in (exclude or ())
+            )
+        self.columns = None
+        if self.fields is not None:
+            self.columns = projection(serializer_class, self.fields)
+
+    def optimize(self, queryset):
+        return queryplan.optimize(queryset, self.serializer_class, self.fields)
+
+    def project(self, queryset):
+        # Keyset pagination reads its position from the rows.
+        lookups = {'id'} | {lookup for _, lookup in self.columns}
+        return queryset.values(*lookups)
+
+    def data(self, page):
+        if self.columns is not None:
+            return [
+                {name: row[lookup] for name, lookup in self.columns}
+                for row in page
+            ]
+        return self.serializer_class(page, many=True, fields=self.fields).data
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= and ?exclude= for generic views, with the values() fast path
+    on list.
+    """
+
+    @cached_property
+    def fieldset(self):
+        return Fieldset(self.request, self.get_serializer_class())
+
+    def get_queryset(self):
+        return self.fieldset.optimize(super().get_queryset())
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.fieldset.fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if self.fieldset.columns is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.fieldset.project(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fieldset.data(page))
+        return Response(self.fieldset.data(queryset))
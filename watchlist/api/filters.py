@@ -0,0 +1,18 @@
+from django.db import connections
+
+from rest_framework import filters
+
+from watchlist import search
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if not search.is_supported(connections[queryset.db]):
+            return super().filter_queryset(request, queryset, view)
+
+        return search.search(queryset, terms)
@@ -10,3 +10,14 @@ class WatchListLimitOffsetPagination(pagination.LimitOffsetPagination):
     max_limit = 5
     limit_query_param = 'limit'
     offset_query_param = 'start'
+
+
+class KeysetPagination(pagination.CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+
+
+def keyset_requested(request):
+    return request.query_params.get('pagination') == 'cursor'
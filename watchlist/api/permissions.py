@@ -16,4 +16,6 @@ class IsReviewUserOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         else:
-            return obj.reviewer == request.user or request.user.is_staff
+            return (
+                obj.reviewer_id == request.user.id or request.user.is_staff
+            )
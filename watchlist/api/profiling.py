@@ -0,0 +1,208 @@
+import heapq
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+PHASES = ('auth', 'throttle', 'db', 'serialize', 'render')
+SLOWEST_QUERIES = 3
+
+_active = ContextVar('profile', default=None)
+_installed = False
+
+# Per-process samples by view, read through ProfileStatsView.
+_samples = defaultdict(lambda: deque(maxlen=settings.PROFILING_WINDOW))
+_lock = threading.Lock()
+
+
+class Profile:
+
+    def __init__(self):
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.slowest = []
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations['db'] += elapsed
+            self.queries += 1
+            entry = (elapsed, self.queries, sql)
+            if len(self.slowest) < SLOWEST_QUERIES:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+
+    def server_timing(self, total):
+        metrics = [
+            f'{name};dur={duration * 1000:.2f}'
+            for name, duration in self.durations.items()
+        ]
+        metrics[PHASES.index('db')] += f';desc="{self.queries} queries"'
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def _timed(phase, function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return function(*args, **kwargs)
+        with profile.phase(phase):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def install():
+    """
+    Wrap the DRF steps that make up a phase. The wrappers only look up the
+    active profile when no request is being profiled.
+    """
+    global _installed
+    if _installed:
+        return
+    APIView.perform_authentication = _timed(
+        'auth', APIView.perform_authentication
+    )
+    APIView.check_throttles = _timed('throttle', APIView.check_throttles)
+    for serializer_class in (serializers.Serializer,
+                             serializers.ListSerializer):
+        serializer_class.data = property(
+            _timed('serialize', serializer_class.data.fget)
+        )
+    Response.rendered_content = property(
+        _timed('render', Response.rendered_content.fget)
+    )
+    _installed = True
+
+
+def _view_name(request):
+    match = request.resolver_match
+    if match is None:
+        return f'{request.method} {request.path_info}'
+    return f'{request.method} {match.func.__module__}.{match.func.__name__}'
+
+
+def record(view, profile, total):
+    sample = {
+        'total': total,
+        'queries': profile.queries,
+        'slowest': [(elapsed, sql) for elapsed, _, sql in profile.slowest],
+        **profile.durations,
+    }
+    with _lock:
+        _samples[view].append(sample)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def _percentile(ordered, percent):
+    return ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+
+
+def stats():
+    """
+    Summarise the last PROFILING_WINDOW profiled requests of every view,
+    durations in milliseconds.
+    """
+    with _lock:
+        samples = {view: list(window) for view, window in _samples.items()}
+
+    summary = {}
+    for view, window in samples.items():
+        totals = sorted(sample['total'] * 1000 for sample in window)
+        slowest = heapq.nlargest(
+            SLOWEST_QUERIES,
+            {query for sample in window for query in sample['slowest']}
+        )
+        summary[view] = {
+            'requests': len(window),
+            'total_ms': {
+                'mean': sum(totals) / len(totals),
+                'p50': _percentile(totals, 50),
+                'p95': _percentile(totals, 95),
+                'max': totals[-1],
+            },
+            'phases_ms': {
+                phase: sum(sample[phase] for sample in window) * 1000
+                / len(window)
+                for phase in PHASES
+            },
+            'queries': sum(sample['queries'] for sample in window)
+            / len(window),
+            'slowest_queries': [
+                {'sql': sql, 'ms': elapsed * 1000}
+                for elapsed, sql in slowest
+            ],
+        }
+    return summary
+
+
+class ProfilingMiddleware:
+    """
+    Time the auth, throttle, db, serialize and render phases of a request
+    and report them in a Server-Timing header. Every request is profiled
+    when settings.PROFILING_ENABLED is set, otherwise only the ones that
+    send settings.PROFILING_HEADER and turn out to come from staff. With
+    neither setting the middleware removes itself.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED and not settings.PROFILING_HEADER:
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        enabled = settings.PROFILING_ENABLED
+        if not enabled and not (
+            settings.PROFILING_HEADER
+            and request.headers.get(settings.PROFILING_HEADER)
+        ):
+            return self.get_response(request)
+
+        profile = Profile()
+        token = _active.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _active.reset(token)
+        total = time.perf_counter() - started
+
+        # DRF hands the user it authenticated back to the Django request.
+        user = getattr(request, 'user', None)
+        if enabled or (user is not None and user.is_staff):
+            response['Server-Timing'] = profile.server_timing(total)
+            record(_view_name(request), profile, total)
+        return response
@@ -0,0 +1,99 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+from rest_framework import serializers
+
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _lookups(serializer, model, prefix='', skip=None):
+    select_related, prefetch_related = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or isinstance(
+            field, serializers.PrimaryKeyRelatedField
+        ):
+            continue
+
+        nested = _nested_serializer(field)
+        current, path = model, []
+        for name in field.source.split('.'):
+            relation = _relation(current, name)
+            if relation is None or (not path and name == skip):
+                break
+            path.append(name)
+            lookup = prefix + '__'.join(path)
+
+            if relation.one_to_many or relation.many_to_many:
+                queryset = relation.related_model._default_manager.all()
+                if nested is not None:
+                    # Django already points the rows prefetched through a
+                    # reverse foreign key back at their parent.
+                    back = relation.field.name if relation.one_to_many \
+                        else None
+                    queryset = _optimize(queryset, nested, skip=back)
+                prefetch_related.append(Prefetch(lookup, queryset=queryset))
+                break
+
+            select_related.append(lookup)
+            current = relation.related_model
+        else:
+            if path and nested is not None:
+                nested_select, nested_prefetch = _lookups(
+                    nested, current, prefix=lookup + '__'
+                )
+                select_related.extend(nested_select)
+                prefetch_related.extend(nested_prefetch)
+    return select_related, prefetch_related
+
+
+def _apply(queryset, select_related, prefetch_related):
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
+def _optimize(queryset, serializer, skip=None):
+    return _apply(queryset, *_lookups(serializer, queryset.model, skip=skip))
+
+
+@lru_cache(maxsize=None)
+def plan(serializer_class, fields=None):
+    """
+    Derive the select_related and prefetch_related lookups needed by
+    serializer_class from its field tree. Relations read by a field or a
+    dotted source are joined, to-many relations are prefetched with a
+    queryset planned from their nested serializer. fields restricts the
+    plan to a sparse fieldset.
+    """
+    serializer = serializer_class() if fields is None else serializer_class(
+        fields=fields
+    )
+    return _lookups(serializer, serializer_class.Meta.model)
+
+
+def optimize(queryset, serializer_class, fields=None):
+    return _apply(queryset, *plan(serializer_class, fields))
+
+
+class QueryPlanMixin:
+
+    def get_queryset(self):
+        return optimize(super().get_queryset(), self.get_serializer_class())
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from watchlist import models
+from watchlist.api.fieldsets import SparseFieldsSerializerMixin
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -11,12 +12,33 @@ class ReviewSerializer(serializers.ModelSerializer):
         exclude = ('watch_list',)
 
 
-class WatchListSerializer(serializers.ModelSerializer):
+class PendingReviewSerializer(serializers.ModelSerializer):
+    reviewer = serializers.StringRelatedField(read_only=True)
+    pending = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.PendingReview
+        exclude = ('watch_list',)
+
+    def get_pending(self, review):
+        return True
+
+
+class WatchListSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     platform = serializers.CharField(source="platform.name")
 
     class Meta:
         model = models.WatchList
         fields = "__all__"
+        # Kept in step with the reviews by watchlist.aggregates, and by
+        # the purges and the version bumps.
+        read_only_fields = [
+            'average_rating', 'rating_sum', 'number_of_ratings',
+            'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+            'version', 'updated_at', 'hidden',
+        ]
 
     def create(self, validated_data):
         platform = self.context['platform']
@@ -33,9 +55,43 @@ class WatchListSerializer(serializers.ModelSerializer):
         return instance
 
 
-class StreamingPlatformSerializer(serializers.ModelSerializer):
+class StreamingPlatformSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     watchlist = WatchListSerializer(many=True, read_only=True)
 
     class Meta:
         model = models.StreamingPlatform
         fields = "__all__"
+        read_only_fields = ['version', 'updated_at', 'hidden']
+
+
+class PlatformStatsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = models.PlatformStats
+        exclude = ('top_rated_stale',)
+
+
+class PurgeJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.PurgeJob
+        fields = "__all__"
+
+    def get_progress(self, job):
+        total = sum(job.total.values())
+        if job.status == models.PurgeJob.DONE:
+            return 1.0
+        return sum(job.deleted.values()) / total if total else 0.0
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    seq = serializers.IntegerField(source='pk')
+    id = serializers.IntegerField(source='object_id')
+    at = serializers.DateTimeField(source='created_at')
+
+    class Meta:
+        model = models.ChangeEvent
+        fields = ['seq', 'model', 'id', 'action', 'at']
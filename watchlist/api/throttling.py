@@ -1,9 +1,151 @@
-from rest_framework.throttling import UserRateThrottle
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
 
+from django.conf import settings
 
-class ReviewCreateThrottle(UserRateThrottle):
+from rest_framework.throttling import (
+    ScopedRateThrottle, SimpleRateThrottle, UserRateThrottle
+)
+
+
+class TokenBucketStore:
+    """
+    Fixed-size open-addressing table of token buckets kept in a
+    memory-mapped file. Every process that maps the same file shares the
+    buckets; an exclusive flock serialises the read-modify-write of a slot
+    between processes and a lock between the threads of one process.
+    """
+    # key hash, tokens left, time of the last refill, time it is full again
+    slot = struct.Struct('<Qddd')
+    max_probes = 8
+
+    def __init__(self, path, slots):
+        self.slots = slots
+        self.lock = threading.Lock()
+        size = slots * self.slot.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+
+    def _hash(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        # Zero marks an empty slot.
+        return int.from_bytes(digest, 'little') or 1
+
+    def _find(self, key_hash, now):
+        """
+        Return (offset, found, tokens, refilled_at) of the slot for
+        key_hash, or (None, False, None, full_at) when every slot in the
+        probe window holds a bucket that has not refilled yet.
+        """
+        start = key_hash % self.slots
+        free = None
+        earliest = None
+        for probe in range(self.max_probes):
+            offset = (start + probe) % self.slots * self.slot.size
+            stored_hash, tokens, refilled_at, full_at = self.slot.unpack_from(
+                self.map, offset
+            )
+            if stored_hash == key_hash:
+                return offset, True, tokens, refilled_at
+            if stored_hash == 0:
+                return free or (offset, False, None, None)
+            if free is None:
+                # A full bucket can be recycled: its owner would get a full
+                # one back anyway.
+                if full_at <= now:
+                    free = (offset, False, None, None)
+                elif earliest is None or full_at < earliest:
+                    earliest = full_at
+        return free or (None, False, None, earliest)
+
+    def consume(self, key, capacity, refill_rate, now):
+        """
+        Take one token from the bucket of key. Returns (allowed, wait)
+        where wait is the number of seconds until a token is available.
+        """
+        key_hash = self._hash(key)
+        with self.lock:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                offset, found, tokens, refilled_at = self._find(key_hash, now)
+                if offset is None:
+                    # Refuse rather than hand the key a fresh bucket.
+                    return False, max(0, refilled_at - now)
+                if found:
+                    elapsed = max(0, now - refilled_at)
+                    tokens = min(capacity, tokens + elapsed * refill_rate)
+                else:
+                    tokens = capacity
+
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                full_at = now + (capacity - tokens) / refill_rate
+                self.slot.pack_into(
+                    self.map, offset, key_hash, tokens, now, full_at
+                )
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate
+
+
+_stores = {}
+
+
+def get_bucket_store(path):
+    # A flock taken through a descriptor inherited across fork() does not
+    # exclude the other process, so every process opens the file itself.
+    key = (path, os.getpid())
+    if key not in _stores:
+        _stores[key] = TokenBucketStore(path, settings.THROTTLE_BUCKET_SLOTS)
+    return _stores[key]
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Uses a token bucket per cache key in the THROTTLE_BUCKET_FILE shared by
+    every worker on the host, instead of the request history list DRF keeps
+    in the cache. Falls back to DRF's algorithm when no file is configured.
+    """
+
+    def allow_request(self, request, view):
+        path = settings.THROTTLE_BUCKET_FILE
+        if not path:
+            return super().allow_request(request, view)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self.bucket_wait = get_bucket_store(path).consume(
+            self.key,
+            capacity=self.num_requests,
+            refill_rate=self.num_requests / self.duration,
+            now=self.timer()
+        )
+        return allowed
+
+    def wait(self):
+        if not settings.THROTTLE_BUCKET_FILE:
+            return super().wait()
+        return self.bucket_wait
+
+
+class ReviewCreateThrottle(UserRateThrottle, TokenBucketThrottle):
     scope = 'review-create'
 
 
-class ReviewListThrottle(UserRateThrottle):
+class ReviewListThrottle(UserRateThrottle, TokenBucketThrottle):
     scope = 'review'
+
+
+class ReviewDetailThrottle(ScopedRateThrottle, TokenBucketThrottle):
+    pass
@@ -12,11 +12,24 @@ urlpatterns = [
         '<int:pk>/', views.WatchListDetailView.as_view(),
         name="movie_detail"
     ),
+    path('batch/', views.WatchListBatchView.as_view(), name='movie-batch'),
+    path(
+        '<int:pk>/recommendations/', views.MovieRecommendationsView.as_view(),
+        name='movie-recommendations'
+    ),
     path('platform/', views.StreamingPlatFormView.as_view(), name='platform'),
     path(
         "platform/<int:pk>/", views.StreamingPlatformDetailView.as_view(),
         name='platform'
     ),
+    path(
+        'platform/batch/', views.StreamingPlatformBatchView.as_view(),
+        name='platform-batch'
+    ),
+    path(
+        "platform/<int:pk>/stats/", views.PlatformStatsView.as_view(),
+        name='platform-stats'
+    ),
     path(
         '<int:pk>/review-create/', views.ReviewCreate.as_view(),
         name="review-create"
@@ -29,7 +42,30 @@ urlpatterns = [
         'review-detail/<int:pk>/', views.ReviewDetail.as_view(),
         name="review-detail"
     ),
+    path(
+        'review-queue/', views.ReviewQueueView.as_view(),
+        name='review-queue'
+    ),
+    path(
+        'purge-jobs/<int:pk>/', views.PurgeJobView.as_view(),
+        name='purge-job'
+    ),
+    path('changes/', views.ChangeFeedView.as_view(), name='changes'),
     path('', include(router.urls)),
     path('filter-movie', views.FilterMovie.as_view(), name='filter-movie'),
-    path('search-movie', views.SearchMovie.as_view(), name='search-movie')
+    path('search-movie', views.SearchMovie.as_view(), name='search-movie'),
+    path(
+        'autocomplete/', views.AutocompleteView.as_view(),
+        name='autocomplete'
+    ),
+    path('export/', views.CatalogExportView.as_view(), name='export'),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path(
+        'autocomplete-stats/', views.AutocompleteStatsView.as_view(),
+        name='autocomplete-stats'
+    ),
+    path(
+        'profile-stats/', views.ProfileStatsView.as_view(),
+        name='profile-stats'
+    )
 ]
@@ -1,34 +1,95 @@
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
 
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import generics, viewsets
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.throttling import ScopedRateThrottle
-from rest_framework import filters
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
+from watchlist import aggregates
+from watchlist import autocomplete
+from watchlist import changes
+from watchlist import ingestion
 from watchlist import models
+from watchlist import purge
+from watchlist import recommendations
 from watchlist.api import serializers
 from watchlist.api import permissions
 from watchlist.api import throttling
 from watchlist.api import pagination
-
-
-class WatchListView(APIView):
+from watchlist.api import batch
+from watchlist.api import cache
+from watchlist.api import conditional
+from watchlist.api import export
+from watchlist.api import facets
+from watchlist.api import fieldsets
+from watchlist.api import filters
+from watchlist.api import budget
+from watchlist.api import queryplan
+from watchlist.api import profiling
+
+
+def purge_accepted(job):
+    # The object is hidden already, manage.py run_purges deletes it.
+    return Response(
+        serializers.PurgeJobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('purge-job', args=(job.pk,))}
+    )
+
+
+def violates(error, model, name):
+    """
+    Whether an IntegrityError comes from the unique constraint name of
+    model. SQLite reports the constrained columns instead of the name.
+    """
+    constraint = next(
+        constraint for constraint in model._meta.constraints
+        if constraint.name == name
+    )
+    table = model._meta.db_table
+    columns = ', '.join(
+        f'{table}.{model._meta.get_field(field).column}'
+        for field in constraint.fields
+    )
+    return name in str(error) or str(error).endswith(columns)
+
+
+class WatchListView(budget.QueryBudgetMixin, APIView):
 
     permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 3}
 
+    @cache.cache_response('watchlist')
     def get(self, request):
-        movies = models.WatchList.objects.all()
+        fieldset = fieldsets.Fieldset(
+            request, serializers.WatchListSerializer
+        )
+        movies = fieldset.optimize(models.WatchList.objects.all())
+        if fieldset.columns is not None:
+            movies = fieldset.project(movies)
+        if pagination.keyset_requested(request):
+            paginator = pagination.KeysetPagination()
+            result_page = paginator.paginate_queryset(
+                queryset=movies, request=request, view=self
+            )
+            return paginator.get_paginated_response(
+                fieldset.data(result_page)
+            )
+
         paginator = pagination.WatchListPagination()
         result_page = paginator.paginate_queryset(
             queryset=movies, request=request
         )
-        serializer = serializers.WatchListSerializer(result_page, many=True)
-        return Response(serializer.data)
+        return Response(fieldset.data(result_page))
 
     def post(self, request):
         try:
@@ -53,13 +114,19 @@ class WatchListView(APIView):
         )
 
 
-class WatchListDetailView(APIView):
+class WatchListDetailView(budget.QueryBudgetMixin, APIView):
 
     permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 3}
 
+    @conditional.condition(conditional.movie_validators)
+    @cache.cache_response('watchlist:{pk}')
     def get(self, request, pk):
         try:
-            movie = models.WatchList.objects.get(pk=pk)
+            movie = queryplan.optimize(
+                models.WatchList.objects.all(),
+                serializers.WatchListSerializer
+            ).get(pk=pk)
         except models.WatchList.DoesNotExist:
             return Response(
                 {"error": "Movie does not exist"},
@@ -96,18 +163,73 @@ class WatchListDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        movie.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return purge_accepted(purge.hide_movie(movie))
 
 
-class StreamingPlatFormView(APIView):
+class WatchListBatchView(budget.QueryBudgetMixin, APIView):
 
     permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 3}
 
+    @conditional.condition(conditional.movie_batch_validators)
+    @cache.cache_response('watchlist')
     def get(self, request):
-        movies = models.StreamingPlatform.objects.all()
-        serializer = serializers.StreamingPlatformSerializer(movies, many=True)
-        return Response(serializer.data)
+        return batch.respond(
+            request, models.WatchList.objects.all(),
+            serializers.WatchListSerializer
+        )
+
+
+class MovieRecommendationsView(budget.QueryBudgetMixin, APIView):
+
+    permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 3}
+
+    def get(self, request, pk):
+        index = recommendations.get_index(settings.RECOMMENDATIONS_INDEX)
+        if index is None:
+            return Response(
+                {"error": "Recommendations are not built yet"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        similar = index.neighbours(pk)
+        movies = queryplan.optimize(
+            models.WatchList.objects.filter(active=True),
+            serializers.WatchListSerializer
+        ).in_bulk([movie_id for movie_id, _ in similar])
+        if not similar and not models.WatchList.objects.filter(
+            pk=pk
+        ).exists():
+            return Response(
+                {"error": "Movie does not exist"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response([
+            dict(
+                serializers.WatchListSerializer(movies[movie_id]).data,
+                similarity=score
+            )
+            for movie_id, score in similar
+            if movie_id in movies
+        ])
+
+
+class StreamingPlatFormView(budget.QueryBudgetMixin, APIView):
+
+    permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 3}
+
+    @cache.cache_response('platform')
+    def get(self, request):
+        fieldset = fieldsets.Fieldset(
+            request, serializers.StreamingPlatformSerializer
+        )
+        platforms = fieldset.optimize(models.StreamingPlatform.objects.all())
+        if fieldset.columns is not None:
+            platforms = fieldset.project(platforms)
+        return Response(fieldset.data(platforms))
 
     def post(self, request):
         serializer = serializers.StreamingPlatformSerializer(data=request.data)
@@ -117,13 +239,19 @@ class StreamingPlatFormView(APIView):
         return Response(serializer.errors)
 
 
-class StreamingPlatformDetailView(APIView):
+class StreamingPlatformDetailView(budget.QueryBudgetMixin, APIView):
 
     permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 4}
 
+    @conditional.condition(conditional.platform_validators)
+    @cache.cache_response('platform:{pk}')
     def get(self, request, pk):
         try:
-            platform = models.StreamingPlatform.objects.get(pk=pk)
+            platform = queryplan.optimize(
+                models.StreamingPlatform.objects.all(),
+                serializers.StreamingPlatformSerializer
+            ).get(pk=pk)
         except models.StreamingPlatform.DoesNotExist:
             return Response(
                 {"error": "Platform does not exist"},
@@ -155,15 +283,48 @@ class StreamingPlatformDetailView(APIView):
 
     def delete(self, request, pk):
         try:
-            movie = models.StreamingPlatform.objects.get(pk=pk)
+            platform = models.StreamingPlatform.objects.get(pk=pk)
         except models.StreamingPlatform.DoesNotExist:
             return Response(
                 {"error": "Platform does not exist"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        movie.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return purge_accepted(purge.hide_platform(platform))
+
+
+class StreamingPlatformBatchView(budget.QueryBudgetMixin, APIView):
+
+    permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 4}
+
+    @conditional.condition(conditional.platform_batch_validators)
+    @cache.cache_response('platform')
+    def get(self, request):
+        return batch.respond(
+            request, models.StreamingPlatform.objects.all(),
+            serializers.StreamingPlatformSerializer
+        )
+
+
+class PlatformStatsView(budget.QueryBudgetMixin, APIView):
+
+    permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 2}
+
+    def get(self, request, pk):
+        try:
+            stats = models.PlatformStats.objects.get(
+                pk=pk, platform__hidden=False
+            )
+        except models.PlatformStats.DoesNotExist:
+            return Response(
+                {"error": "Platform does not exist"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = serializers.PlatformStatsSerializer(stats)
+        return Response(serializer.data)
 
 
 class ReviewCreate(generics.CreateAPIView):
@@ -174,66 +335,340 @@ class ReviewCreate(generics.CreateAPIView):
     def get_queryset(self):
         return models.Review.objects.all()
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        if not settings.REVIEW_QUEUE:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         pk = self.kwargs['pk']
-        try:
-            watch_list = models.WatchList.objects.get(id=pk)
-        except models.WatchList.DoesNotExist:
+        reviewed = ingestion.check(pk, request.user.id)
+        if reviewed is None:
             raise ValidationError("Movie does not exists !")
-
-        user = self.request.user
-        review = models.Review.objects.filter(
-            watch_list=watch_list, reviewer=user
-        )
-        if review.exists():
+        if reviewed:
             raise ValidationError("You have already reviewed this movie")
+        try:
+            pending = ingestion.enqueue(
+                pk, request.user.id, serializer.validated_data
+            )
+        except IntegrityError as error:
+            if not violates(
+                error, models.PendingReview,
+                'unique_pending_review_per_reviewer'
+            ):
+                raise
+            raise ValidationError("You have already reviewed this movie")
+        return Response(
+            serializers.PendingReviewSerializer(pending).data,
+            status=status.HTTP_202_ACCEPTED
+        )
 
-        if watch_list.number_of_ratings == 0:
-            watch_list.average_rating = serializer.validated_data['ratings']
-        else:
-            watch_list.average_rating = (
-                watch_list.average_rating +
-                serializer.validated_data['ratings']
-            ) / 2
-        watch_list.number_of_ratings += 1
-        watch_list.save()
-
-        serializer.save(watch_list=watch_list, reviewer=user)
+    def perform_create(self, serializer):
+        pk = self.kwargs['pk']
+        # request.user is a claims-only TokenUser for JWT clients, so the
+        # reviewer is always referenced by id. The aggregate UPDATE doubles
+        # as the existence check of the movie and the unique constraint on
+        # (watch_list, reviewer) rejects a second review.
+        try:
+            with transaction.atomic():
+                if not aggregates.add_rating(
+                    pk, serializer.validated_data['ratings']
+                ):
+                    raise ValidationError("Movie does not exists !")
+                serializer.save(
+                    watch_list_id=pk, reviewer_id=self.request.user.id
+                )
+        except IntegrityError as error:
+            if not violates(
+                error, models.Review, 'unique_review_per_reviewer'
+            ):
+                raise
+            raise ValidationError("You have already reviewed this movie")
 
 
-class ReviewList(generics.ListAPIView):
+class ReviewList(budget.QueryBudgetMixin, generics.ListAPIView):
     serializer_class = serializers.ReviewSerializer
     throttle_classes = [throttling.ReviewListThrottle]
+    query_budgets = {'get': 3}
 
     def get_queryset(self):
         pk = self.kwargs['pk']
-        return models.Review.objects.filter(watch_list=pk)
-
+        return queryplan.optimize(
+            models.Review.objects.filter(watch_list=pk),
+            self.get_serializer_class()
+        )
 
-class ReviewDetail(generics.RetrieveUpdateDestroyAPIView):
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not settings.REVIEW_QUEUE or not request.user.is_authenticated:
+            return response
+
+        # Read-your-writes: the author sees their queued review, newest
+        # first on the first keyset page, last in the plain list.
+        if self.paginator is None:
+            response.data.extend(self._pending(request))
+        elif not request.query_params.get(self.paginator.cursor_query_param):
+            response.data['results'][:0] = self._pending(request)
+        return response
+
+    def _pending(self, request):
+        pending = models.PendingReview.objects.filter(
+            watch_list=self.kwargs['pk'], reviewer=request.user.id
+        ).select_related('reviewer')
+        return serializers.PendingReviewSerializer(pending, many=True).data
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if pagination.keyset_requested(self.request):
+                self._paginator = pagination.KeysetPagination()
+            else:
+                self._paginator = None
+        return self._paginator
+
+
+class ReviewDetail(
+    budget.QueryBudgetMixin, queryplan.QueryPlanMixin,
+    generics.RetrieveUpdateDestroyAPIView
+):
     queryset = models.Review.objects.all()
     serializer_class = serializers.ReviewSerializer
     permission_classes = [permissions.IsReviewUserOrReadOnly]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [throttling.ReviewDetailThrottle]
     throttle_scope = 'review-detail'
+    query_budgets = {'get': 2}
+
+    def _locked_rating(self, review):
+        # The rating as committed, not as read before the transaction, so
+        # concurrent writes to the review never apply the same delta twice.
+        return models.Review.objects.select_for_update().filter(
+            pk=review.pk
+        ).values_list('ratings', flat=True).first()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            old_rating = self._locked_rating(serializer.instance)
+            if old_rating is None:
+                raise NotFound()
+            review = serializer.save()
+            aggregates.change_rating(
+                review.watch_list_id, old_rating, review.ratings
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            rating = self._locked_rating(instance)
+            if rating is None:
+                return
+            instance.delete()
+            aggregates.remove_rating(instance.watch_list_id, rating)
 
 
-class StreamPlatformAV(viewsets.ModelViewSet):
+class StreamPlatformAV(
+    budget.QueryBudgetMixin, fieldsets.SparseFieldsMixin,
+    viewsets.ModelViewSet
+):
     queryset = models.StreamingPlatform.objects.all()
     serializer_class = serializers.StreamingPlatformSerializer
     permission_classes = [permissions.IsAdminOrReadOnly]
+    query_budgets = {'get': 3}
+
+    @cache.cache_response('platform')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache.cache_response('platform:{pk}')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
+    def destroy(self, request, *args, **kwargs):
+        return purge_accepted(purge.hide_platform(self.get_object()))
 
-class FilterMovie(generics.ListAPIView):
+
+class FilterMovie(
+    budget.QueryBudgetMixin, facets.FacetsMixin,
+    fieldsets.SparseFieldsMixin, generics.ListAPIView
+):
     queryset = models.WatchList.objects.all()
     serializer_class = serializers.WatchListSerializer
+    query_budgets = {'get': 4}
     pagination_class = pagination.WatchListLimitOffsetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['title', 'platform__name']
 
 
-class SearchMovie(generics.ListAPIView):
+class SearchMovie(
+    budget.QueryBudgetMixin, facets.FacetsMixin,
+    fieldsets.SparseFieldsMixin, generics.ListAPIView
+):
     queryset = models.WatchList.objects.all()
     serializer_class = serializers.WatchListSerializer
-    filter_backends = [filters.SearchFilter]
+    query_budgets = {'get': 3}
+    filter_backends = [filters.FullTextSearchFilter]
     search_fields = ['title', 'platform__name']
+
+
+class AutocompleteView(budget.QueryBudgetMixin, APIView):
+    """
+    Platforms and movies for ?q=, served from the in-memory index. Up to
+    ?limit= entries having words that start with the typed ones, then the
+    closest fuzzy matches.
+    """
+
+    query_budgets = {'get': 5}
+
+    def get(self, request):
+        limit = request.query_params.get('limit')
+        if limit is None:
+            limit = settings.AUTOCOMPLETE_LIMIT
+        elif limit.isdigit() and int(limit) > 0:
+            limit = min(int(limit), settings.AUTOCOMPLETE_MAX_LIMIT)
+        else:
+            raise ValidationError({'limit': ["Must be a positive integer"]})
+
+        matches = autocomplete.index.search(
+            request.query_params.get('q', ''), limit
+        )
+        return Response({"results": [
+            {"type": kind, "id": pk, "label": label, "match": match,
+             "score": score}
+            for kind, pk, label, match, score in matches
+        ]})
+
+
+class ReviewQueueView(budget.QueryBudgetMixin, APIView):
+
+    permission_classes = [IsAdminUser]
+    query_budgets = {'get': 2}
+
+    def get(self, request):
+        return Response(ingestion.status())
+
+
+class PurgeJobView(budget.QueryBudgetMixin, APIView):
+
+    permission_classes = [IsAdminUser]
+    query_budgets = {'get': 2}
+
+    def get(self, request, pk):
+        try:
+            job = models.PurgeJob.objects.get(pk=pk)
+        except models.PurgeJob.DoesNotExist:
+            return Response(
+                {"error": "Purge job does not exist"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(serializers.PurgeJobSerializer(job).data)
+
+
+class ChangeFeedView(budget.QueryBudgetMixin, APIView):
+    """
+    Events after ?since=<seq>, oldest first. Follow next until it is null,
+    then poll again from last_seq. A since older than the last compaction
+    answers 410 and the reader has to resync from export/.
+    """
+
+    permission_classes = [IsAuthenticated]
+    query_budgets = {'get': 3}
+
+    def _parameter(self, name, default):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        if not value.isdigit():
+            raise ValidationError({name: ["Must be a non-negative integer"]})
+        return int(value)
+
+    def get(self, request):
+        since = self._parameter('since', 0)
+        limit = min(
+            self._parameter('limit', settings.CHANGE_FEED_PAGE_SIZE) or 1,
+            settings.CHANGE_FEED_MAX_PAGE_SIZE
+        )
+        if since < changes.horizon():
+            return Response(
+                {"error": "Changes since this sequence number were "
+                          "compacted, resync from the export"},
+                status=status.HTTP_410_GONE
+            )
+
+        # One extra row tells whether another page follows.
+        events = list(models.ChangeEvent.objects.filter(
+            pk__gt=since
+        ).order_by('pk')[:limit + 1])
+        more = len(events) > limit
+        events = events[:limit]
+        last_seq = events[-1].pk if events else since
+        next_url = None
+        if more:
+            next_url = request.build_absolute_uri(
+                f"{reverse('changes')}?since={last_seq}&limit={limit}"
+            )
+        return Response({
+            "results": serializers.ChangeEventSerializer(
+                events, many=True
+            ).data,
+            "last_seq": last_seq,
+            "next": next_url,
+        })
+
+
+class CatalogExportView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        updated_since = request.query_params.get('updated_since')
+        if updated_since is not None:
+            try:
+                updated_since = parse_datetime(updated_since)
+            except ValueError:
+                updated_since = None
+            if updated_since is None:
+                return Response(
+                    {"error": "updated_since must be an ISO 8601 datetime"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(updated_since):
+                updated_since = timezone.make_aware(updated_since)
+
+        include_reviews = request.query_params.get('reviews') in (
+            '1', 'true'
+        )
+        return StreamingHttpResponse(
+            export.stream_catalog(
+                updated_since=updated_since, include_reviews=include_reviews
+            ),
+            content_type='application/x-ndjson'
+        )
+
+
+class CacheStatsView(APIView):
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        hits, misses = cache.stats['hits'], cache.stats['misses']
+        lookups = hits + misses
+        return Response({
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else None
+        })
+
+
+class AutocompleteStatsView(APIView):
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(autocomplete.index.stats())
+
+
+class ProfileStatsView(APIView):
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(profiling.stats())
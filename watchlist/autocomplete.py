@@ -0,0 +1,471 @@
+import bisect
+import itertools
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Max
+
+from watchlist import models
+
+MOVIE = models.ChangeEvent.MOVIE
+PLATFORM = models.ChangeEvent.PLATFORM
+
+# Longer query words are looked up by their first PREFIX_LENGTH characters
+# and checked against the words of each entry.
+PREFIX_LENGTH = 8
+# Spellings tried per query word, and combinations of them per query.
+CORRECTIONS = 3
+COMBINATIONS = 9
+# Candidates checked one by one before the rest are intersected at once.
+WALK = 256
+
+# An entry is an int, its pk shifted left once with the low bit set for
+# platforms. Its rank adds the label length above KEY_BITS, so the rank
+# arrays list shorter labels first.
+KEY_BITS = 40
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def _key(kind, pk):
+    return pk << 1 | (kind == PLATFORM)
+
+
+def _kind(key):
+    return (PLATFORM if key & 1 else MOVIE), key >> 1
+
+
+def _contains(ranks, rank):
+    index = bisect.bisect_left(ranks, rank)
+    return index < len(ranks) and ranks[index] == rank
+
+
+def normalize(text):
+    """
+    Lower case words of text without their diacritics, e.g.
+    'Amélie 2' -> ['amelie', '2'].
+    """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text.lower())
+
+
+def trigrams(word):
+    # Padded like pg_trgm, so short words and word starts weigh in.
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def distance(a, b, limit):
+    """
+    Edits, adjacent transpositions included, turning a into b, or
+    limit + 1 once it is certain to be over limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1])
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] \
+                    and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+def _size(value, seen):
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            _size(key, seen) + _size(item, seen)
+            for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_size(item, seen) for item in value)
+    return size
+
+
+class Index:
+    """
+    Platform names and movie titles of this process, searched without
+    touching the database. Every prefix of every word maps to the entries
+    having such a word in rank order, so a query reads candidates best
+    first and stops at its limit. A typo is corrected against the words
+    of the index, found through their trigrams, before the corrected
+    query is looked up the same way.
+
+    Model signals keep the index in step with the writes of this process.
+    Writes of other processes, and the hides and purges that go around
+    model signals, are read back from the change log every
+    AUTOCOMPLETE_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held by the one thread reading the change log.
+        self._refreshing = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.labels = {}
+            self.words = {}
+            # prefix -> ranks of the entries with a word starting with it,
+            # and of those whose first word does.
+            self.prefixes = {}
+            self.leading = {}
+            # word -> number of entries using it, trigram -> words
+            self.vocabulary = Counter()
+            self.postings = {}
+            self.last_seq = None
+            self.refreshed_at = None
+            self.build_seconds = None
+
+    # Writing
+
+    def _rank(self, key):
+        return len(self.labels[key]) << KEY_BITS | key
+
+    @staticmethod
+    def _prefixes(words):
+        return {
+            word[:length] for word in words
+            for length in range(1, min(len(word), PREFIX_LENGTH) + 1)
+        }
+
+    def _entries(self, key):
+        words = self.words[key]
+        yield self.prefixes, self._prefixes(words)
+        yield self.leading, self._prefixes(words[:1])
+
+    def _remove(self, key):
+        if key not in self.labels:
+            return
+        rank = self._rank(key)
+        for table, prefixes in self._entries(key):
+            for prefix in prefixes:
+                ranks = table[prefix]
+                del ranks[bisect.bisect_left(ranks, rank)]
+                if not ranks:
+                    del table[prefix]
+        for word in set(self.words[key]):
+            self.vocabulary[word] -= 1
+            if not self.vocabulary[word]:
+                del self.vocabulary[word]
+                for gram in trigrams(word):
+                    self.postings[gram].discard(word)
+                    if not self.postings[gram]:
+                        del self.postings[gram]
+        del self.labels[key]
+        del self.words[key]
+
+    def _add(self, key, label, keep_sorted=True):
+        self._remove(key)
+        self.labels[key] = label
+        self.words[key] = tuple(normalize(label))
+        rank = self._rank(key)
+        for table, prefixes in self._entries(key):
+            for prefix in prefixes:
+                ranks = table.setdefault(prefix, array('q'))
+                if keep_sorted:
+                    bisect.insort(ranks, rank)
+                else:
+                    ranks.append(rank)
+        for word in set(self.words[key]):
+            if not self.vocabulary[word]:
+                for gram in trigrams(word):
+                    self.postings.setdefault(gram, set()).add(word)
+            self.vocabulary[word] += 1
+
+    def _update(self, key, label):
+        # Most logged updates and saves leave the label as it was.
+        if self.labels.get(key) != label:
+            self._add(key, label)
+
+    def put(self, kind, pk, label):
+        with self._lock:
+            if self.last_seq is not None:
+                self._update(_key(kind, pk), label)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._remove(_key(kind, pk))
+
+    def _load(self, kind, pks=None):
+        if kind == MOVIE:
+            rows = models.WatchList.objects.values_list('pk', 'title')
+        else:
+            rows = models.StreamingPlatform.objects.values_list('pk', 'name')
+        if pks is None:
+            return rows.iterator(chunk_size=10000)
+        return rows.filter(pk__in=pks)
+
+    def build(self):
+        """
+        Load every visible platform and movie, replacing what was there.
+        Searches keep using the old entries until the new ones are in.
+        """
+        started = time.perf_counter()
+        # Changes made while loading are replayed by the next refresh.
+        last_seq = models.ChangeEvent.objects.aggregate(
+            last=Max('pk')
+        )['last'] or 0
+        fresh = Index()
+        for kind in (PLATFORM, MOVIE):
+            for pk, label in self._load(kind):
+                # insort on every row would be quadratic.
+                fresh._add(_key(kind, pk), label, keep_sorted=False)
+        for table in (fresh.prefixes, fresh.leading):
+            for prefix, ranks in table.items():
+                table[prefix] = array('q', sorted(ranks))
+        with self._lock:
+            for name in (
+                'labels', 'words', 'prefixes', 'leading', 'vocabulary',
+                'postings'
+            ):
+                setattr(self, name, getattr(fresh, name))
+            self.last_seq = last_seq
+            self.refreshed_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+
+    def refresh(self):
+        """
+        Apply the changes logged since the last build or refresh, at most
+        every AUTOCOMPLETE_REFRESH_INTERVAL seconds and one page of
+        AUTOCOMPLETE_REFRESH_BATCH_SIZE events per call. One thread
+        refreshes while the others search the index as it is.
+        """
+        if self.last_seq is not None and time.monotonic() - \
+                self.refreshed_at < settings.AUTOCOMPLETE_REFRESH_INTERVAL:
+            return
+        # Before the first build there is nothing to search, wait for it.
+        if not self._refreshing.acquire(blocking=self.last_seq is None):
+            return
+        try:
+            self._catch_up()
+        finally:
+            self._refreshing.release()
+
+    def _catch_up(self):
+        now = time.monotonic()
+        if self.last_seq is None or now - self.refreshed_at > \
+                settings.CHANGE_LOG_TOMBSTONE_DAYS * 86400:
+            # Deletes logged after last_seq may have been compacted away.
+            self.build()
+            return
+        if now - self.refreshed_at < settings.AUTOCOMPLETE_REFRESH_INTERVAL:
+            return
+
+        latest = models.ChangeEvent.objects.aggregate(
+            last=Max('pk')
+        )['last'] or 0
+        if latest - self.last_seq > settings.AUTOCOMPLETE_REBUILD_BACKLOG:
+            # Bulk jobs such as rebuild_ratings log an update per movie.
+            self.build()
+            return
+        if latest > self.last_seq:
+            batch_size = settings.AUTOCOMPLETE_REFRESH_BATCH_SIZE
+            events = list(models.ChangeEvent.objects.filter(
+                pk__gt=self.last_seq
+            ).order_by('pk').values_list('pk', 'model', 'object_id')[
+                :batch_size
+            ])
+            if events:
+                self._apply(events)
+            if len(events) == batch_size:
+                # The next calls carry on until the index caught up.
+                return
+        with self._lock:
+            self.last_seq = max(self.last_seq, latest)
+            self.refreshed_at = now
+
+    def _apply(self, events):
+        changed = {PLATFORM: set(), MOVIE: set()}
+        for _, kind, pk in events:
+            if kind in changed:
+                changed[kind].add(pk)
+        found = {
+            kind: dict(self._load(kind, pks))
+            for kind, pks in changed.items() if pks
+        }
+        with self._lock:
+            for kind, labels in found.items():
+                for pk in changed[kind]:
+                    if pk in labels:
+                        self._update(_key(kind, pk), labels[pk])
+                    else:
+                        self._remove(_key(kind, pk))
+            self.last_seq = events[-1][0]
+
+    # Reading
+
+    def _lookup(self, query, limit, found, leading):
+        """
+        Up to limit more keys, best first, of the entries not in found
+        with a word starting with every query word. With leading they
+        have to start with the query as well.
+        """
+        lists = [
+            self.prefixes.get(word[:PREFIX_LENGTH], ())
+            for word in set(query[1:] if leading else query)
+        ]
+        if leading:
+            # Only entries with a first word starting with query[0].
+            lists.append(self.leading.get(query[0][:PREFIX_LENGTH], ()))
+        lists.sort(key=len)
+        ranks, others = lists[0], lists[1:]
+        long_words = [word for word in query if len(word) > PREFIX_LENGTH]
+        phrase = None
+        if leading and (len(query) > 1 or long_words):
+            phrase = ' '.join(query)
+
+        def candidates():
+            # Binary search the other lists for the first entries, words
+            # often found together are done by then. Rarer combinations
+            # are intersected in C, except for the leading pass, which
+            # only moves the best of the entries it would find forward.
+            for rank in ranks[:WALK]:
+                if all(_contains(other, rank) for other in others):
+                    yield rank
+            if len(ranks) > WALK and not leading:
+                yield from sorted(set(ranks[WALK:]).intersection(*others))
+
+        keys = []
+        for rank in candidates():
+            key = rank & KEY_MASK
+            if key in found:
+                continue
+            words = self.words[key]
+            if phrase and not ' '.join(words).startswith(phrase):
+                continue
+            if all(
+                any(word.startswith(prefix) for word in words)
+                for prefix in long_words
+            ):
+                keys.append(key)
+                if len(keys) == limit:
+                    break
+        return keys
+
+    def _corrections(self, word, last):
+        """
+        [(spelling, similarity), ...] for word: the word itself when it
+        starts a word of the index, then the closest words of the index
+        within AUTOCOMPLETE_MIN_SIMILARITY. The last query word may still
+        be being typed and is compared to word starts.
+        """
+        spellings = []
+        if word[:PREFIX_LENGTH] in self.prefixes:
+            spellings.append((word, 1.0))
+        limit = int(len(word) * (1 - settings.AUTOCOMPLETE_MIN_SIMILARITY))
+        if not limit or word.isdigit():
+            return spellings
+
+        # Every edit changes at most three trigrams, one more is lost to
+        # the padding when comparing to a word start. A close word shares
+        # the rest, so one of the rarest that many plus one.
+        grams = sorted(
+            trigrams(word), key=lambda gram: len(self.postings.get(gram, ()))
+        )
+        rarest = grams[:3 * limit + last + 1]
+        close = set()
+        for candidate in set().union(
+            *(self.postings.get(gram, ()) for gram in rarest)
+        ):
+            # A start of the word as long as the typed one, give or take
+            # the edits allowed.
+            starts = [candidate]
+            if last:
+                starts = {
+                    candidate[:length] for length in range(
+                        max(1, len(word) - limit), len(word) + limit + 1
+                    )
+                }
+            for start in starts:
+                edits = distance(word, start, limit)
+                if 0 < edits <= limit:
+                    close.add((edits, start))
+        for edits, candidate in sorted(close)[:CORRECTIONS]:
+            spellings.append((candidate, 1 - edits / len(word)))
+        return spellings[:CORRECTIONS]
+
+    def search(self, text, limit):
+        """
+        Up to limit (kind, id, label, match, score) for text, entries with
+        words starting with every query word first, starting with the
+        query and shortest first, then the same for corrected spellings of
+        the query, closest first.
+        """
+        self.refresh()
+        query = normalize(text)
+        if not query:
+            return []
+
+        with self._lock:
+            found = {}
+            for leading in (True, False):
+                for key in self._lookup(
+                    query, limit - len(found), found, leading
+                ):
+                    found[key] = ('prefix', 1.0)
+                if len(found) == limit:
+                    break
+
+            if len(found) < limit:
+                spellings = [
+                    self._corrections(word, index == len(query) - 1)
+                    for index, word in enumerate(query)
+                ]
+                combinations = sorted(
+                    (
+                        -sum(score for _, score in combination) / len(query),
+                        [spelling for spelling, _ in combination]
+                    )
+                    for combination in itertools.product(*spellings)
+                )
+                for score, corrected in combinations[:COMBINATIONS]:
+                    if len(found) == limit:
+                        break
+                    if corrected == query:
+                        continue
+                    for key in self._lookup(
+                        corrected, limit - len(found), found, False
+                    ):
+                        found[key] = ('fuzzy', round(-score, 3))
+
+            return [
+                (*_kind(key), self.labels[key], match, score)
+                for key, (match, score) in found.items()
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self.labels),
+                'words': len(self.vocabulary),
+                'prefixes': len(self.prefixes),
+                'memory_bytes': _size(
+                    (self.labels, self.words, self.prefixes, self.leading,
+                     self.vocabulary, self.postings),
+                    set()
+                ),
+                'last_seq': self.last_seq,
+                'build_seconds': self.build_seconds,
+            }
+
+
+index = Index()
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from watchlist import models
+
+TABLE = models.ChangeEvent._meta.db_table
+
+# Tables followed by the feed, with the model name the feed reports and
+# whether the table has the hidden flag a pending purge sets.
+SOURCES = {
+    'watchlist_streamingplatform': (models.ChangeEvent.PLATFORM, True),
+    'watchlist_watchlist': (models.ChangeEvent.MOVIE, True),
+    'watchlist_review': (models.ChangeEvent.REVIEW, False),
+}
+
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _trigger(table, model, event, action, row):
+    name = f'watchlist_change_{model}_{event.lower()}'
+    return name, f"""
+        CREATE TRIGGER IF NOT EXISTS {name}
+        AFTER {event} ON {table} BEGIN
+            INSERT INTO {TABLE} (model, object_id, action, created_at)
+            VALUES ('{model}', {row}.id, {action}, {NOW});
+        END
+    """
+
+
+def _triggers():
+    # Like the search index triggers these see bulk_create, queryset
+    # updates and raw deletes, and have to be reinstalled after migrate.
+    # Hiding a row for a purge is reported as its delete.
+    triggers = {}
+    for table, (model, hideable) in SOURCES.items():
+        update = (
+            "CASE WHEN new.hidden THEN 'delete' ELSE 'update' END"
+            if hideable else "'update'"
+        )
+        for event, action, row in (
+            ('INSERT', "'insert'", 'new'),
+            ('UPDATE', update, 'new'),
+            ('DELETE', "'delete'", 'old'),
+        ):
+            name, sql = _trigger(table, model, event, action, row)
+            triggers[name] = sql
+    return triggers
+
+
+TRIGGERS = _triggers()
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def log_exists(connection):
+    return TABLE in connection.introspection.table_names()
+
+
+def install_triggers(connection):
+    with connection.cursor() as cursor:
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+
+
+def drop_triggers(connection):
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def horizon():
+    """
+    The sequence number feeds have to be past to read on, 0 until a
+    compaction expired deletes.
+    """
+    return models.ChangeCompaction.objects.aggregate(
+        horizon=Max('expired_through')
+    )['horizon'] or 0
+
+
+def _coalesce(cursor, low, high):
+    # Only the latest event of an object matters to a feed reader, who
+    # fetches the object as it is now.
+    cursor.execute(
+        f"""
+        DELETE FROM {TABLE} WHERE id > %s AND id <= %s AND EXISTS (
+            SELECT 1 FROM {TABLE} AS newer
+            WHERE newer.model = {TABLE}.model
+            AND newer.object_id = {TABLE}.object_id
+            AND newer.id > {TABLE}.id
+        )
+        """,
+        [low, high]
+    )
+    return cursor.rowcount
+
+
+def compact(chunk_size=1000, tombstone_days=30, using='default'):
+    """
+    Keep the log bounded: drop every event superseded by a later one for
+    the same object, then the deletes older than tombstone_days. Works
+    through the log chunk_size sequence numbers per transaction and
+    returns the ChangeCompaction recorded.
+    """
+    connection = connections[using]
+    events = models.ChangeEvent.objects.using(using)
+    last = events.aggregate(last=Max('pk'))['last'] or 0
+    coalesced = 0
+    low = 0
+    while low < last:
+        high = min(low + chunk_size, last)
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            coalesced += _coalesce(cursor, low, high)
+        low = high
+
+    cutoff = timezone.now() - timedelta(days=tombstone_days)
+    tombstones = events.filter(
+        action=models.ChangeEvent.DELETE, created_at__lt=cutoff, pk__lte=last
+    )
+    expired_through = tombstones.aggregate(
+        through=Max('pk')
+    )['through'] or 0
+    expired = 0
+    while True:
+        with transaction.atomic(using=using):
+            chunk = list(tombstones.values_list('pk', flat=True)[
+                :chunk_size
+            ])
+            expired += events.filter(pk__in=chunk).delete()[0]
+        if len(chunk) < chunk_size:
+            break
+
+    return models.ChangeCompaction.objects.using(using).create(
+        coalesced=coalesced, expired=expired,
+        expired_through=expired_through
+    )
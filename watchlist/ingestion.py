@@ -0,0 +1,111 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Exists, Min, OuterRef
+from django.utils import timezone
+
+from watchlist import aggregates
+from watchlist import models
+from watchlist.api import cache
+
+
+def check(watch_list_id, reviewer_id):
+    """
+    None when the movie does not exist, otherwise whether the reviewer
+    already reviewed it, in one query.
+    """
+    return models.WatchList.objects.filter(pk=watch_list_id).annotate(
+        reviewed=Exists(models.Review.objects.filter(
+            watch_list=OuterRef('pk'), reviewer=reviewer_id
+        ))
+    ).values_list('reviewed', flat=True).first()
+
+
+def enqueue(watch_list_id, reviewer_id, validated_data):
+    # The unique constraint rejects a second pending review.
+    with transaction.atomic():
+        return models.PendingReview.objects.create(
+            watch_list_id=watch_list_id, reviewer_id=reviewer_id,
+            **validated_data
+        )
+
+
+def drain_batch(batch_size):
+    """
+    Turn the oldest batch_size pending reviews into reviews with one
+    bulk insert and one aggregate update per movie, all in a single
+    transaction. Returns the number of pending reviews taken off the
+    queue, including any dropped because the review exists already or
+    the movie is hidden for a purge.
+    """
+    with transaction.atomic():
+        pending = list(models.PendingReview.objects.order_by('pk')[
+            :batch_size
+        ])
+        if not pending:
+            return 0
+
+        movie_ids = {review.watch_list_id for review in pending}
+        visible = set(models.WatchList.objects.filter(
+            pk__in=movie_ids
+        ).values_list('pk', flat=True))
+        reviewed = set(models.Review.objects.filter(
+            watch_list__in=visible,
+            reviewer__in={review.reviewer_id for review in pending}
+        ).values_list('watch_list_id', 'reviewer_id'))
+        reviews = []
+        ratings = defaultdict(list)
+        for review in pending:
+            if review.watch_list_id not in visible or (
+                review.watch_list_id, review.reviewer_id
+            ) in reviewed:
+                continue
+            reviews.append(models.Review(
+                reviewer_id=review.reviewer_id,
+                watch_list_id=review.watch_list_id,
+                ratings=review.ratings,
+                decription=review.decription,
+                active=review.active,
+                created_at=review.created_at
+            ))
+            ratings[review.watch_list_id].append(review.ratings)
+
+        models.Review.objects.bulk_create(reviews)
+        for watch_list_id, movie_ratings in ratings.items():
+            aggregates.add_ratings(watch_list_id, movie_ratings)
+        models.PendingReview.objects.filter(
+            pk__in=[review.pk for review in pending]
+        ).delete()
+
+        # bulk_create sends no post_save, invalidate like the signal does.
+        tags = set()
+        for watch_list_id, platform_id in models.WatchList.objects.filter(
+            pk__in=ratings
+        ).values_list('pk', 'platform_id'):
+            tags.update(cache.movie_tags(watch_list_id, platform_id))
+        if tags:
+            cache.invalidate(*tags)
+    return len(pending)
+
+
+def drain(batch_size):
+    total = 0
+    while True:
+        drained = drain_batch(batch_size)
+        if not drained:
+            return total
+        total += drained
+
+
+def status():
+    queue = models.PendingReview.objects.aggregate(
+        depth=Count('pk'), oldest=Min('created_at')
+    )
+    oldest = queue['oldest']
+    return {
+        'depth': queue['depth'],
+        'oldest': oldest,
+        'lag_seconds': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0
+        ),
+    }
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from watchlist import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the most similar movies of every movie from the reviews "
+        "and write them to the memory-mapped recommendation index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=str(settings.RECOMMENDATIONS_INDEX),
+            help="Index file, RECOMMENDATIONS_INDEX by default."
+        )
+        parser.add_argument(
+            '--k', type=int, default=settings.RECOMMENDATIONS_K,
+            help="Number of neighbours kept per movie."
+        )
+        parser.add_argument(
+            '--min-common', type=int, default=1,
+            help="Users two movies need in common to be neighbours."
+        )
+        parser.add_argument(
+            '--max-user-ratings', type=int,
+            help="Only use the most recent ratings of every user."
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=256,
+            help="Number of movies compared per sparse matrix product."
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = recommendations.neighbours(
+            options['k'],
+            min_common=options['min_common'],
+            max_user_ratings=options['max_user_ratings'],
+            chunk_size=options['chunk_size']
+        )
+        slots = recommendations.write(options['output'], options['k'], rows)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote neighbours for {slots} movie slots to "
+            f"{options['output']} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from watchlist import changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Keep the change log bounded, dropping superseded events and old "
+        "deletes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.CHANGE_LOG_CHUNK_SIZE
+        )
+        parser.add_argument(
+            '--tombstone-days', type=int,
+            default=settings.CHANGE_LOG_TOMBSTONE_DAYS
+        )
+
+    def handle(self, *args, **options):
+        compaction = changes.compact(
+            chunk_size=options['chunk_size'],
+            tombstone_days=options['tombstone_days']
+        )
+        self.stdout.write(
+            f"Coalesced {compaction.coalesced} and expired "
+            f"{compaction.expired} events, feeds have to be past "
+            f"{changes.horizon()}"
+        )
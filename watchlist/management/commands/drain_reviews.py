@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from watchlist import ingestion
+from watchlist import platform_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Turn the queued reviews into reviews, in batches with one "
+        "aggregate update per movie."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.REVIEW_QUEUE_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep draining, polling the queue every "
+                 "REVIEW_QUEUE_INTERVAL seconds when it is empty."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            drained = ingestion.drain(options['batch_size'])
+            if drained:
+                platform_stats.rank_stale()
+                self.stdout.write(
+                    f"Drained {drained} reviews in "
+                    f"{time.monotonic() - started:.2f}s"
+                )
+            if not options['loop']:
+                return
+            if not drained:
+                time.sleep(settings.REVIEW_QUEUE_INTERVAL)
@@ -0,0 +1,187 @@
+import argparse
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from watchlist import models
+from watchlist import platform_stats
+from watchlist.api import cache
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream movies from a JSONL or CSV feed into the catalog with "
+        "batched inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, .jsonl or .csv")
+        parser.add_argument(
+            '--format', choices=['jsonl', 'csv'],
+            help="Feed format, guessed from the file extension by default."
+        )
+        parser.add_argument(
+            '--batch-size', type=positive_int, default=1000,
+            help="Number of movies written per transaction."
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help="Update movies matching an existing (platform, title)."
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        feed_format = options['format'] or path.suffix.lstrip('.').lower()
+        if feed_format == 'json':
+            feed_format = 'jsonl'
+        if feed_format not in ('jsonl', 'csv'):
+            raise CommandError(f"Unknown feed format for {path}")
+
+        self.platforms = dict(
+            models.StreamingPlatform.objects.values_list('name', 'pk')
+        )
+        self.created = self.updated = self.skipped = 0
+        self.touched = set()
+        started = time.monotonic()
+
+        with path.open(newline='', encoding='utf-8') as feed:
+            if feed_format == 'jsonl':
+                rows = self.read_jsonl(feed)
+            else:
+                rows = self.read_csv(feed)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                self.write_batch(batch, options['upsert'])
+                self.report(started)
+
+        for platform_id in self.touched:
+            platform_stats.refresh(platform_id)
+        cache.invalidate('catalog')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.created + self.updated} movies "
+            f"({self.created} created, {self.updated} updated, "
+            f"{self.skipped} skipped) in {elapsed:.1f}s"
+        ))
+
+    def read_jsonl(self, feed):
+        for line_number, line in enumerate(feed, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                self.skip(line_number, "invalid JSON")
+                continue
+            if not isinstance(row, dict):
+                self.skip(line_number, "not a JSON object")
+                continue
+            movie = self.parse(line_number, row)
+            if movie is not None:
+                yield movie
+
+    def read_csv(self, feed):
+        for line_number, row in enumerate(csv.DictReader(feed), start=2):
+            movie = self.parse(line_number, row)
+            if movie is not None:
+                yield movie
+
+    def parse(self, line_number, row):
+        title = str(row.get('title') or '').strip()
+        storyline = str(row.get('storyline') or '').strip()
+        platform_id = self.platforms.get(row.get('platform'))
+        if not title or len(title) > 50:
+            return self.skip(line_number, "title is missing or too long")
+        if len(storyline) > 200:
+            return self.skip(line_number, "storyline is too long")
+        if platform_id is None:
+            return self.skip(
+                line_number, f"unknown platform {row.get('platform')!r}"
+            )
+
+        active = row.get('active', True)
+        if isinstance(active, str):
+            active = active.strip().lower() in TRUE_VALUES
+        return models.WatchList(
+            title=title,
+            storyline=storyline,
+            platform_id=platform_id,
+            active=bool(active)
+        )
+
+    def skip(self, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f"Line {line_number} skipped: {reason}")
+
+    def write_batch(self, batch, upsert):
+        now = timezone.now()
+        self.touched.update(movie.platform_id for movie in batch)
+        with transaction.atomic():
+            if upsert:
+                batch = self.apply_updates(batch, now)
+            models.WatchList.objects.bulk_create(batch)
+            models.StreamingPlatform.objects.filter(
+                pk__in={movie.platform_id for movie in batch}
+            ).update(version=F('version') + 1, updated_at=now)
+        self.created += len(batch)
+
+    def apply_updates(self, batch, now):
+        """
+        Update the movies of the batch that already exist and return the
+        ones that still have to be created. Of the rows repeating a
+        (platform, title) within the batch only the last one is kept.
+        """
+        movies = {}
+        for movie in batch:
+            key = (movie.platform_id, movie.title)
+            if key in movies:
+                self.skipped += 1
+                self.stderr.write(
+                    f"Movie {movie.title!r} skipped: repeated in the batch, "
+                    f"the last row is kept"
+                )
+            movies[key] = movie
+        existing = models.WatchList.objects.filter(
+            platform_id__in={platform_id for platform_id, _ in movies},
+            title__in={title for _, title in movies}
+        ).values_list('platform_id', 'title', 'pk')
+
+        updates = []
+        for platform_id, title, pk in existing:
+            movie = movies.pop((platform_id, title), None)
+            if movie is not None:
+                movie.pk = pk
+                movie.version = F('version') + 1
+                movie.updated_at = now
+                updates.append(movie)
+        models.WatchList.objects.bulk_update(
+            updates, ['storyline', 'active', 'version', 'updated_at']
+        )
+        self.updated += len(updates)
+        return list(movies.values())
+
+    def report(self, started):
+        elapsed = time.monotonic() - started
+        written = self.created + self.updated
+        self.stdout.write(
+            f"{written} movies written, "
+            f"{written / elapsed if elapsed else 0:.0f} movies/s"
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from watchlist import platform_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-rank the top rated movies of the platforms reviewed since "
+        "their last ranking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep running, re-ranking every TOP_RATED_INTERVAL "
+                 "seconds."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            ranked = platform_stats.rank_stale()
+            if ranked:
+                self.stdout.write(
+                    f"Ranked {ranked} platforms in "
+                    f"{time.monotonic() - started:.2f}s"
+                )
+            if not options['loop']:
+                return
+            time.sleep(settings.TOP_RATED_INTERVAL)
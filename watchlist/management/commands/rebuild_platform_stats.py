@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from watchlist import platform_stats
+from watchlist.api import cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the statistics and top rated movies of every platform "
+        "from the reviews."
+    )
+
+    def handle(self, *args, **options):
+        total = platform_stats.rebuild()
+        cache.invalidate('catalog')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt statistics for {total} platforms"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from watchlist import aggregates
+from watchlist.api import cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the rating aggregates and histograms of every movie from "
+        "its reviews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Number of movies recomputed per grouped query."
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for count in aggregates.rebuild(chunk_size=options['chunk_size']):
+            total += count
+            self.stdout.write(f"{total} movies rebuilt")
+        cache.invalidate('catalog')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt rating aggregates and histograms for {total} movies"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from watchlist import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of movies indexed per transaction."
+        )
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search.is_supported(connection):
+            raise CommandError(
+                "Full-text search needs an SQLite database with FTS5"
+            )
+
+        search.create_index(connection)
+        search.install_triggers(connection)
+        total = 0
+        for count in search.rebuild(
+            batch_size=options['batch_size'], using=connection.alias
+        ):
+            total += count
+            self.stdout.write(f"{total} movies indexed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} movies"
+        ))
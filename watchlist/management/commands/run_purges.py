@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from watchlist import purge
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the movies and platforms hidden by DELETE requests, in "
+        "chunks with short transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.PURGE_CHUNK_SIZE
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep running, polling for jobs every PURGE_INTERVAL "
+                 "seconds."
+        )
+        parser.add_argument(
+            '--retry', action='store_true',
+            help="Also re-run failed jobs from where they stopped."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            ran = purge.run_pending(
+                options['chunk_size'], options['retry']
+            )
+            if ran:
+                self.stdout.write(
+                    f"Ran {ran} purge jobs in "
+                    f"{time.monotonic() - started:.2f}s"
+                )
+            if not options['loop']:
+                return
+            if not ran:
+                time.sleep(settings.PURGE_INTERVAL)
@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over its read replicas, standing "
+        "in for replication in development and tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'replicas', nargs='*',
+            help="Replica aliases, every READ_REPLICAS entry by default."
+        )
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help="Pages copied per step, writers wait only for one step."
+        )
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or settings.READ_REPLICAS
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                "sync_replicas only copies SQLite databases, use the "
+                "database's own replication."
+            )
+        for alias in replicas:
+            if alias not in connections.databases or \
+                    connections[alias].vendor != 'sqlite':
+                raise CommandError(f"{alias} is not an SQLite database")
+
+        primary.ensure_connection()
+        for alias in replicas:
+            started = time.monotonic()
+            # The backup API takes a consistent snapshot of the primary
+            # and rewrites the replica in place, so connections already
+            # open on the replica see the new pages.
+            replica = sqlite3.connect(connections.databases[alias]['NAME'])
+            try:
+                primary.connection.backup(replica, pages=options['pages'])
+                # A copy of a WAL primary is in WAL mode too, move the
+                # pages into the file so its age reflects the sync.
+                replica.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                replica.close()
+            self.stdout.write(
+                f"{alias} synced in {time.monotonic() - started:.2f}s"
+            )
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:49
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    WatchList = apps.get_model('watchlist', 'WatchList')
+    Review = apps.get_model('watchlist', 'Review')
+    totals = Review.objects.values('watch_list_id').annotate(
+        rating_sum=Sum('ratings'), count=Count('id')
+    ).order_by()
+    for row in totals:
+        WatchList.objects.filter(pk=row['watch_list_id']).update(
+            rating_sum=row['rating_sum'],
+            number_of_ratings=row['count'],
+            average_rating=row['rating_sum'] / row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0004_auto_20220221_1318'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchlist',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(
+            backfill_rating_aggregates, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from watchlist import search
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if not search.is_supported(connection):
+        return
+    search.create_index(connection)
+    for _ in search.rebuild(using=connection.alias):
+        pass
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if not search.is_supported(connection):
+        return
+    search.drop_triggers(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {search.TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0005_watchlist_rating_sum'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.7 on 2026-10-18 09:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0006_watchlist_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='streamingplatform',
+            name='updated_at',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='streamingplatform',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='updated_at',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
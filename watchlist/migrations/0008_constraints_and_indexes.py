@@ -0,0 +1,31 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0007_version_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='streamingplatform',
+            name='name',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='watchlist',
+            name='title',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['watch_list', 'created_at'], name='review_movie_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('watch_list', 'reviewer'), name='unique_review_per_reviewer'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 3.2.7 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+import django.db.models.deletion
+
+
+def backfill_platform_stats(apps, schema_editor):
+    StreamingPlatform = apps.get_model('watchlist', 'StreamingPlatform')
+    WatchList = apps.get_model('watchlist', 'WatchList')
+    PlatformStats = apps.get_model('watchlist', 'PlatformStats')
+    prior = settings.TOP_RATED_PRIOR
+    for platform_id in StreamingPlatform.objects.values_list('pk', flat=True):
+        movies = WatchList.objects.filter(platform_id=platform_id)
+        totals = movies.aggregate(
+            movie_count=Count('pk'),
+            active_count=Count('pk', filter=Q(active=True)),
+            rating_sum=Coalesce(Sum('rating_sum'), 0),
+            number_of_ratings=Coalesce(Sum('number_of_ratings'), 0)
+        )
+        count = totals['number_of_ratings']
+        mean = totals['rating_sum'] / count if count else 0
+        score = (
+            Cast(F('rating_sum'), FloatField()) + Value(prior * mean)
+        ) / (F('number_of_ratings') + Value(float(prior)))
+        top_rated = [
+            dict(movie, score=(movie['rating_sum'] + prior * mean) / (
+                movie['number_of_ratings'] + prior
+            ))
+            for movie in movies.filter(
+                active=True, number_of_ratings__gt=0
+            ).annotate(score=score).order_by('-score', 'pk').values(
+                'id', 'title', 'average_rating', 'rating_sum',
+                'number_of_ratings'
+            )[:settings.TOP_RATED_SIZE]
+        ]
+        for movie in top_rated:
+            del movie['rating_sum']
+        PlatformStats.objects.create(
+            platform_id=platform_id, mean_rating=mean, top_rated=top_rated,
+            **totals
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0008_constraints_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('platform', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='watchlist.streamingplatform')),
+                ('movie_count', models.IntegerField(default=0)),
+                ('active_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('number_of_ratings', models.IntegerField(default=0)),
+                ('mean_rating', models.FloatField(default=0)),
+                ('top_rated', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(
+            backfill_platform_stats, migrations.RunPython.noop
+        ),
+    ]
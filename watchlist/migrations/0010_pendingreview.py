@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 09:32
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('watchlist', '0009_platformstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ratings', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('decription', models.CharField(max_length=2000, null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('watch_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_reviews', to='watchlist.watchlist')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pendingreview',
+            constraint=models.UniqueConstraint(fields=('watch_list', 'reviewer'), name='unique_pending_review_per_reviewer'),
+        ),
+    ]
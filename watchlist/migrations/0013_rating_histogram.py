@@ -0,0 +1,53 @@
+# Generated by Django 3.2.7 on 2026-10-18 09:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rating_histograms(apps, schema_editor):
+    WatchList = apps.get_model('watchlist', 'WatchList')
+    Review = apps.get_model('watchlist', 'Review')
+    histograms = Review.objects.values('watch_list_id').annotate(**{
+        f'rating_{rating}': Count('id', filter=Q(ratings=rating))
+        for rating in range(1, 6)
+    }).order_by()
+    for row in histograms:
+        WatchList.objects.filter(pk=row.pop('watch_list_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0012_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchlist',
+            name='rating_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='rating_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='rating_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='rating_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='rating_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(
+            backfill_rating_histograms, migrations.RunPython.noop
+        ),
+    ]
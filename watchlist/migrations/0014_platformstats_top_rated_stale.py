@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0013_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='platformstats',
+            name='top_rated_stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
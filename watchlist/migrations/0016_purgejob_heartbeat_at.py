@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0015_review_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purgejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
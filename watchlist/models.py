@@ -1,21 +1,38 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
 
+class VisibleManager(models.Manager):
+    """
+    Leaves out the rows hidden while a PurgeJob deletes them. Related
+    managers and prefetches derive from it too.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
+
+
 class StreamingPlatform(models.Model):
-    name = models.CharField(max_length=20)
+    name = models.CharField(max_length=20, db_index=True)
     about = models.CharField(max_length=200)
     website = models.URLField()
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+    hidden = models.BooleanField(default=False)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.name
 
 
 class WatchList(models.Model):
-    title = models.CharField(max_length=50)
+    title = models.CharField(max_length=50, db_index=True)
     storyline = models.TextField(max_length=200)
     platform = models.ForeignKey(
         StreamingPlatform,
@@ -23,14 +40,48 @@ class WatchList(models.Model):
         related_name='watchlist'
     )
     average_rating = models.FloatField(default=0)
+    rating_sum = models.IntegerField(default=0)
     number_of_ratings = models.IntegerField(default=0)
+    # Number of reviews rating the movie 1 to 5.
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+    hidden = models.BooleanField(default=False)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
 
 
+class PlatformStats(models.Model):
+    platform = models.OneToOneField(
+        StreamingPlatform,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    movie_count = models.IntegerField(default=0)
+    active_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    number_of_ratings = models.IntegerField(default=0)
+    mean_rating = models.FloatField(default=0)
+    top_rated = models.JSONField(default=list)
+    # Set by reviews, cleared when manage.py rank_top_rated re-ranks.
+    top_rated_stale = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.platform_id}| {self.movie_count}| {self.mean_rating}"
+
+
 class Review(models.Model):
     reviewer = models.ForeignKey(User, on_delete=models.CASCADE)
     ratings = models.PositiveIntegerField(
@@ -43,8 +94,135 @@ class Review(models.Model):
         related_name="reviews"
     )
     active = models.BooleanField(default=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so drained reviews keep the time they were queued.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['watch_list', 'reviewer'],
+                name='unique_review_per_reviewer'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['watch_list', 'created_at'],
+                name='review_movie_created_idx'
+            )
+        ]
+
     def __str__(self):
         return f"{self.watch_list.title}| {self.ratings}| {str(self.reviewer)}"
+
+
+class PendingReview(models.Model):
+    """
+    A validated review waiting in the write-behind queue for
+    manage.py drain_reviews to turn it into a Review.
+    """
+    reviewer = models.ForeignKey(User, on_delete=models.CASCADE)
+    ratings = models.PositiveIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
+    decription = models.CharField(max_length=2000, null=True)
+    watch_list = models.ForeignKey(
+        WatchList,
+        on_delete=models.CASCADE,
+        related_name="pending_reviews"
+    )
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['watch_list', 'reviewer'],
+                name='unique_pending_review_per_reviewer'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.watch_list_id}| {self.ratings}| pending"
+
+
+class PurgeJob(models.Model):
+    """
+    Background deletion of a hidden movie or platform and everything
+    under it, see watchlist.purge.
+    """
+    MOVIE = 'movie'
+    PLATFORM = 'platform'
+    TARGETS = [(MOVIE, 'movie'), (PLATFORM, 'platform')]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'pending'), (RUNNING, 'running'), (DONE, 'done'),
+        (FAILED, 'failed')
+    ]
+
+    target = models.CharField(max_length=10, choices=TARGETS)
+    target_id = models.IntegerField()
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=PENDING, db_index=True
+    )
+    # Rows to delete and deleted so far, by kind.
+    total = models.JSONField(default=dict)
+    deleted = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    # Written with every chunk, a running job whose worker died stops
+    # moving and is claimed again after PURGE_STALE_AFTER seconds.
+    heartbeat_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.target} {self.target_id}| {self.status}"
+
+
+class ChangeEvent(models.Model):
+    """
+    An insert, update or delete of a platform, movie or review, written
+    in the same transaction by the triggers in watchlist.changes. The id
+    is the sequence number of the change feed.
+    """
+    PLATFORM = 'platform'
+    MOVIE = 'movie'
+    REVIEW = 'review'
+
+    INSERT = 'insert'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    model = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['model', 'object_id'], name='change_object_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.pk}| {self.action} {self.model} {self.object_id}"
+
+
+class ChangeCompaction(models.Model):
+    """
+    A run of manage.py compact_changes. Feeds read from before
+    expired_through may have missed a delete and have to resync.
+    """
+    coalesced = models.IntegerField(default=0)
+    expired = models.IntegerField(default=0)
+    expired_through = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.created_at}| expired through {self.expired_through}"
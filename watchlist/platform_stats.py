@@ -0,0 +1,205 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case, Count, F, FloatField, Q, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from watchlist import models
+
+
+def bayesian_score(rating_sum, number_of_ratings, mean_rating):
+    # The movie's ratings plus TOP_RATED_PRIOR phantom ratings at the
+    # platform mean, so a single 5 does not outrank a hundred 4.8s.
+    prior = settings.TOP_RATED_PRIOR
+    return (rating_sum + prior * mean_rating) / (number_of_ratings + prior)
+
+
+def _top_entry(movie, mean_rating):
+    return {
+        'id': movie['pk'],
+        'title': movie['title'],
+        'average_rating': movie['average_rating'],
+        'number_of_ratings': movie['number_of_ratings'],
+        'score': bayesian_score(
+            movie['rating_sum'], movie['number_of_ratings'], mean_rating
+        ),
+    }
+
+
+def _rank(platform_id, mean_rating):
+    prior = settings.TOP_RATED_PRIOR
+    score = (
+        Cast(F('rating_sum'), FloatField()) + Value(prior * mean_rating)
+    ) / (F('number_of_ratings') + Value(float(prior)))
+    movies = models.WatchList.objects.filter(
+        platform_id=platform_id, active=True, number_of_ratings__gt=0
+    ).annotate(score=score).order_by('-score', 'pk').values(
+        'pk', 'title', 'average_rating', 'rating_sum', 'number_of_ratings'
+    )[:settings.TOP_RATED_SIZE]
+    return [_top_entry(movie, mean_rating) for movie in movies]
+
+
+def refresh(platform_id, create=True):
+    """
+    Recompute the statistics of one platform from its movies' rating
+    aggregates. Without create a platform that has no statistics row yet,
+    or is being deleted, is left alone.
+    """
+    totals = models.WatchList.objects.filter(
+        platform_id=platform_id
+    ).aggregate(
+        movie_count=Count('pk'),
+        active_count=Count('pk', filter=Q(active=True)),
+        rating_sum=Coalesce(Sum('rating_sum'), 0),
+        number_of_ratings=Coalesce(Sum('number_of_ratings'), 0)
+    )
+    count = totals['number_of_ratings']
+    totals['mean_rating'] = totals['rating_sum'] / count if count else 0
+    totals['top_rated'] = _rank(platform_id, totals['mean_rating'])
+    totals['top_rated_stale'] = False
+    totals['updated_at'] = timezone.now()
+    updated = models.PlatformStats.objects.filter(
+        platform_id=platform_id
+    ).update(**totals)
+    if not updated and create:
+        models.PlatformStats.objects.create(platform_id=platform_id, **totals)
+
+
+def rating_changed(watch_list_id, rating_delta, count_delta):
+    """
+    Apply a review's change to the totals of its movie's platform. The top
+    rated movies are only marked stale, rank_stale() re-ranks them out of
+    the request.
+    """
+    rating_sum = F('rating_sum') + rating_delta
+    number_of_ratings = F('number_of_ratings') + count_delta
+    updated = models.PlatformStats.objects.filter(
+        platform__watchlist=watch_list_id
+    ).update(
+        rating_sum=rating_sum,
+        number_of_ratings=number_of_ratings,
+        mean_rating=Case(
+            When(number_of_ratings=-count_delta, then=Value(0.0)),
+            default=Cast(rating_sum, FloatField()) / number_of_ratings,
+            output_field=FloatField()
+        ),
+        top_rated_stale=True,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        platform_id = models.WatchList.objects.filter(
+            pk=watch_list_id
+        ).values_list('platform_id', flat=True).first()
+        if platform_id is not None:
+            refresh(platform_id)
+
+
+def rank_stale():
+    """
+    Re-rank the top rated movies of every platform reviewed since its
+    last ranking. Returns the number of platforms re-ranked.
+    """
+    ranked = 0
+    stale = models.PlatformStats.objects.filter(top_rated_stale=True)
+    for platform_id in list(stale.values_list('pk', flat=True)):
+        with transaction.atomic():
+            # Clearing the flag first, a review landing meanwhile sets it
+            # again for the next pass.
+            if not stale.filter(pk=platform_id).update(
+                top_rated_stale=False
+            ):
+                continue
+            mean_rating = models.PlatformStats.objects.filter(
+                pk=platform_id
+            ).values_list('mean_rating', flat=True).get()
+            models.PlatformStats.objects.filter(pk=platform_id).update(
+                top_rated=_rank(platform_id, mean_rating)
+            )
+        ranked += 1
+    return ranked
+
+
+def rebuild():
+    """
+    Recompute the statistics of every platform with one grouped pass over
+    the reviews and one over the movies. Returns the number of platforms.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    movie_totals = {}
+    for row in models.Review.objects.filter(
+        watch_list__hidden=False
+    ).values('watch_list_id', 'watch_list__platform_id').annotate(
+        rating_sum=Sum('ratings'), count=Count('pk')
+    ).order_by():
+        movie_totals[row['watch_list_id']] = (row['rating_sum'], row['count'])
+        platform = totals[row['watch_list__platform_id']]
+        platform[0] += row['rating_sum']
+        platform[1] += row['count']
+
+    counts = {
+        row['platform_id']: row
+        for row in models.WatchList.objects.values('platform_id').annotate(
+            movie_count=Count('pk'),
+            active_count=Count('pk', filter=Q(active=True))
+        ).order_by()
+    }
+
+    means = {
+        platform_id: rating_sum / count
+        for platform_id, (rating_sum, count) in totals.items()
+    }
+    candidates = defaultdict(list)
+    for movie in models.WatchList.objects.filter(active=True).values(
+        'pk', 'title', 'platform_id'
+    ).iterator():
+        if movie['pk'] not in movie_totals:
+            continue
+        rating_sum, count = movie_totals[movie['pk']]
+        movie.update(
+            rating_sum=rating_sum, number_of_ratings=count,
+            average_rating=rating_sum / count
+        )
+        mean_rating = means[movie['platform_id']]
+        key = (
+            bayesian_score(rating_sum, count, mean_rating), -movie['pk']
+        )
+        heap = candidates[movie['platform_id']]
+        if len(heap) < settings.TOP_RATED_SIZE:
+            heapq.heappush(heap, (key, movie))
+        else:
+            heapq.heappushpop(heap, (key, movie))
+
+    now = timezone.now()
+    stats = []
+    for platform_id in models.StreamingPlatform.objects.values_list(
+        'pk', flat=True
+    ):
+        rating_sum, count = totals.get(platform_id, (0, 0))
+        movie_counts = counts.get(platform_id, {})
+        mean_rating = means.get(platform_id, 0)
+        stats.append(models.PlatformStats(
+            platform_id=platform_id,
+            movie_count=movie_counts.get('movie_count', 0),
+            active_count=movie_counts.get('active_count', 0),
+            rating_sum=rating_sum,
+            number_of_ratings=count,
+            mean_rating=mean_rating,
+            top_rated=[
+                _top_entry(movie, mean_rating)
+                for _, movie in sorted(
+                    candidates[platform_id], key=lambda item: item[0],
+                    reverse=True
+                )
+            ],
+            updated_at=now
+        ))
+
+    with transaction.atomic():
+        models.PlatformStats.objects.all().delete()
+        models.PlatformStats.objects.bulk_create(stats, batch_size=500)
+    return len(stats)
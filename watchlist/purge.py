@@ -0,0 +1,187 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from watchlist import models
+from watchlist import platform_stats
+from watchlist.api import cache
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def _steps(job):
+    """
+    (kind, model, WHERE clause on the target id) in deletion order,
+    children first, every clause served by an index on the parent's key.
+    """
+    review_movie = _column(models.Review, 'watch_list')
+    if job.target == models.PurgeJob.MOVIE:
+        return [
+            ('reviews', models.Review, f"{review_movie} = %s"),
+            ('pending reviews', models.PendingReview,
+             f"{_column(models.PendingReview, 'watch_list')} = %s"),
+            ('movies', models.WatchList, "id = %s"),
+        ]
+
+    movies = (
+        f"SELECT id FROM {_table(models.WatchList)} "
+        f"WHERE {_column(models.WatchList, 'platform')} = %s"
+    )
+    return [
+        ('reviews', models.Review, f"{review_movie} IN ({movies})"),
+        ('pending reviews', models.PendingReview,
+         f"{_column(models.PendingReview, 'watch_list')} IN ({movies})"),
+        ('movies', models.WatchList,
+         f"{_column(models.WatchList, 'platform')} = %s"),
+        ('platform stats', models.PlatformStats,
+         f"{_column(models.PlatformStats, 'platform')} = %s"),
+        ('platforms', models.StreamingPlatform, "id = %s"),
+    ]
+
+
+def _count(model, where, target_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {_table(model)} WHERE {where}", [target_id]
+        )
+        return cursor.fetchone()[0]
+
+
+def hide_movie(movie):
+    """
+    Hide movie from every read and queue a PurgeJob to delete it.
+    """
+    with transaction.atomic():
+        models.WatchList.objects.filter(pk=movie.pk).update(
+            hidden=True, version=F('version') + 1, updated_at=timezone.now()
+        )
+        models.StreamingPlatform.objects.filter(pk=movie.platform_id).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+        platform_stats.refresh(movie.platform_id, create=False)
+        job = models.PurgeJob.objects.create(
+            target=models.PurgeJob.MOVIE, target_id=movie.pk
+        )
+    cache.invalidate(*cache.movie_tags(movie.pk, movie.platform_id))
+    return job
+
+
+def hide_platform(platform):
+    """
+    Hide platform and its movies from every read and queue a PurgeJob to
+    delete them.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        models.StreamingPlatform.objects.filter(pk=platform.pk).update(
+            hidden=True, version=F('version') + 1, updated_at=now
+        )
+        models.WatchList.objects.filter(platform=platform.pk).update(
+            hidden=True, version=F('version') + 1, updated_at=now
+        )
+        job = models.PurgeJob.objects.create(
+            target=models.PurgeJob.PLATFORM, target_id=platform.pk
+        )
+    # Every page that may show one of its movies.
+    cache.invalidate('catalog')
+    return job
+
+
+def _claimable(retry):
+    stale = timezone.now() - timedelta(seconds=settings.PURGE_STALE_AFTER)
+    claimable = Q(status=models.PurgeJob.PENDING) | Q(
+        status=models.PurgeJob.RUNNING, heartbeat_at__lt=stale
+    )
+    if retry:
+        claimable |= Q(status=models.PurgeJob.FAILED)
+    return claimable
+
+
+def _claim(job, retry):
+    now = timezone.now()
+    return models.PurgeJob.objects.filter(
+        _claimable(retry), pk=job.pk
+    ).update(
+        status=models.PurgeJob.RUNNING, started_at=now, heartbeat_at=now,
+        finished_at=None, error=''
+    )
+
+
+def _progress(job):
+    models.PurgeJob.objects.filter(pk=job.pk).update(
+        deleted=job.deleted, heartbeat_at=timezone.now()
+    )
+
+
+def run(job, chunk_size, retry=False):
+    """
+    Delete what job hides, chunk_size rows per statement and short
+    transaction, recording progress on the job after every chunk. A job
+    left running by a dead worker, or failed with retry, resumes where it
+    stopped: every chunk deletes whatever is still there. Returns False
+    when another worker claimed the job first.
+    """
+    if not _claim(job, retry):
+        return False
+
+    job.refresh_from_db(fields=['total', 'deleted'])
+    steps = _steps(job)
+    if not job.total:
+        job.total = {
+            kind: _count(model, where, job.target_id)
+            for kind, model, where in steps
+        }
+        job.deleted = dict.fromkeys(job.total, 0)
+        models.PurgeJob.objects.filter(pk=job.pk).update(
+            total=job.total, deleted=job.deleted
+        )
+    try:
+        for kind, model, where in steps:
+            table, pk = _table(model), connection.ops.quote_name(
+                model._meta.pk.column
+            )
+            sql = (
+                f"DELETE FROM {table} WHERE {pk} IN ("
+                f"SELECT {pk} FROM {table} WHERE {where} LIMIT %s)"
+            )
+            while True:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(sql, [job.target_id, chunk_size])
+                    deleted = cursor.rowcount
+                    job.deleted[kind] += deleted
+                    _progress(job)
+                if deleted < chunk_size:
+                    break
+    except Exception as error:
+        models.PurgeJob.objects.filter(pk=job.pk).update(
+            status=models.PurgeJob.FAILED, error=str(error),
+            finished_at=timezone.now()
+        )
+        raise
+
+    models.PurgeJob.objects.filter(pk=job.pk).update(
+        status=models.PurgeJob.DONE, finished_at=timezone.now()
+    )
+    return True
+
+
+def run_pending(chunk_size, retry=False):
+    """
+    Run the queued jobs and the stale running ones oldest first, the
+    failed ones too with retry, returning how many this worker ran.
+    """
+    ran = 0
+    for job in models.PurgeJob.objects.filter(
+        _claimable(retry)
+    ).order_by('pk'):
+        ran += run(job, chunk_size, retry)
+    return ran
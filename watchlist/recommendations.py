@@ -0,0 +1,186 @@
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+
+import numpy as np
+from django.db.models import Max, Min
+from scipy import sparse
+
+from watchlist import models
+
+MAGIC = b'MMRECS2\0'
+# magic, neighbours per movie, first movie id, number of movie slots,
+# build time
+HEADER = struct.Struct('<8sIQQQ')
+
+
+def _record(k):
+    # neighbour ids (BigAutoField keys), 0 for an empty place, then their
+    # similarities
+    return struct.Struct(f'<{k}Q{k}f')
+
+
+def _ratings(max_user_ratings):
+    # reviewer ids, movie ids and ratings of the matrix's non-zero cells
+    users, movies, ratings = array('Q'), array('Q'), array('B')
+    reviews = models.Review.objects.filter(active=True).order_by(
+        'reviewer_id', '-created_at'
+    ).values_list('reviewer_id', 'watch_list_id', 'ratings')
+    user, count = None, 0
+    for reviewer_id, watch_list_id, rating in reviews.iterator(
+        chunk_size=10000
+    ):
+        if reviewer_id != user:
+            user, count = reviewer_id, 0
+        if max_user_ratings is None or count < max_user_ratings:
+            users.append(reviewer_id)
+            movies.append(watch_list_id)
+            ratings.append(rating)
+            count += 1
+    return users, movies, ratings
+
+
+def neighbours(k, min_common=1, max_user_ratings=None, chunk_size=256):
+    """
+    Yield (movie id, [(neighbour id, cosine similarity), ...]) in movie id
+    order with the k most similar movies of every rated movie, comparing
+    the columns of the sparse user x movie rating matrix. The dot products
+    of chunk_size movies with all others are one sparse matrix product.
+    max_user_ratings keeps the most recent ratings of heavy raters, whose
+    cost grows quadratically.
+    """
+    users, movies, ratings = _ratings(max_user_ratings)
+    if not movies:
+        return
+    user_ids = np.unique(
+        np.frombuffer(users, dtype=np.uint64), return_inverse=True
+    )[1]
+    movie_ids, columns = np.unique(
+        np.frombuffer(movies, dtype=np.uint64), return_inverse=True
+    )
+    matrix = sparse.csc_matrix(
+        (np.frombuffer(ratings, dtype=np.uint8).astype(np.float32),
+         (user_ids, columns)),
+        shape=(int(user_ids.max()) + 1, len(movie_ids))
+    )
+    rated = matrix.copy()
+    rated.data[:] = 1
+    norms = np.sqrt(np.asarray(matrix.power(2).sum(axis=0)).ravel())
+
+    for low in range(0, len(movie_ids), chunk_size):
+        high = min(low + chunk_size, len(movie_ids))
+        # Both products share one sparsity pattern, ratings being >= 1.
+        dots = (matrix[:, low:high].T @ matrix).tocsr()
+        dots.sort_indices()
+        if min_common > 1:
+            common = (rated[:, low:high].T @ rated).tocsr()
+            common.sort_indices()
+        for row in range(high - low):
+            start, end = dots.indptr[row], dots.indptr[row + 1]
+            others = dots.indices[start:end]
+            keep = others != low + row
+            if min_common > 1:
+                keep &= common.data[start:end] >= min_common
+            others = others[keep]
+            scores = dots.data[start:end][keep] / (
+                norms[low + row] * norms[others]
+            )
+            if len(scores) > k:
+                best = np.argpartition(scores, -k)[-k:]
+                others, scores = others[best], scores[best]
+            ids = movie_ids[others]
+            order = np.lexsort((-ids.astype(np.int64), -scores))
+            yield int(movie_ids[low + row]), [
+                (int(ids[index]), float(scores[index])) for index in order
+            ]
+
+
+def write(path, k, rows):
+    """
+    Write the index for every movie id currently in the catalog, rows
+    being (movie id, neighbours) in movie id order. The file is built
+    next to path and renamed over it, readers never see a partial index.
+    """
+    bounds = models.WatchList.objects.aggregate(
+        first=Min('pk'), last=Max('pk')
+    )
+    first = bounds['first'] or 1
+    slots = bounds['last'] - first + 1 if bounds['last'] else 0
+    record = _record(k)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(HEADER.pack(MAGIC, k, first, slots, int(time.time())))
+            # Skipped slots are left as holes, which read as empty records.
+            for movie, similar in rows:
+                slot = movie - first
+                if not 0 <= slot < slots:
+                    continue
+                output.seek(HEADER.size + slot * record.size)
+                ids = [other for other, _ in similar]
+                scores = [score for _, score in similar]
+                padding = [0] * (k - len(similar))
+                output.write(record.pack(*ids, *padding, *scores, *padding))
+            output.truncate(HEADER.size + slots * record.size)
+        # mkstemp creates the file private to the building user.
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return slots
+
+
+class RecommendationIndex:
+    """
+    Read-only view of an index file through mmap. The pages live in the
+    OS page cache, so every worker mapping the file shares one copy, and
+    a movie's neighbours are a single fixed-size slice at an offset
+    computed from its id.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as index:
+            self.map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.k, self.first, self.slots, self.built_at = \
+            HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a recommendation index")
+        self.record = _record(self.k)
+
+    def neighbours(self, movie_id):
+        slot = movie_id - self.first
+        if not 0 <= slot < self.slots:
+            return []
+        values = self.record.unpack_from(
+            self.map, HEADER.size + slot * self.record.size
+        )
+        return [
+            (other, score)
+            for other, score in zip(values[:self.k], values[self.k:])
+            if other
+        ]
+
+
+_indexes = {}
+
+
+def get_index(path):
+    """
+    The index at path, mapped once per process and mapped again after a
+    rebuild replaced the file. None when it was never built.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_ino, stat.st_mtime_ns)
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != key:
+        cached = _indexes[path] = (key, RecommendationIndex(path))
+    return cached[1]
@@ -0,0 +1,151 @@
+import re
+
+from django.db import connections, transaction
+
+from watchlist import models
+
+TABLE = 'watchlist_search'
+
+CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        title, storyline, platform,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+# Triggers keep the index in step with every write, including bulk_create,
+# queryset updates and raw deletes that never send model signals. They are
+# dropped before and recreated after each migrate run because SQLite drops a
+# table's triggers whenever a migration rebuilds the table.
+TRIGGERS = {
+    'watchlist_search_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS watchlist_search_insert
+        AFTER INSERT ON watchlist_watchlist BEGIN
+            INSERT INTO {TABLE} (rowid, title, storyline, platform)
+            SELECT new.id, new.title, new.storyline, name
+            FROM watchlist_streamingplatform WHERE id = new.platform_id;
+        END
+    """,
+    'watchlist_search_update': f"""
+        CREATE TRIGGER IF NOT EXISTS watchlist_search_update
+        AFTER UPDATE OF title, storyline, platform_id
+        ON watchlist_watchlist BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+            INSERT INTO {TABLE} (rowid, title, storyline, platform)
+            SELECT new.id, new.title, new.storyline, name
+            FROM watchlist_streamingplatform WHERE id = new.platform_id;
+        END
+    """,
+    'watchlist_search_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS watchlist_search_delete
+        AFTER DELETE ON watchlist_watchlist BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+        END
+    """,
+    'watchlist_search_platform_update': f"""
+        CREATE TRIGGER IF NOT EXISTS watchlist_search_platform_update
+        AFTER UPDATE OF name ON watchlist_streamingplatform BEGIN
+            UPDATE {TABLE} SET platform = new.name WHERE rowid IN (
+                SELECT id FROM watchlist_watchlist
+                WHERE platform_id = new.id
+            );
+        END
+    """,
+}
+
+# Rows are copied by movie id windows. INSERT OR REPLACE lets the copy
+# overwrite what the triggers already indexed for a row written meanwhile.
+BATCH_END = """
+    SELECT MAX(id) FROM (
+        SELECT id FROM watchlist_watchlist WHERE id > %s
+        ORDER BY id LIMIT %s
+    )
+"""
+
+BACKFILL = f"""
+    INSERT OR REPLACE INTO {TABLE} (rowid, title, storyline, platform)
+    SELECT movie.id, movie.title, movie.storyline, platform.name
+    FROM watchlist_watchlist AS movie
+    INNER JOIN watchlist_streamingplatform AS platform
+        ON platform.id = movie.platform_id
+    WHERE movie.id > %s AND movie.id <= %s
+"""
+
+# BM25 column weights for title, storyline and platform name.
+RANK = f"bm25({TABLE}, 10.0, 1.0, 5.0)"
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def index_exists(connection):
+    return TABLE in connection.introspection.table_names()
+
+
+def create_index(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+
+
+def install_triggers(connection):
+    with connection.cursor() as cursor:
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+
+
+def drop_triggers(connection):
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild(batch_size=1000, using='default'):
+    """
+    Repopulate the index from the catalog in primary key order, one
+    transaction per batch. The old index is cleared in the transaction of
+    the first batch, so searches never see it empty. Yields the number of
+    movies indexed per batch.
+    """
+    connection = connections[using]
+    last_id = 0
+    while True:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if not last_id:
+                cursor.execute(f"DELETE FROM {TABLE}")
+            cursor.execute(BATCH_END, [last_id, batch_size])
+            batch_end = cursor.fetchone()[0]
+            if batch_end is None:
+                break
+            cursor.execute(BACKFILL, [last_id, batch_end])
+            count = cursor.rowcount
+        last_id = batch_end
+        yield count
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def match_expression(terms):
+    """
+    Turn free-text search terms into an FTS5 query in which every word
+    must match as a prefix, e.g. ['star wa'] -> '"star"* "wa"*'.
+    """
+    words = re.findall(r'\w+', ' '.join(terms))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(queryset, terms):
+    expression = match_expression(terms)
+    if not expression:
+        return queryset.none()
+
+    db_table = models.WatchList._meta.db_table
+    return queryset.extra(
+        tables=[TABLE],
+        where=[f'{TABLE}.rowid = {db_table}.id', f'{TABLE} MATCH %s'],
+        params=[expression],
+        select={'search_rank': RANK},
+        order_by=['search_rank']
+    )
@@ -0,0 +1,151 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_migrate, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from watchlist import autocomplete
+from watchlist import changes
+from watchlist import models
+from watchlist import platform_stats
+from watchlist import search
+from watchlist.api import cache
+
+
+@receiver(pre_migrate)
+def drop_search_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name == 'watchlist' and search.is_supported(connection):
+        search.drop_triggers(connection)
+
+
+@receiver(post_migrate)
+def install_search_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name != 'watchlist' or not search.is_supported(connection):
+        return
+    if search.index_exists(connection):
+        search.install_triggers(connection)
+
+
+@receiver(pre_migrate)
+def drop_change_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name == 'watchlist' and changes.is_supported(connection):
+        changes.drop_triggers(connection)
+
+
+@receiver(post_migrate)
+def install_change_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name != 'watchlist' or not changes.is_supported(connection):
+        return
+    if changes.log_exists(connection):
+        changes.install_triggers(connection)
+
+
+@receiver(pre_save, sender=models.WatchList)
+@receiver(pre_save, sender=models.StreamingPlatform)
+def bump_version(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance.version += 1
+
+
+@receiver(post_save, sender=models.WatchList)
+@receiver(post_delete, sender=models.WatchList)
+def touch_platform(sender, instance, **kwargs):
+    models.StreamingPlatform.objects.filter(pk=instance.platform_id).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=models.StreamingPlatform)
+def create_platform_stats(sender, instance, created, **kwargs):
+    if created:
+        models.PlatformStats.objects.create(platform=instance)
+
+
+@receiver(post_save, sender=models.WatchList)
+def refresh_platform_stats(sender, instance, **kwargs):
+    platform_stats.refresh(instance.platform_id)
+
+
+@receiver(post_delete, sender=models.WatchList)
+def refresh_platform_stats_after_delete(sender, instance, **kwargs):
+    # The platform itself may be going away in the same cascade.
+    platform_stats.refresh(instance.platform_id, create=False)
+
+
+@receiver(post_save, sender=models.WatchList)
+@receiver(post_delete, sender=models.WatchList)
+def invalidate_movie(sender, instance, **kwargs):
+    cache.invalidate(*cache.movie_tags(instance.pk, instance.platform_id))
+
+
+@receiver(post_save, sender=models.StreamingPlatform)
+def invalidate_saved_platform(sender, instance, created, **kwargs):
+    movie_ids = () if created else instance.watchlist.values_list(
+        'pk', flat=True
+    )
+    cache.invalidate(*cache.platform_tags(instance.pk, movie_ids))
+
+
+@receiver(post_delete, sender=models.StreamingPlatform)
+def invalidate_deleted_platform(sender, instance, **kwargs):
+    cache.invalidate(*cache.platform_tags(instance.pk))
+
+
+@receiver(post_save, sender=models.Review)
+@receiver(post_delete, sender=models.Review)
+def invalidate_reviewed_movie(sender, instance, **kwargs):
+    platform_id = models.WatchList.objects.filter(
+        pk=instance.watch_list_id
+    ).values_list('platform_id', flat=True).first()
+    cache.invalidate(*cache.movie_tags(instance.watch_list_id, platform_id))
+
+
+# The index only hears of a write once it is committed.
+@receiver(post_save, sender=models.WatchList)
+def index_movie(sender, instance, **kwargs):
+    if instance.hidden:
+        update = partial(
+            autocomplete.index.remove, autocomplete.MOVIE, instance.pk
+        )
+    else:
+        update = partial(
+            autocomplete.index.put, autocomplete.MOVIE, instance.pk,
+            instance.title
+        )
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=models.StreamingPlatform)
+def index_platform(sender, instance, **kwargs):
+    if instance.hidden:
+        update = partial(
+            autocomplete.index.remove, autocomplete.PLATFORM, instance.pk
+        )
+    else:
+        update = partial(
+            autocomplete.index.put, autocomplete.PLATFORM, instance.pk,
+            instance.name
+        )
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=models.WatchList)
+def unindex_movie(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        autocomplete.index.remove, autocomplete.MOVIE, instance.pk
+    ))
+
+
+@receiver(post_delete, sender=models.StreamingPlatform)
+def unindex_platform(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        autocomplete.index.remove, autocomplete.PLATFORM, instance.pk
+    ))
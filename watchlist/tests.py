@@ -1,11 +1,46 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
 from django.urls import reverse
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connections
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
 
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework.authtoken.models import Token
 
-from watchlist.models import Review, StreamingPlatform, WatchList
+from movie_mate import replicas
+from movie_mate.sqlite3.base import DatabaseWrapper
+from watchlist import autocomplete
+from watchlist import changes
+from watchlist import ingestion
+from watchlist import platform_stats
+from watchlist import purge
+from watchlist import recommendations
+from watchlist import search
+from watchlist.api import profiling
+from watchlist.api import views
+from watchlist.api.budget import QueryBudgetExceeded
+from watchlist.api.throttling import TokenBucketStore
+from watchlist.models import (
+    ChangeEvent, PendingReview, PlatformStats, PurgeJob, Review,
+    StreamingPlatform, WatchList
+)
 
 
 class TestStreamPlatform(APITestCase):
@@ -73,6 +108,18 @@ class TestStreamPlatform(APITestCase):
         self.assertEqual(json_response['about'], platform.about)
         self.assertEqual(json_response['website'], platform.website)
 
+    def test_create_streaming_platform_ignores_hidden(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(path=self.path, data={
+            "name": "Hulu",
+            "about": "watch for good movies",
+            "website": "http://www.hulu.com",
+            "hidden": True,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(StreamingPlatform.objects.get(name='Hulu').hidden)
+
     def test_update_individual_stream_platform_item(self):
         user = User.objects.get(username='django')
         user.is_staff = True
@@ -126,7 +173,11 @@ class TestStreamPlatform(APITestCase):
         response = self.client.delete(
             path=reverse("platform", args=(self.platform.id,))
         )
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        call_command('run_purges', stdout=StringIO())
+        self.assertFalse(
+            StreamingPlatform.all_objects.filter(pk=self.platform.id).exists()
+        )
 
     def test_delete_individual_stream_platform_item_not_found(self):
         user = User.objects.get(username='django')
@@ -191,6 +242,31 @@ class TestWatchList(APITestCase):
         self.assertEqual(json_response["title"], movie.title)
         self.assertEqual(json_response["storyline"], movie.storyline)
 
+    def test_create_watchlist_ignores_server_fields(self):
+        self.user.is_staff = True
+        self.user.save()
+        data = {
+            "platform": self.platform,
+            "title": 'test movie',
+            "storyline": 'test storyline',
+            "active": True,
+            "average_rating": 5,
+            "rating_sum": 50,
+            "number_of_ratings": 10,
+            "rating_5": 10,
+            "version": 7,
+            "hidden": True,
+        }
+        response = self.client.post(path=self.path, data=data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        movie = WatchList.objects.get(title='test movie')
+        self.assertEqual(movie.average_rating, 0)
+        self.assertEqual(movie.rating_sum, 0)
+        self.assertEqual(movie.number_of_ratings, 0)
+        self.assertEqual(movie.rating_5, 0)
+        self.assertEqual(movie.version, 1)
+        self.assertFalse(movie.hidden)
+
     def test_get_watchlist(self):
         response = self.client.get(path=self.path)
         json_response = response.json()
@@ -256,7 +332,11 @@ class TestWatchList(APITestCase):
         response = self.client.delete(
             path=reverse("movie_detail", args=(self.movie.id,))
         )
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        call_command('run_purges', stdout=StringIO())
+        self.assertFalse(
+            WatchList.all_objects.filter(pk=self.movie.id).exists()
+        )
 
     def test_delete_watch_list_movie_not_found(self):
         user = User.objects.get(username='django')
@@ -406,9 +486,10 @@ class TestReview(APITestCase):
         self.assertEqual(json_response['detail'], 'Not found.')
 
 
-class TestFilterMovie(APITestCase):
+class TestRatingAggregates(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username='django', password='testpass'
         )
@@ -421,52 +502,292 @@ class TestFilterMovie(APITestCase):
             about='movies and series',
             website='http://www.netflix.com'
         )
-        self.movie_data = {
-            "platform": self.platform,
-            "title": 'dummy-movie',
-            "storyline": 'dummy storyline',
-            "active": True
-        }
-        self.movie = WatchList.objects.create(**self.movie_data)
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+        for index, ratings in enumerate([5, 1]):
+            user = User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            Review.objects.create(
+                reviewer=user, watch_list=self.movie, ratings=ratings
+            )
+        call_command('rebuild_ratings', stdout=StringIO())
+        self.movie.refresh_from_db()
 
-        self.movie_data_2 = {
-            "platform": self.platform,
-            "title": 'dummy-movie-2',
-            "storyline": 'dummy storyline-2',
-            "active": True
-        }
-        self.movie_2 = WatchList.objects.create(**self.movie_data_2)
+    def histogram(self):
+        self.movie.refresh_from_db()
+        return [
+            getattr(self.movie, f'rating_{rating}') for rating in range(1, 6)
+        ]
 
-    def test_filter_all_movie(self):
-        response = self.client.get(
-            path='/watch/filter-movie'
+    def test_rebuild_ratings(self):
+        self.assertEqual(self.movie.number_of_ratings, 2)
+        self.assertEqual(self.movie.rating_sum, 6)
+        self.assertEqual(self.movie.average_rating, 3)
+        self.assertEqual(self.histogram(), [1, 0, 0, 0, 1])
+
+    def test_create_review_updates_average(self):
+        response = self.client.post(
+            path=reverse('review-create', args=(self.movie.id,)),
+            data={"decription": "dummy-decription", "ratings": 3}
         )
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.number_of_ratings, 3)
+        self.assertEqual(self.movie.rating_sum, 9)
+        self.assertEqual(self.movie.average_rating, 3)
+        self.assertEqual(self.histogram(), [1, 0, 1, 0, 1])
 
-    def test_filter_movie_by_title(self):
+    def test_update_and_delete_review_updates_average(self):
+        review = Review.objects.create(
+            reviewer=self.user, watch_list=self.movie, ratings=3
+        )
+        call_command('rebuild_ratings', stdout=StringIO())
+        response = self.client.put(
+            path=reverse('review-detail', args=(review.id,)),
+            data={"decription": "dummy-decription", "ratings": 5}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating_sum, 11)
+        self.assertEqual(self.histogram(), [1, 0, 0, 0, 2])
+
+        response = self.client.delete(
+            path=reverse('review-detail', args=(review.id,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.number_of_ratings, 2)
+        self.assertEqual(self.movie.average_rating, 3)
+        self.assertEqual(self.histogram(), [1, 0, 0, 0, 1])
+
+    def test_update_applies_delta_to_committed_rating(self):
+        review = Review.objects.create(
+            reviewer=self.user, watch_list=self.movie, ratings=3
+        )
+        call_command('rebuild_ratings', stdout=StringIO())
+        stale = Review.objects.get(pk=review.pk)
+        path = reverse('review-detail', args=(review.id,))
+        data = {"decription": "dummy-decription", "ratings": 5}
+        self.client.put(path=path, data=data)
+        # A second PUT that read the review before the first one landed.
+        with mock.patch.object(
+            views.ReviewDetail, 'get_object', return_value=stale
+        ):
+            response = self.client.put(path=path, data=dict(data, ratings=4))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating_sum, 10)
+        self.assertEqual(self.histogram(), [1, 0, 0, 1, 1])
+
+    def test_rebuild_ratings_fixes_histogram(self):
+        WatchList.objects.filter(pk=self.movie.pk).update(
+            rating_1=7, rating_3=2
+        )
+        call_command('rebuild_ratings', stdout=StringIO())
+        self.assertEqual(self.histogram(), [1, 0, 0, 0, 1])
+
+    def test_movie_detail_returns_histogram(self):
         response = self.client.get(
-            path=f'/watch/filter-movie?title={self.movie.title}'
+            reverse('movie_detail', args=(self.movie.id,))
+        ).json()
+        self.assertEqual(
+            [response[f'rating_{rating}'] for rating in range(1, 6)],
+            [1, 0, 0, 0, 1]
         )
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()['count'], 1)
-        self.assertEqual(response.json()['results'][0]['platform'], "netflix")
-        self.assertEqual(response.json()['results'][0]['title'], "dummy-movie")
+
+
+@override_settings(REVIEW_QUEUE=True)
+class TestReviewQueue(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+        self.movie_2 = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie-1',
+            storyline='dummy storyline 2',
+            active=True
+        )
+        self.reviewers = [
+            User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            for index in range(3)
+        ]
+
+    def post_review(self, movie_id, ratings=4):
+        return self.client.post(
+            path=reverse('review-create', args=(movie_id,)),
+            data={"decription": "dummy-decription", "ratings": ratings}
+        )
+
+    def test_create_review_is_queued(self):
+        response = self.post_review(self.movie.id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.json()['pending'])
+        self.assertEqual(response.json()['reviewer'], 'django')
+        self.assertEqual(Review.objects.count(), 0)
+        self.assertEqual(PendingReview.objects.count(), 1)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.number_of_ratings, 0)
+
+    def test_create_review_rejections(self):
+        response = self.post_review(999)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        Review.objects.create(
+            reviewer=self.reviewers[0], watch_list=self.movie_2, ratings=3
+        )
+        self.client.force_authenticate(self.reviewers[0])
+        response = self.post_review(self.movie_2.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        ingestion.enqueue(
+            self.movie.id, self.reviewers[1].id, {'ratings': 2}
+        )
+        self.client.force_authenticate(self.reviewers[1])
+        response = self.post_review(self.movie.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PendingReview.objects.count(), 1)
+
+    def test_queue_race_rejected_by_constraint(self):
+        ingestion.enqueue(self.movie.id, self.user.id, {'ratings': 2})
+        with mock.patch.object(ingestion, 'check', return_value=False):
+            response = self.post_review(self.movie.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(
-            response.json()['results'][0]['storyline'], "dummy storyline"
+            response.json()[0], 'You have already reviewed this movie'
         )
 
-    def test_filter_movie_doesnot_exists(self):
-        response = self.client.get(
-            path='/watch/filter-movie?title=unknown'
+    def test_author_reads_own_queued_review(self):
+        self.post_review(self.movie.id)
+        Review.objects.create(
+            reviewer=self.reviewers[0], watch_list=self.movie, ratings=3
         )
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()['count'], 0)
+        path = reverse('review-list', args=(self.movie.id,))
 
+        reviews = self.client.get(path).json()
+        self.assertEqual(len(reviews), 2)
+        self.assertTrue(reviews[-1]['pending'])
+        self.assertEqual(reviews[-1]['ratings'], 4)
 
-class TestSearchMovie(APITestCase):
+        results = self.client.get(path, {'pagination': 'cursor'}).json()[
+            'results'
+        ]
+        self.assertEqual(len(results), 2)
+        self.assertTrue(results[0]['pending'])
+
+        self.client.force_authenticate(self.reviewers[0])
+        reviews = self.client.get(path).json()
+        self.assertEqual(len(reviews), 1)
+        self.assertNotIn('pending', reviews[0])
+
+    def test_drain_reviews(self):
+        Review.objects.create(
+            reviewer=self.reviewers[0], watch_list=self.movie, ratings=5
+        )
+        call_command('rebuild_ratings', stdout=StringIO())
+        call_command('rebuild_platform_stats', stdout=StringIO())
+        for reviewer, movie, ratings in [
+            (self.reviewers[0], self.movie_2, 1),
+            (self.reviewers[1], self.movie, 2),
+            (self.reviewers[1], self.movie_2, 3),
+            (self.reviewers[2], self.movie, 4),
+        ]:
+            ingestion.enqueue(movie.id, reviewer.id, {'ratings': ratings})
+        # Reviewed already, dropped by the drain.
+        ingestion.enqueue(self.movie.id, self.reviewers[0].id, {'ratings': 1})
+
+        call_command('drain_reviews', batch_size=2, stdout=StringIO())
+        self.assertEqual(PendingReview.objects.count(), 0)
+        self.assertEqual(Review.objects.count(), 5)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.number_of_ratings, 3)
+        self.assertEqual(self.movie.rating_sum, 11)
+        self.movie_2.refresh_from_db()
+        self.assertEqual(self.movie_2.number_of_ratings, 2)
+        self.assertEqual(self.movie_2.average_rating, 2)
+        self.assertEqual(
+            (self.movie_2.rating_1, self.movie_2.rating_3), (1, 1)
+        )
+        stats = PlatformStats.objects.get(pk=self.platform.pk)
+        self.assertEqual(stats.number_of_ratings, 5)
+        self.assertEqual(stats.rating_sum, 15)
+        self.assertFalse(stats.top_rated_stale)
+        self.assertEqual(len(stats.top_rated), 2)
+
+    def test_drain_keeps_queue_time_and_skips_hidden_movies(self):
+        queued = ingestion.enqueue(
+            self.movie.id, self.reviewers[0].id, {'ratings': 4}
+        )
+        queued_at = timezone.now() - timezone.timedelta(hours=1)
+        PendingReview.objects.filter(pk=queued.pk).update(
+            created_at=queued_at
+        )
+        ingestion.enqueue(
+            self.movie_2.id, self.reviewers[0].id, {'ratings': 2}
+        )
+        WatchList.objects.filter(pk=self.movie_2.pk).update(hidden=True)
+
+        self.assertEqual(ingestion.drain(100), 2)
+        self.assertEqual(PendingReview.objects.count(), 0)
+        review = Review.objects.get()
+        self.assertEqual(review.watch_list_id, self.movie.id)
+        self.assertEqual(review.created_at, queued_at)
+        self.assertEqual(
+            WatchList.all_objects.get(pk=self.movie_2.pk).number_of_ratings, 0
+        )
+
+    def test_drained_review_is_not_served_stale(self):
+        path = reverse('movie_detail', args=(self.movie.id,))
+        self.client.get(path)
+        ingestion.enqueue(self.movie.id, self.user.id, {'ratings': 4})
+        ingestion.drain(100)
+        self.assertEqual(self.client.get(path).json()['number_of_ratings'], 1)
+
+    def test_queue_status(self):
+        response = self.client.get(reverse('review-queue'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('review-queue'))
+        self.assertEqual(response.json()['depth'], 0)
+        self.assertEqual(response.json()['lag_seconds'], 0)
+
+        self.post_review(self.movie.id)
+        response = self.client.get(reverse('review-queue'))
+        self.assertEqual(response.json()['depth'], 1)
+        self.assertGreaterEqual(response.json()['lag_seconds'], 0)
+        self.assertIsNotNone(response.json()['oldest'])
+
+
+class TestPlatformStats(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username='django', password='testpass'
         )
@@ -479,34 +800,2029 @@ class TestSearchMovie(APITestCase):
             about='movies and series',
             website='http://www.netflix.com'
         )
-        self.movie_data = {
-            "platform": self.platform,
-            "title": 'dummy-movie',
-            "storyline": 'dummy storyline',
-            "active": True
-        }
-        self.movie = WatchList.objects.create(**self.movie_data)
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy-movie-{index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(3)
+        ]
+        self.reviewers = [
+            User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            for index in range(20)
+        ]
 
-        self.movie_data_2 = {
-            "platform": self.platform,
-            "title": 'dummy-movie-2',
-            "storyline": 'dummy storyline-2',
-            "active": True
+    def get_stats(self):
+        response = self.client.get(
+            path=reverse('platform-stats', args=(self.platform.id,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_movie_counts_follow_the_catalog(self):
+        self.movies[0].active = False
+        self.movies[0].save()
+        self.movies[1].delete()
+        stats = self.get_stats()
+        self.assertEqual(stats['movie_count'], 2)
+        self.assertEqual(stats['active_count'], 1)
+
+    def test_reviews_update_stats_incrementally(self):
+        for movie, reviewer, ratings in zip(
+            self.movies, self.reviewers, [5, 3]
+        ):
+            self.client.force_authenticate(reviewer)
+            response = self.client.post(
+                path=reverse('review-create', args=(movie.id,)),
+                data={"decription": "dummy-decription", "ratings": ratings}
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        stats = self.get_stats()
+        self.assertEqual(stats['number_of_ratings'], 2)
+        self.assertEqual(stats['mean_rating'], 4)
+        self.assertEqual(stats['top_rated'], [])
+
+        call_command('rank_top_rated', stdout=StringIO())
+        self.assertEqual(
+            [movie['id'] for movie in self.get_stats()['top_rated']],
+            [self.movies[0].id, self.movies[1].id]
+        )
+
+        review = Review.objects.get(watch_list=self.movies[0])
+        self.client.force_authenticate(self.reviewers[0])
+        self.client.delete(path=reverse('review-detail', args=(review.id,)))
+        self.assertEqual(platform_stats.rank_stale(), 1)
+        self.assertEqual(platform_stats.rank_stale(), 0)
+        stats = self.get_stats()
+        self.assertEqual(stats['number_of_ratings'], 1)
+        self.assertEqual(stats['mean_rating'], 3)
+        self.assertEqual(
+            [movie['id'] for movie in stats['top_rated']],
+            [self.movies[1].id]
+        )
+
+    def test_rebuild_ranks_by_bayesian_score(self):
+        ratings = {
+            self.movies[0]: [5],
+            self.movies[1]: [5] * 16 + [4] * 4,
+            self.movies[2]: [1] * 10,
         }
-        self.movie_2 = WatchList.objects.create(**self.movie_data_2)
+        for movie, values in ratings.items():
+            for reviewer, value in zip(self.reviewers, values):
+                Review.objects.create(
+                    reviewer=reviewer, watch_list=movie, ratings=value
+                )
+        call_command('rebuild_platform_stats', stdout=StringIO())
+        stats = self.get_stats()
+        self.assertEqual(stats['number_of_ratings'], 31)
+        self.assertEqual(stats['mean_rating'], 111 / 31)
+        self.assertEqual(
+            [movie['id'] for movie in stats['top_rated']],
+            [self.movies[1].id, self.movies[0].id, self.movies[2].id]
+        )
 
-    def test_search_all_movie(self):
-        response = self.client.get(
-            path='/watch/search-movie'
+    def test_rebuild_leaves_out_hidden_movies(self):
+        for movie, value in ((self.movies[0], 5), (self.movies[2], 1)):
+            Review.objects.create(
+                reviewer=self.reviewers[0], watch_list=movie, ratings=value
+            )
+        WatchList.objects.filter(pk=self.movies[2].pk).update(hidden=True)
+        call_command('rebuild_platform_stats', stdout=StringIO())
+        stats = self.get_stats()
+        self.assertEqual(stats['number_of_ratings'], 1)
+        self.assertEqual(stats['mean_rating'], 5)
+
+    def test_missing_platform(self):
+        response = self.client.get(path=reverse('platform-stats', args=(99,)))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestRecommendations(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recommendations.idx')
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
         )
-        self.assertEqual(response.status_code, 200)
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy-movie-{index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(4)
+        ]
+        ratings = [
+            {0: 5, 1: 5},
+            {0: 4, 1: 4, 2: 1},
+            {2: 5},
+        ]
+        for index, reviews in enumerate(ratings):
+            user = User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            for movie, rating in reviews.items():
+                Review.objects.create(
+                    reviewer=user, watch_list=self.movies[movie],
+                    ratings=rating
+                )
+
+    def build(self, **options):
+        call_command(
+            'build_recommendations', output=self.path, stdout=StringIO(),
+            **options
+        )
+
+    def get(self, movie_id):
+        with override_settings(RECOMMENDATIONS_INDEX=self.path):
+            return self.client.get(
+                path=reverse('movie-recommendations', args=(movie_id,))
+            )
+
+    def test_index_lookup(self):
+        self.build(k=3)
+        index = recommendations.RecommendationIndex(self.path)
+        first, second, third, unrated = [movie.id for movie in self.movies]
+        similar = index.neighbours(first)
+        self.assertEqual([movie for movie, _ in similar], [second, third])
+        self.assertAlmostEqual(similar[0][1], 1, places=5)
+        self.assertAlmostEqual(
+            similar[1][1], 4 / (41 ** 0.5 * 26 ** 0.5), places=5
+        )
+        self.assertEqual(index.neighbours(unrated), [])
+        self.assertEqual(index.neighbours(unrated + 100), [])
+
+    def test_chunked_build(self):
+        self.build(k=3)
+        with open(self.path, 'rb') as index:
+            whole = index.read()
+        self.build(k=3, chunk_size=1)
+        with open(self.path, 'rb') as index:
+            chunked = index.read()
+        header = recommendations.HEADER.size
+        self.assertEqual(chunked[header:], whole[header:])
+
+    def test_ids_above_32_bits(self):
+        offset = 2 ** 32
+        for movie in self.movies:
+            Review.objects.filter(watch_list_id=movie.pk).update(
+                watch_list_id=movie.pk + offset
+            )
+            WatchList.objects.filter(pk=movie.pk).update(id=movie.pk + offset)
+        self.build()
+        index = recommendations.RecommendationIndex(self.path)
+        first, second, third = (movie.pk + offset for movie in self.movies[:3])
+        self.assertEqual(index.first, first)
+        self.assertEqual(
+            [movie for movie, _ in index.neighbours(first)], [second, third]
+        )
+
+    def test_min_common(self):
+        self.build(min_common=2)
+        index = recommendations.RecommendationIndex(self.path)
+        self.assertEqual(
+            index.neighbours(self.movies[0].id),
+            [(self.movies[1].id, 1.0)]
+        )
+
+    def test_recommendations_endpoint(self):
+        self.build()
+        self.movies[2].active = False
+        self.movies[2].save()
+        response = self.get(self.movies[0].id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        json_response = response.json()
+        self.assertEqual(len(json_response), 1)
+        self.assertEqual(json_response[0]['id'], self.movies[1].id)
+        self.assertEqual(json_response[0]['platform'], 'netflix')
+        self.assertAlmostEqual(json_response[0]['similarity'], 1, places=5)
+
+        self.assertEqual(self.get(self.movies[3].id).json(), [])
+        response = self.get(self.movies[3].id + 100)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_index_not_built(self):
+        response = self.get(self.movies[0].id)
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+
+class TestReviewConstraints(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+        Review.objects.create(
+            reviewer=self.user, watch_list=self.movie, ratings=4
+        )
+        call_command('rebuild_ratings', stdout=StringIO())
+
+    def test_second_review_rejected_by_constraint(self):
+        response = self.client.post(
+            path=reverse('review-create', args=(self.movie.id,)),
+            data={"decription": "dummy-decription", "ratings": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()[0], 'You have already reviewed this movie'
+        )
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.number_of_ratings, 1)
+        self.assertEqual(self.movie.rating_sum, 4)
+
+    def test_other_integrity_errors_propagate(self):
+        error = IntegrityError('NOT NULL constraint failed: x.y')
+        path = reverse('review-create', args=(self.movie.id,))
+        with mock.patch.object(views.aggregates, 'add_rating',
+                               side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.client.post(path=path, data={"ratings": 1})
+
+    def test_review_for_missing_movie(self):
+        response = self.client.post(
+            path=reverse('review-create', args=(self.movie.id + 1,)),
+            data={"decription": "dummy-decription", "ratings": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()[0], 'Movie does not exists !')
+        self.assertEqual(Review.objects.count(), 1)
+
+
+class TestKeysetPagination(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy-movie-{index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(5)
+        ]
+        for index in range(3):
+            user = User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            Review.objects.create(
+                reviewer=user, watch_list=self.movies[0], ratings=4
+            )
+
+    def test_watchlist_default_pagination_unchanged(self):
+        response = self.client.get(path=reverse('list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()), 2)
 
-    def test_search_movie_by_title(self):
+    def test_watchlist_cursor_pages(self):
         response = self.client.get(
-            path=f'/watch/search-movie?title={self.movie.title}'
+            path=reverse('list'), data={'pagination': 'cursor', 'page_size': 2}
         )
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 2)
-        self.assertEqual(response.json()[0]['title'], "dummy-movie")
-        self.assertEqual(response.json()[1]['title'], "dummy-movie-2")
+        json_response = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', json_response)
+        self.assertIsNone(json_response['previous'])
+        self.assertEqual(
+            [movie['id'] for movie in json_response['results']],
+            [self.movies[4].id, self.movies[3].id]
+        )
+
+        titles = []
+        next_url = json_response['next']
+        while next_url:
+            json_response = self.client.get(next_url).json()
+            titles.extend(
+                movie['title'] for movie in json_response['results']
+            )
+            next_url = json_response['next']
+        self.assertEqual(
+            titles, ['dummy-movie-2', 'dummy-movie-1', 'dummy-movie-0']
+        )
+        self.assertIsNotNone(json_response['previous'])
+
+    def test_review_list_cursor_pages(self):
+        path = reverse('review-list', args=(self.movies[0].id,))
+        self.assertEqual(len(self.client.get(path=path).json()), 3)
+
+        response = self.client.get(
+            path=path, data={'pagination': 'cursor', 'page_size': 2}
+        )
+        json_response = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json_response['results']), 2)
+        self.assertIsNotNone(json_response['next'])
+
+
+class TestResponseCache(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+
+    def cache_stats(self):
+        return self.client.get(path=reverse('cache-stats')).json()
+
+    def test_repeated_get_is_served_from_cache(self):
+        path = reverse('movie_detail', args=(self.movie.id,))
+        self.client.get(path=path)
+        before = self.cache_stats()
+        response = self.client.get(path=path)
+        after = self.cache_stats()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['title'], 'dummy-movie')
+        self.assertEqual(after['hits'], before['hits'] + 1)
+        self.assertEqual(after['misses'], before['misses'])
+
+    def test_movie_update_invalidates_movie_and_platform(self):
+        movie_path = reverse('movie_detail', args=(self.movie.id,))
+        platform_path = reverse('platform', args=(self.platform.id,))
+        self.client.get(path=movie_path)
+        self.client.get(path=platform_path)
+
+        self.movie.title = 'renamed-movie'
+        self.movie.save()
+
+        response = self.client.get(path=movie_path)
+        self.assertEqual(response.json()['title'], 'renamed-movie')
+        response = self.client.get(path=platform_path)
+        self.assertEqual(
+            response.json()['watchlist'][0]['title'], 'renamed-movie'
+        )
+
+    def test_unrelated_movie_update_keeps_cached_entry(self):
+        other = WatchList.objects.create(
+            platform=self.platform,
+            title='other-movie',
+            storyline='other storyline',
+            active=True
+        )
+        path = reverse('movie_detail', args=(self.movie.id,))
+        self.client.get(path=path)
+        other.title = 'renamed-movie'
+        other.save()
+        before = self.cache_stats()
+        self.client.get(path=path)
+        self.assertEqual(self.cache_stats()['hits'], before['hits'] + 1)
+
+    def test_review_invalidates_movie(self):
+        path = reverse('movie_detail', args=(self.movie.id,))
+        self.client.get(path=path)
+        Review.objects.create(
+            reviewer=self.user, watch_list=self.movie, ratings=5
+        )
+        call_command('rebuild_ratings', stdout=StringIO())
+        response = self.client.get(path=path)
+        self.assertEqual(response.json()['number_of_ratings'], 1)
+
+    def test_response_read_from_replica_is_not_cached(self):
+        cache.clear()
+        path = reverse('movie_detail', args=(self.movie.id,))
+        with mock.patch.object(
+            replicas, 'replica_reads', side_effect=[0, 1]
+        ):
+            self.client.get(path=path)
+        before = self.cache_stats()
+        self.client.get(path=path)
+        self.assertEqual(self.cache_stats()['misses'], before['misses'] + 1)
+
+    def test_cache_stats_requires_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(path=reverse('cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestBatch(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy-movie-{index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(3)
+        ]
+        self.path = reverse('movie-batch')
+
+    def ids(self, *ids):
+        return {'ids': ','.join(str(pk) for pk in ids)}
+
+    def test_movies_in_requested_order(self):
+        first, second, third = self.movies
+        response = self.client.get(
+            self.path, self.ids(third.id, 999, first.id, third.id)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [movie['title'] for movie in response.json()['results']],
+            ['dummy-movie-2', 'dummy-movie-0']
+        )
+        self.assertEqual(response.json()['results'][0]['platform'], 'netflix')
+        self.assertEqual(response.json()['missing'], [999])
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            self.path, {**self.ids(self.movies[1].id), 'fields': 'title'}
+        )
+        self.assertEqual(
+            response.json()['results'], [{'title': 'dummy-movie-1'}]
+        )
+
+    @override_settings(BATCH_MAX_IDS=2)
+    def test_invalid_ids(self):
+        for params in ({}, {'ids': 'a,b'}, self.ids(1, 2, 3)):
+            response = self.client.get(self.path, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            self.assertIn('ids', response.json())
+
+    def test_cached_until_a_movie_changes(self):
+        params = self.ids(self.movies[0].id, self.movies[1].id)
+        self.client.get(self.path, params)
+        hits = views.cache.stats['hits']
+        self.client.get(self.path, params)
+        self.assertEqual(views.cache.stats['hits'], hits + 1)
+
+        self.movies[1].title = 'renamed-movie'
+        self.movies[1].save()
+        response = self.client.get(self.path, params)
+        self.assertEqual(
+            response.json()['results'][1]['title'], 'renamed-movie'
+        )
+
+    def test_conditional_get(self):
+        params = self.ids(self.movies[0].id, 999)
+        etag = self.client.get(self.path, params)['ETag']
+        response = self.client.get(self.path, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            self.path, self.ids(self.movies[0].id, self.movies[1].id),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.movies[0].save()
+        response = self.client.get(self.path, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_follows_id_order_and_fields(self):
+        first, second = self.movies[0].id, self.movies[1].id
+        etag = self.client.get(self.path, self.ids(first, second))['ETag']
+        variants = [
+            self.ids(second, first),
+            {**self.ids(first, second), 'fields': 'id,title'},
+            {**self.ids(first, second), 'exclude': 'storyline'},
+        ]
+        etags = {etag}
+        for params in variants:
+            response = self.client.get(
+                self.path, params, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etags.add(response['ETag'])
+        self.assertEqual(len(etags), 4)
+
+    def test_platforms(self):
+        other = StreamingPlatform.objects.create(
+            name='prime', about='movies', website='http://www.prime.com'
+        )
+        path = reverse('platform-batch')
+        params = self.ids(other.id, self.platform.id, 999)
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual(
+            [platform['name'] for platform in results], ['prime', 'netflix']
+        )
+        self.assertEqual(len(results[1]['watchlist']), 3)
+        self.assertEqual(response.json()['missing'], [999])
+
+        etag = response['ETag']
+        call_command('rebuild_ratings', stdout=StringIO())
+        response = self.client.get(path, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestPurge(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy-movie-{index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(2)
+        ]
+        for index in range(5):
+            reviewer = User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            for movie in self.movies:
+                Review.objects.create(
+                    reviewer=reviewer, watch_list=movie, ratings=index % 5 + 1
+                )
+        ingestion.enqueue(self.movies[0].id, self.user.id, {'ratings': 3})
+        call_command('rebuild_ratings', stdout=StringIO())
+        call_command('rebuild_platform_stats', stdout=StringIO())
+
+    def test_movie_is_hidden_then_purged(self):
+        movie = self.movies[0]
+        detail = reverse('movie_detail', args=(movie.id,))
+        self.client.get(detail)
+        response = self.client.delete(detail)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['status'], PurgeJob.PENDING)
+        job_path = response['Location']
+
+        self.assertEqual(
+            self.client.get(detail).status_code, status.HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(self.client.delete(detail).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        titles = [
+            row['title'] for row in self.client.get(
+                reverse('search-movie'), {'search': 'dummy'}
+            ).json()
+        ]
+        self.assertEqual(titles, ['dummy-movie-1'])
+        stats = PlatformStats.objects.get(pk=self.platform.id)
+        self.assertEqual(stats.movie_count, 1)
+        self.assertEqual(stats.number_of_ratings, 5)
+        self.assertEqual(Review.objects.filter(watch_list=movie).count(), 5)
+
+        call_command('run_purges', chunk_size=2, stdout=StringIO())
+        self.assertFalse(WatchList.all_objects.filter(pk=movie.id).exists())
+        self.assertEqual(Review.objects.count(), 5)
+        self.assertEqual(PendingReview.objects.count(), 0)
+
+        job = self.client.get(job_path).json()
+        self.assertEqual(job['status'], PurgeJob.DONE)
+        self.assertEqual(job['progress'], 1.0)
+        self.assertEqual(
+            job['deleted'],
+            {'reviews': 5, 'pending reviews': 1, 'movies': 1}
+        )
+        self.assertEqual(job['total'], job['deleted'])
+
+    def test_platform_is_hidden_then_purged(self):
+        response = self.client.delete(
+            reverse('stream-platform-detail', args=(self.platform.id,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.client.get(reverse('platform')).json(), [])
+        self.assertEqual(
+            self.client.get(
+                reverse('platform-stats', args=(self.platform.id,))
+            ).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+        batch = self.client.get(
+            reverse('movie-batch'),
+            {'ids': ','.join(str(movie.id) for movie in self.movies)}
+        ).json()
+        self.assertEqual(batch['results'], [])
+
+        call_command('run_purges', chunk_size=3, stdout=StringIO())
+        job = PurgeJob.objects.get()
+        self.assertEqual(job.status, PurgeJob.DONE)
+        self.assertEqual(job.deleted, {
+            'reviews': 10, 'pending reviews': 1, 'movies': 2,
+            'platform stats': 1, 'platforms': 1
+        })
+        self.assertFalse(StreamingPlatform.all_objects.exists())
+        self.assertFalse(WatchList.all_objects.exists())
+        self.assertFalse(Review.objects.exists())
+        self.assertFalse(PlatformStats.objects.exists())
+
+    def test_job_runs_once(self):
+        job = purge.hide_movie(self.movies[1])
+        self.assertTrue(purge.run(job, 100))
+        self.assertFalse(purge.run(job, 100))
+        self.assertEqual(
+            self.client.get(reverse('purge-job', args=(999,))).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+    def test_killed_job_resumes(self):
+        movie = self.movies[0]
+        job = purge.hide_movie(movie)
+        progress = purge._progress
+        calls = []
+
+        def die_on_second_chunk(job):
+            calls.append(job.pk)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            progress(job)
+
+        with mock.patch.object(purge, '_progress', die_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                purge.run(job, 2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PurgeJob.RUNNING)
+        self.assertEqual(job.deleted['reviews'], 2)
+        self.assertEqual(Review.objects.filter(watch_list=movie).count(), 3)
+
+        # The worker still looks alive until PURGE_STALE_AFTER passes.
+        self.assertEqual(purge.run_pending(2), 0)
+        PurgeJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(purge.run_pending(2), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PurgeJob.DONE)
+        self.assertEqual(job.total, job.deleted)
+        self.assertFalse(WatchList.all_objects.filter(pk=movie.id).exists())
+
+    def test_failed_job_runs_again_with_retry(self):
+        job = purge.hide_movie(self.movies[0])
+        with mock.patch.object(
+            purge, '_progress', side_effect=RuntimeError('disk full')
+        ):
+            with self.assertRaises(RuntimeError):
+                purge.run(job, 2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PurgeJob.FAILED)
+        self.assertEqual(job.error, 'disk full')
+
+        call_command('run_purges', chunk_size=2, stdout=StringIO())
+        self.assertEqual(PurgeJob.objects.get().status, PurgeJob.FAILED)
+        call_command(
+            'run_purges', chunk_size=2, retry=True, stdout=StringIO()
+        )
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (PurgeJob.DONE, ''))
+        self.assertEqual(job.total, job.deleted)
+        self.assertFalse(
+            Review.objects.filter(watch_list=job.target_id).exists()
+        )
+
+
+@override_settings(AUTOCOMPLETE_REFRESH_INTERVAL=0)
+class TestAutocomplete(APITestCase):
+
+    def setUp(self):
+        autocomplete.index.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=title,
+                storyline='dummy storyline',
+                active=True
+            )
+            for title in (
+                'Star Wars', 'The Last Starfighter', 'Amélie',
+                'Nettles and Stars'
+            )
+        ]
+
+    def tearDown(self):
+        autocomplete.index.clear()
+
+    def complete(self, q, **params):
+        response = self.client.get(reverse('autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (result['label'], result['match'])
+            for result in response.json()['results']
+        ]
+
+    def test_prefix_matches_rank_first(self):
+        self.assertEqual(self.complete('star'), [
+            ('Star Wars', 'prefix'),
+            ('Nettles and Stars', 'prefix'),
+            ('The Last Starfighter', 'prefix'),
+        ])
+        self.assertEqual(self.complete('net'), [
+            ('netflix', 'prefix'), ('Nettles and Stars', 'prefix')
+        ])
+        self.assertEqual(self.complete('amel'), [('Amélie', 'prefix')])
+        self.assertEqual(self.complete('sta wa'), [('Star Wars', 'prefix')])
+        self.assertEqual(self.complete('star', limit=1), [
+            ('Star Wars', 'prefix')
+        ])
+
+    def test_typos_match_fuzzily(self):
+        self.assertEqual(self.complete('strr wars')[0], ('Star Wars', 'fuzzy'))
+        self.assertEqual(self.complete('netflx')[0], ('netflix', 'fuzzy'))
+        self.assertEqual(self.complete('zzzz'), [])
+        self.assertEqual(self.complete(''), [])
+
+    def test_bad_limit(self):
+        for limit in ('0', 'x', '-1'):
+            self.assertEqual(
+                self.client.get(
+                    reverse('autocomplete'), {'q': 'star', 'limit': limit}
+                ).status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    @override_settings(AUTOCOMPLETE_REFRESH_INTERVAL=3600)
+    def test_signals_update_index(self):
+        self.complete('star')
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = WatchList.objects.create(
+                platform=self.platform, title='Stardust',
+                storyline='dummy storyline', active=True
+            )
+        self.assertEqual(
+            autocomplete.index.search('stardu', 10),
+            [('movie', movie.id, 'Stardust', 'prefix', 1.0)]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.delete()
+        self.assertEqual(autocomplete.index.search('stardu', 10), [])
+
+    def test_change_log_updates_index(self):
+        self.complete('star')
+        star_wars, starfighter = self.movies[:2]
+        WatchList.objects.filter(pk=star_wars.pk).update(title='Moon Wars')
+        purge.hide_movie(starfighter)
+        self.assertEqual(self.complete('star'), [
+            ('Nettles and Stars', 'prefix')
+        ])
+        self.assertEqual(self.complete('moo'), [('Moon Wars', 'prefix')])
+
+    def test_refresh_skips_unchanged_labels(self):
+        self.complete('star')
+        WatchList.objects.update(rating_sum=F('rating_sum') + 1)
+        with mock.patch.object(
+            autocomplete.index, '_add', wraps=autocomplete.index._add
+        ) as add:
+            self.complete('star')
+        add.assert_not_called()
+        self.assertEqual(
+            autocomplete.index.last_seq, ChangeEvent.objects.latest('pk').pk
+        )
+
+    @override_settings(AUTOCOMPLETE_REFRESH_BATCH_SIZE=1)
+    def test_refresh_reads_a_page_per_search(self):
+        self.complete('star')
+        WatchList.objects.bulk_create([
+            WatchList(
+                platform=self.platform, title=title,
+                storyline='dummy storyline'
+            )
+            for title in ('Stardust', 'Stardust Memories')
+        ])
+        self.assertEqual(self.complete('stardu'), [('Stardust', 'prefix')])
+        self.assertEqual(self.complete('stardu'), [
+            ('Stardust', 'prefix'), ('Stardust Memories', 'prefix')
+        ])
+
+    @override_settings(AUTOCOMPLETE_REBUILD_BACKLOG=1)
+    def test_long_backlog_rebuilds(self):
+        self.complete('star')
+        WatchList.objects.filter(pk=self.movies[0].pk).update(
+            title='Moon Wars'
+        )
+        WatchList.objects.filter(pk=self.movies[1].pk).update(
+            title='Moonraker'
+        )
+        with mock.patch.object(
+            autocomplete.index, 'build', wraps=autocomplete.index.build
+        ) as build:
+            self.assertEqual(self.complete('moo'), [
+                ('Moon Wars', 'prefix'), ('Moonraker', 'prefix')
+            ])
+        build.assert_called_once()
+
+    def test_stats(self):
+        self.complete('star')
+        stats = self.client.get(reverse('autocomplete-stats')).json()
+        self.assertEqual(stats['entries'], 5)
+        self.assertEqual(stats['words'], 10)
+        self.assertGreater(stats['memory_bytes'], 0)
+        self.assertEqual(
+            stats['last_seq'], ChangeEvent.objects.latest('pk').pk
+        )
+
+
+class TestChangeFeed(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+        self.start = ChangeEvent.objects.latest('pk').pk
+
+    def events(self, since=None):
+        response = self.client.get(
+            reverse('changes'), {'since': self.start if since is None
+                                 else since}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (event['model'], event['id'], event['action'])
+            for event in response.json()['results']
+        ]
+
+    def test_writes_are_logged_in_order(self):
+        self.assertEqual(
+            [(event.model, event.object_id, event.action)
+             for event in ChangeEvent.objects.order_by('pk')],
+            [('platform', self.platform.id, 'insert'),
+             ('movie', self.movie.id, 'insert'),
+             ('platform', self.platform.id, 'update')]
+        )
+        review = Review.objects.create(
+            reviewer=self.user, ratings=4, decription='good',
+            watch_list=self.movie
+        )
+        Review.objects.filter(pk=review.pk).update(ratings=5)
+        Review.objects.filter(pk=review.pk).delete()
+        self.assertEqual(self.events(), [
+            ('review', review.id, 'insert'),
+            ('review', review.id, 'update'),
+            ('review', review.id, 'delete'),
+        ])
+
+    def test_hidden_movie_is_reported_deleted(self):
+        purge.hide_movie(self.movie)
+        self.assertIn(('movie', self.movie.id, 'delete'), self.events())
+
+    def test_pages(self):
+        for index in range(5):
+            WatchList.objects.filter(pk=self.movie.pk).update(
+                title=f'renamed-{index}'
+            )
+        response = self.client.get(
+            reverse('changes'), {'since': self.start, 'limit': 2}
+        ).json()
+        self.assertEqual(len(response['results']), 2)
+        self.assertEqual(response['last_seq'], self.start + 2)
+        seqs = [event['seq'] for event in response['results']]
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            seqs += [event['seq'] for event in response['results']]
+        self.assertEqual(seqs, list(range(self.start + 1, self.start + 6)))
+        self.assertEqual(response['last_seq'], self.start + 5)
+
+        response = self.client.get(
+            reverse('changes'), {'since': response['last_seq']}
+        ).json()
+        self.assertEqual(response['results'], [])
+        self.assertIsNone(response['next'])
+
+    def test_bad_parameters(self):
+        for params in ({'since': 'x'}, {'since': -1}, {'limit': '1.5'}):
+            self.assertEqual(
+                self.client.get(reverse('changes'), params).status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_compaction_keeps_latest_event(self):
+        for index in range(3):
+            WatchList.objects.filter(pk=self.movie.pk).update(
+                title=f'renamed-{index}'
+            )
+        compaction = changes.compact(chunk_size=2)
+        self.assertEqual(compaction.coalesced, 4)
+        self.assertEqual(compaction.expired, 0)
+        self.assertEqual(self.events(since=0), [
+            ('platform', self.platform.id, 'update'),
+            ('movie', self.movie.id, 'update'),
+        ])
+
+    def test_old_deletes_expire(self):
+        movie_id = self.movie.id
+        WatchList.objects.filter(pk=movie_id).delete()
+        ChangeEvent.objects.update(
+            created_at=timezone.now() - timezone.timedelta(days=40)
+        )
+        out = StringIO()
+        call_command('compact_changes', tombstone_days=30, stdout=out)
+        self.assertIn('expired 1 events', out.getvalue())
+        self.assertFalse(
+            ChangeEvent.objects.filter(model='movie', object_id=movie_id)
+            .exists()
+        )
+        horizon = changes.horizon()
+        self.assertEqual(
+            self.client.get(
+                reverse('changes'), {'since': horizon - 1}
+            ).status_code,
+            status.HTTP_410_GONE
+        )
+        # Deleting the movie touched its platform.
+        self.assertEqual(
+            self.events(since=horizon),
+            [('platform', self.platform.id, 'update')]
+        )
+
+
+class TestConditionalGet(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+        self.movie_path = reverse('movie_detail', args=(self.movie.id,))
+        self.platform_path = reverse('platform', args=(self.platform.id,))
+
+    def test_movie_if_none_match(self):
+        response = self.client.get(path=self.movie_path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        response = self.client.get(
+            path=self.movie_path, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.movie.storyline = 'new storyline'
+        self.movie.save()
+        response = self.client.get(
+            path=self.movie_path, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_movie_if_modified_since(self):
+        response = self.client.get(path=self.movie_path)
+        response = self.client.get(
+            path=self.movie_path,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_platform_etag_follows_nested_movies(self):
+        etag = self.client.get(path=self.platform_path)['ETag']
+        response = self.client.get(
+            path=self.platform_path, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        call_command('rebuild_ratings', stdout=StringIO())
+        response = self.client.get(
+            path=self.platform_path, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        self.movie.delete()
+        response = self.client.get(
+            path=self.platform_path, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['watchlist'], [])
+
+    def test_missing_movie_has_no_validators(self):
+        response = self.client.get(
+            path=reverse('movie_detail', args=(self.movie.id + 1,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+
+class TestImportCatalog(APITestCase):
+
+    def setUp(self):
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_feed(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as feed:
+            feed.write(content)
+        return path
+
+    def test_import_jsonl_in_batches(self):
+        path = self.write_feed('feed.jsonl', '\n'.join(
+            json.dumps({
+                "title": f"movie-{index}",
+                "storyline": "imported storyline",
+                "platform": "netflix"
+            })
+            for index in range(5)
+        ) + '\n{"title": "lost", "platform": "hulu"}\n')
+        stderr = StringIO()
+        call_command(
+            'import_catalog', path, batch_size=2,
+            stdout=StringIO(), stderr=stderr
+        )
+        self.assertEqual(WatchList.objects.count(), 5)
+        self.assertIn("unknown platform 'hulu'", stderr.getvalue())
+
+    def test_import_csv_with_upsert(self):
+        WatchList.objects.create(
+            platform=self.platform,
+            title='movie-1',
+            storyline='old storyline',
+            active=True
+        )
+        path = self.write_feed(
+            'feed.csv',
+            'title,storyline,platform,active\n'
+            'movie-1,new storyline,netflix,false\n'
+            'movie-2,other storyline,netflix,true\n'
+        )
+        call_command('import_catalog', path, upsert=True, stdout=StringIO())
+        self.assertEqual(WatchList.objects.count(), 2)
+        movie = WatchList.objects.get(title='movie-1')
+        self.assertEqual(movie.storyline, 'new storyline')
+        self.assertFalse(movie.active)
+        self.assertEqual(movie.version, 2)
+
+    def test_upsert_skips_repeated_rows_and_non_objects(self):
+        rows = [
+            {"title": "movie-1", "storyline": "first", "platform": "netflix"},
+            [],
+            1,
+            {"title": "movie-1", "storyline": "last", "platform": "netflix"},
+        ]
+        path = self.write_feed(
+            'feed.jsonl', ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_catalog', path, upsert=True, stdout=stdout, stderr=stderr
+        )
+        self.assertEqual(WatchList.objects.get().storyline, 'last')
+        self.assertEqual(stderr.getvalue().count("not a JSON object"), 2)
+        self.assertIn("'movie-1' skipped", stderr.getvalue())
+        self.assertIn("1 created, 0 updated, 3 skipped", stdout.getvalue())
+
+    def test_rejects_non_positive_batch_size(self):
+        path = self.write_feed('feed.jsonl', '')
+        for value in ('0', '-1'):
+            with self.assertRaisesMessage(CommandError, 'positive integer'):
+                call_command(
+                    'import_catalog', path, f'--batch-size={value}',
+                    stdout=StringIO()
+                )
+
+
+class TestCatalogExport(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy-movie-{index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(3)
+        ]
+        Review.objects.create(
+            reviewer=self.user, watch_list=self.movies[1], ratings=4
+        )
+
+    def export(self, **params):
+        response = self.client.get(path=reverse('export'), data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_movies(self):
+        lines = self.export()
+        self.assertEqual(
+            [line['title'] for line in lines],
+            ['dummy-movie-0', 'dummy-movie-1', 'dummy-movie-2']
+        )
+        self.assertTrue(all(line['type'] == 'movie' for line in lines))
+        self.assertEqual(lines[0]['platform'], 'netflix')
+
+    def test_export_with_reviews(self):
+        lines = self.export(reviews='1')
+        reviews = [line for line in lines if line['type'] == 'review']
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(reviews[0]['watch_list'], self.movies[1].id)
+        self.assertEqual(reviews[0]['reviewer'], 'django')
+
+    def test_export_updated_since(self):
+        since = timezone.now()
+        self.movies[2].title = 'renamed-movie'
+        self.movies[2].save()
+        lines = self.export(updated_since=since.isoformat())
+        self.assertEqual([line['title'] for line in lines], ['renamed-movie'])
+
+    def test_export_invalid_updated_since(self):
+        response = self.client.get(
+            path=reverse('export'), data={'updated_since': 'yesterday'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestTokenBucketThrottle(APITestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'throttle.buckets')
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+
+    def test_bucket_refills_over_time(self):
+        store = TokenBucketStore(self.path, slots=16)
+        self.assertEqual(store.consume('key', 2, 0.1, now=0), (True, 0))
+        self.assertEqual(store.consume('key', 2, 0.1, now=0), (True, 0))
+        self.assertEqual(store.consume('key', 2, 0.1, now=0), (False, 10))
+        self.assertEqual(store.consume('other', 2, 0.1, now=0), (True, 0))
+        self.assertEqual(store.consume('key', 2, 0.1, now=10), (True, 0))
+
+    def test_buckets_are_shared_through_the_file(self):
+        first = TokenBucketStore(self.path, slots=16)
+        second = TokenBucketStore(self.path, slots=16)
+        self.assertTrue(first.consume('key', 1, 0.1, now=0)[0])
+        self.assertFalse(second.consume('key', 1, 0.1, now=1)[0])
+
+    def test_full_probe_window_fails_closed(self):
+        store = TokenBucketStore(self.path, slots=1)
+        self.assertEqual(store.consume('key', 1, 0.1, now=0), (True, 0))
+        self.assertEqual(store.consume('other', 1, 0.1, now=1), (False, 9))
+        self.assertEqual(store.consume('key', 1, 0.1, now=1), (False, 9))
+        # Once the bucket is full again its slot can be recycled.
+        self.assertEqual(store.consume('other', 1, 0.1, now=10), (True, 0))
+        self.assertEqual(store.consume('key', 1, 0.1, now=10), (False, 10))
+
+    def test_threads_share_a_store(self):
+        store = TokenBucketStore(self.path, slots=16)
+        allowed = []
+
+        def consume():
+            for _ in range(200):
+                allowed.append(store.consume('key', 500, 0.1, now=0)[0])
+
+        threads = [threading.Thread(target=consume) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 500)
+
+    def test_review_create_throttled_by_bucket(self):
+        path = reverse('review-create', args=(self.movie.id,))
+        data = {"decription": "dummy-decription", "ratings": 4}
+        with override_settings(THROTTLE_BUCKET_FILE=self.path):
+            response = self.client.post(path=path, data=data)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.client.post(path=path, data=data)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            response.json()['detail'],
+            'Request was throttled. Expected available in 86400 seconds.'
+        )
+
+
+class TestQueryBudget(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.add_platforms('netflix')
+
+    def add_platforms(self, *names):
+        for name in names:
+            platform = StreamingPlatform.objects.create(
+                name=name,
+                about='movies and series',
+                website=f'http://www.{name}.com'
+            )
+            for index in range(3):
+                movie = WatchList.objects.create(
+                    platform=platform,
+                    title=f'{name}-movie-{index}',
+                    storyline='dummy storyline',
+                    active=True
+                )
+                Review.objects.create(
+                    reviewer=self.user, watch_list=movie, ratings=4
+                )
+
+    def test_platform_list_queries_do_not_grow(self):
+        # token, platforms, prefetched movies
+        with self.assertNumQueries(3):
+            self.client.get(path=reverse('platform'))
+        self.add_platforms('prime', 'hotstar')
+        with self.assertNumQueries(3):
+            response = self.client.get(path=reverse('platform'))
+        self.assertEqual(len(response.json()), 3)
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                path=reverse('stream-platform-list')
+            )
+        self.assertEqual(len(response.json()), 3)
+
+    def test_review_list_queries_do_not_grow(self):
+        movie = WatchList.objects.first()
+        for index in range(3):
+            reviewer = User.objects.create_user(
+                username=f'reviewer-{index}', password='testpass'
+            )
+            Review.objects.create(
+                reviewer=reviewer, watch_list=movie, ratings=3
+            )
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                path=reverse('review-list', args=(movie.id,))
+            )
+        self.assertEqual(len(response.json()), 4)
+
+    def test_exceeded_budget_raises(self):
+        with mock.patch.object(
+            views.StreamingPlatFormView, 'query_budgets', {'get': 1}
+        ):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(path=reverse('platform'))
+
+    def test_exceeded_budget_logs_when_not_raising(self):
+        with mock.patch.object(
+            views.StreamingPlatFormView, 'query_budgets', {'get': 1}
+        ), override_settings(QUERY_BUDGET_RAISE=False):
+            with self.assertLogs('watchlist.api.budget', 'WARNING') as logs:
+                response = self.client.get(path=reverse('platform'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('over its budget of 1', logs.output[0])
+
+
+@override_settings(PROFILING_HEADER='X-Profile')
+class TestProfiling(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        profiling.reset()
+        self.user = User.objects.create_user(
+            username='django', password='testpass', is_staff=True
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie = WatchList.objects.create(
+            platform=self.platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+
+    def test_not_profiled_without_header(self):
+        response = self.client.get(path=reverse('list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get(reverse('profile-stats')).json(), {})
+
+    def test_staff_header_reports_phases(self):
+        response = self.client.get(
+            path=reverse('movie_detail', args=(self.movie.id,)),
+            HTTP_X_PROFILE='1'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = [
+            metric.split(';')[0]
+            for metric in response['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(
+            metrics,
+            ['auth', 'throttle', 'db', 'serialize', 'render', 'total']
+        )
+        self.assertIn('queries"', response['Server-Timing'])
+
+        stats = self.client.get(reverse('profile-stats')).json()
+        view = stats['GET watchlist.api.views.WatchListDetailView']
+        self.assertEqual(view['requests'], 1)
+        self.assertGreater(view['queries'], 0)
+        self.assertTrue(view['slowest_queries'])
+
+    def test_header_ignored_for_non_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(path=reverse('list'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+        response = self.client.get(reverse('profile-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_profiles_everything_when_enabled(self):
+        self.client.credentials()
+        with override_settings(PROFILING_ENABLED=True):
+            response = self.client.get(path=reverse('list'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(PROFILING_ENABLED=False, PROFILING_HEADER=None)
+    def test_left_out_by_default(self):
+        with mock.patch.object(profiling, 'install') as install:
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilingMiddleware(HttpResponse)
+        install.assert_not_called()
+
+
+class ReplicaFiles:
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.paths = {}
+        databases = {}
+        for alias in ('replica1', 'replica2'):
+            path = os.path.join(directory.name, f'{alias}.sqlite3')
+            sqlite3.connect(path).close()
+            self.paths[alias] = path
+            databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': path
+            }
+        patcher = mock.patch.dict(connections.databases, databases)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(
+    READ_REPLICAS=['replica1', 'replica2'], REPLICA_HEALTH_INTERVAL=0
+)
+class TestReadReplicas(ReplicaFiles, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        pins = override_settings(
+            CACHES={**settings.CACHES, 'pins': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(self.directory, 'pins'),
+            }},
+            REPLICA_PIN_CACHE='pins'
+        )
+        pins.enable()
+        self.addCleanup(pins.disable)
+        self.router = replicas.ReplicaRouter()
+
+    def route(self, method='GET', write=False, **headers):
+        decisions = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(WatchList)
+            decisions.append(self.router.db_for_read(WatchList))
+            return HttpResponse()
+
+        request = RequestFactory().generic(method, '/watch/list/', **headers)
+        replicas.ReplicaMiddleware(view)(request)
+        return decisions[0]
+
+    def age(self, alias, seconds):
+        stamp = time.time() - seconds
+        os.utime(self.paths[alias], (stamp, stamp))
+
+    def test_pin_cache_must_be_shared(self):
+        with override_settings(REPLICA_PIN_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                replicas.ReplicaMiddleware(HttpResponse)
+
+    def test_replica_reads_are_counted(self):
+        counts = []
+
+        def view(request):
+            counts.append(replicas.replica_reads())
+            self.router.db_for_read(WatchList)
+            counts.append(replicas.replica_reads())
+            return HttpResponse()
+
+        replicas.ReplicaMiddleware(view)(RequestFactory().get('/watch/'))
+        self.assertEqual(counts, [0, 1])
+        self.assertEqual(replicas.replica_reads(), 0)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(WatchList), 'default')
+
+    def test_safe_requests_round_robin(self):
+        first, second = self.route(), self.route()
+        self.assertEqual({first, second}, {'replica1', 'replica2'})
+        self.assertEqual(self.route(), first)
+
+    def test_writes_pin_the_client_to_primary(self):
+        self.assertEqual(
+            self.route('POST', HTTP_AUTHORIZATION='Token writer'), 'default'
+        )
+        self.assertEqual(
+            self.route(HTTP_AUTHORIZATION='Token writer'), 'default'
+        )
+        self.assertNotEqual(
+            self.route(HTTP_AUTHORIZATION='Token reader'), 'default'
+        )
+
+    def test_issued_credentials_are_pinned(self):
+        replicas.pin('Token fresh')
+        self.assertEqual(
+            self.route(HTTP_AUTHORIZATION='Token fresh'), 'default'
+        )
+
+    def test_one_replica_per_request(self):
+        aliases = []
+
+        def view(request):
+            for _ in range(3):
+                aliases.append(self.router.db_for_read(WatchList))
+            return HttpResponse()
+
+        replicas.ReplicaMiddleware(view)(RequestFactory().get('/watch/'))
+        self.assertEqual(len(set(aliases)), 1)
+        self.assertNotEqual(aliases[0], 'default')
+
+    def test_reads_after_a_write_stay_on_primary(self):
+        self.assertEqual(self.route(write=True), 'default')
+        self.assertEqual(self.route(), 'default')
+
+    def test_lagging_replicas_are_skipped(self):
+        self.age('replica1', 3600)
+        self.assertEqual({self.route(), self.route()}, {'replica2'})
+        self.age('replica2', 3600)
+        self.assertEqual(self.route(), 'default')
+        os.unlink(self.paths['replica2'])
+        self.assertEqual(self.route(), 'default')
+
+    def test_health_prefers_freshest_replica(self):
+        self.age('replica1', 30)
+        self.age('replica2', 10)
+        with override_settings(REPLICA_SELECTION='health'):
+            self.assertEqual({self.route(), self.route()}, {'replica2'})
+
+
+class TestSyncReplicas(ReplicaFiles, APITransactionTestCase):
+
+    def test_sync_copies_primary(self):
+        platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        WatchList.objects.create(
+            platform=platform,
+            title='dummy-movie',
+            storyline='dummy storyline',
+            active=True
+        )
+        call_command('sync_replicas', 'replica1', stdout=StringIO())
+        replica = sqlite3.connect(self.paths['replica1'])
+        try:
+            titles = replica.execute(
+                "SELECT title FROM watchlist_watchlist"
+            ).fetchall()
+        finally:
+            replica.close()
+        self.assertEqual(titles, [('dummy-movie',)])
+
+
+class TestSQLiteBackend(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+
+    def wrapper(self, **options):
+        settings_dict = dict(
+            connections['default'].settings_dict, NAME=self.path
+        )
+        if options:
+            settings_dict['OPTIONS'] = options
+        wrapper = DatabaseWrapper(settings_dict, 'scratch')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_applied_to_new_connections(self):
+        with self.wrapper().cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone(), ('wal',))
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone(), (5000,))
+            cursor.execute("PRAGMA synchronous")
+            # NORMAL
+            self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_transactions_take_the_write_lock(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        self.addCleanup(wrapper.connection.rollback)
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(
+            sqlite3.OperationalError, 'database is locked'
+        ):
+            other.execute("BEGIN IMMEDIATE")
+
+    def test_invalid_options(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(transaction_mode='eventually')
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(pragmas={'journal_mode; DROP': 'wal'})
+
+
+class TestFilterMovie(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie_data = {
+            "platform": self.platform,
+            "title": 'dummy-movie',
+            "storyline": 'dummy storyline',
+            "active": True
+        }
+        self.movie = WatchList.objects.create(**self.movie_data)
+
+        self.movie_data_2 = {
+            "platform": self.platform,
+            "title": 'dummy-movie-2',
+            "storyline": 'dummy storyline-2',
+            "active": True
+        }
+        self.movie_2 = WatchList.objects.create(**self.movie_data_2)
+
+    def test_filter_all_movie(self):
+        response = self.client.get(
+            path='/watch/filter-movie'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_filter_movie_by_title(self):
+        response = self.client.get(
+            path=f'/watch/filter-movie?title={self.movie.title}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['platform'], "netflix")
+        self.assertEqual(response.json()['results'][0]['title'], "dummy-movie")
+        self.assertEqual(
+            response.json()['results'][0]['storyline'], "dummy storyline"
+        )
+
+    def test_filter_movie_doesnot_exists(self):
+        response = self.client.get(
+            path='/watch/filter-movie?title=unknown'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_facets(self):
+        hbo = StreamingPlatform.objects.create(
+            name='hbo', about='series', website='http://www.hbo.com'
+        )
+        WatchList.objects.create(
+            platform=hbo, title='dummy-movie', storyline='dummy storyline',
+            active=False
+        )
+        WatchList.objects.filter(pk=self.movie.pk).update(
+            number_of_ratings=2, rating_sum=9, average_rating=4.5
+        )
+        response = self.client.get(
+            reverse('filter-movie'), {'facets': 'platform,active,rating'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(response.json()['facets'], {
+            'platform': {'netflix': 2, 'hbo': 1},
+            'active': {'true': 2, 'false': 1},
+            'rating': {'unrated': 2, '4': 1},
+        })
+
+        response = self.client.get(
+            reverse('filter-movie'),
+            {'title': 'dummy-movie', 'facets': 'platform', 'limit': 1}
+        )
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(
+            response.json()['facets'], {'platform': {'netflix': 1, 'hbo': 1}}
+        )
+        self.assertNotIn('facets', self.client.get(
+            reverse('filter-movie')
+        ).json())
+
+    def test_unknown_facet(self):
+        response = self.client.get(
+            reverse('filter-movie'), {'facets': 'platform,year'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'facets': ["Unknown facet 'year'"]})
+
+    def test_facets_are_cached_until_a_write(self):
+        params = {'facets': 'active'}
+        self.client.get(reverse('filter-movie'), params)
+        # Token, count and page, the facets come from the cache.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('filter-movie'), params)
+        self.assertEqual(response.json()['facets'], {'active': {'true': 2}})
+
+        self.movie.active = False
+        self.movie.save()
+        response = self.client.get(reverse('filter-movie'), params)
+        self.assertEqual(
+            response.json()['facets'], {'active': {'true': 1, 'false': 1}}
+        )
+
+
+class TestSparseFields(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movies = [
+            WatchList.objects.create(
+                platform=self.platform,
+                title=f'dummy movie {index}',
+                storyline='dummy storyline',
+                active=True
+            )
+            for index in range(3)
+        ]
+
+    def test_fields_match_full_serializer(self):
+        full = self.client.get(path=reverse('list')).json()
+        # token, page count, page
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                path=reverse('list'), data={'fields': 'id,title,platform'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [
+            {key: movie[key] for key in ('id', 'platform', 'title')}
+            for movie in full
+        ])
+
+    def test_exclude(self):
+        response = self.client.get(
+            path=reverse('list'), data={'exclude': 'storyline,created_at'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for movie in response.json():
+            self.assertNotIn('storyline', movie)
+            self.assertNotIn('created_at', movie)
+            self.assertIn('updated_at', movie)
+
+    def test_unknown_field(self):
+        response = self.client.get(
+            path=reverse('list'), data={'fields': 'title,budget'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()['fields'], ["Unknown field 'budget'"]
+        )
+
+    def test_keyset_pages_without_id(self):
+        response = self.client.get(path=reverse('list'), data={
+            'fields': 'title', 'pagination': 'cursor', 'page_size': 2
+        })
+        json_response = response.json()
+        self.assertEqual(
+            json_response['results'],
+            [{'title': 'dummy movie 2'}, {'title': 'dummy movie 1'}]
+        )
+        response = self.client.get(path=json_response['next'])
+        self.assertEqual(
+            response.json()['results'], [{'title': 'dummy movie 0'}]
+        )
+
+    def test_filter_and_search(self):
+        response = self.client.get(path=reverse('filter-movie'), data={
+            'platform__name': 'netflix', 'fields': 'title,platform'
+        })
+        self.assertEqual(response.json()['results'][0], {
+            'platform': 'netflix', 'title': 'dummy movie 0'
+        })
+        response = self.client.get(path=reverse('search-movie'), data={
+            'search': 'movie', 'fields': 'id'
+        })
+        self.assertEqual(
+            sorted(movie['id'] for movie in response.json()),
+            [movie.id for movie in self.movies]
+        )
+
+    def test_platform_fields_skip_nested_movies(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                path=reverse('platform'), data={'fields': 'id,name'}
+            )
+        self.assertEqual(
+            response.json(), [{'id': self.platform.id, 'name': 'netflix'}]
+        )
+        response = self.client.get(
+            path=reverse('stream-platform-list'), data={'exclude': 'watchlist'}
+        )
+        self.assertNotIn('watchlist', response.json()[0])
+        response = self.client.get(
+            path=reverse('stream-platform-detail', args=(self.platform.id,)),
+            data={'fields': 'name'}
+        )
+        self.assertEqual(response.json(), {'name': 'netflix'})
+
+
+class TestSearchMovie(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='django', password='testpass'
+        )
+        self.token, self.created = Token.objects.get_or_create(
+            user_id=self.user.id
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.platform = StreamingPlatform.objects.create(
+            name='netflix',
+            about='movies and series',
+            website='http://www.netflix.com'
+        )
+        self.movie_data = {
+            "platform": self.platform,
+            "title": 'dummy-movie',
+            "storyline": 'dummy storyline',
+            "active": True
+        }
+        self.movie = WatchList.objects.create(**self.movie_data)
+
+        self.movie_data_2 = {
+            "platform": self.platform,
+            "title": 'dummy-movie-2',
+            "storyline": 'dummy storyline-2',
+            "active": True
+        }
+        self.movie_2 = WatchList.objects.create(**self.movie_data_2)
+
+    def test_search_all_movie(self):
+        response = self.client.get(
+            path='/watch/search-movie'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_search_movie_by_title(self):
+        response = self.client.get(
+            path=f'/watch/search-movie?title={self.movie.title}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(response.json()[0]['title'], "dummy-movie")
+        self.assertEqual(response.json()[1]['title'], "dummy-movie-2")
+
+    def test_search_movie_full_text_prefix(self):
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'dumm storyline-2'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(response.json()[0]['title'], "dummy-movie-2")
+
+    def test_search_movie_ranks_title_matches_first(self):
+        WatchList.objects.create(
+            platform=self.platform,
+            title='space opera',
+            storyline='a dummy hero in space',
+            active=True
+        )
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'space'}
+        )
+        self.assertEqual(len(response.json()), 1)
+
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'dummy'}
+        )
+        titles = [movie['title'] for movie in response.json()]
+        self.assertEqual(len(titles), 3)
+        self.assertEqual(titles[-1], 'space opera')
+
+    def test_search_index_follows_platform_rename(self):
+        self.platform.name = 'hulu'
+        self.platform.save()
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'hulu'}
+        )
+        self.assertEqual(len(response.json()), 2)
+
+        self.movie.delete()
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'hulu'}
+        )
+        self.assertEqual(len(response.json()), 1)
+
+    def test_rebuild_search_index(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'netflix'}
+        )
+        self.assertEqual(len(response.json()), 2)
+
+    def test_rebuild_search_index_during_inserts(self):
+        batches = search.rebuild(batch_size=1)
+        next(batches)
+        WatchList.objects.create(
+            platform=self.platform, title='late dummy',
+            storyline='added mid rebuild', active=True
+        )
+        self.assertEqual(list(batches), [1, 1])
+        response = self.client.get(
+            path='/watch/search-movie', data={'search': 'dummy'}
+        )
+        self.assertEqual(len(response.json()), 3)
+
+    def test_search_facets(self):
+        cache.clear()
+        WatchList.objects.create(
+            platform=self.platform, title='space opera',
+            storyline='far away', active=False
+        )
+        response = self.client.get(
+            path='/watch/search-movie',
+            data={'search': 'dummy', 'facets': 'active,platform'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(response.json()['facets'], {
+            'active': {'true': 2}, 'platform': {'netflix': 2}
+        })